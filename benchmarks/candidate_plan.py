@@ -0,0 +1,144 @@
+"""
+Планы запроса выбора кандидата на растущем пуле анкет
+
+Для каждого размера пула заливает синтетическую базу, снимает план запроса случайного id кандидата с фильтром по
+полу и диапазону возраста и замеряет ``MatchRepository.get_next_candidate`` без ранжирования. Запрос должен
+оставаться index-only по ``ix_users_sex_search_sex_age`` независимо от размера пула.
+
+Пример::
+
+    python -m benchmarks.candidate_plan --sizes 1000 10000 100000 --output plans.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from statistics import median
+from time import perf_counter
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from benchmarks.population import PopulationSpec, load_population
+from benchmarks.repositories import summarize
+from datemate.infrastructure.db import UserModel
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.repositories import MatchRepository, random_candidate_ids
+
+INDEX_NAME = "ix_users_sex_search_sex_age"
+
+
+async def explain(conn: AsyncConnection, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in await conn.execute(text(f"EXPLAIN {sql}"))]
+
+
+def is_index_only(plan: list[str]) -> bool:
+    return any(
+        f"COVERING INDEX {INDEX_NAME}" in line or f"Index Only Scan using {INDEX_NAME}" in line for line in plan
+    )
+
+
+def seeks_age_range(plan: list[str]) -> bool:
+    # sqlite: "(sex=? AND search_sex=? AND age>? AND age<?)", postgres: "Index Cond: (... AND (age >= 20) ...)"
+    return any("age>" in line or "(age >=" in line for line in plan)
+
+
+async def measure_pool(
+    engine: AsyncEngine, instrumentation: QueryInstrumentation, spec: PopulationSpec, viewers: int, seed: int
+) -> dict:
+    await load_population(engine, spec)
+    session_factory = await init_db(engine)
+    if engine.dialect.name == "postgresql":
+        # Index-only scan обходится без чтения таблицы, только если карта видимости актуальна. В рабочей базе ее
+        # обновляет autovacuum, после массовой заливки — явный VACUUM
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM (ANALYZE) users"))
+    rng = random.Random(seed)
+
+    plans = []
+    ranged_plans = []
+    durations = []
+    ranged_durations = []
+    statements = []
+    for _ in range(viewers):
+        async with session_factory() as session:
+            user = await session.get(UserModel, rng.randint(1, spec.users))
+            stmt = random_candidate_ids(not user.search_sex).params(MatchRepository.candidate_params(user))
+            plan = await explain(await session.connection(), stmt)
+            plans.append(plan)
+            ranged = user.min_age is not None
+            if ranged:
+                ranged_plans.append(plan)
+
+            with instrumentation.scope("get_next_candidate") as stats:
+                started = perf_counter()
+                await MatchRepository(session).get_next_candidate(user)
+                durations.append(perf_counter() - started)
+            statements.append(stats.statements)
+            if ranged:
+                ranged_durations.append(durations[-1])
+
+    return {
+        "users": spec.users,
+        "index_only_share": sum(map(is_index_only, plans)) / len(plans),
+        # Для пользователей с диапазоном возраст должен входить в условие поиска по индексу, а не в фильтр
+        "range_seek_share": sum(map(seeks_age_range, ranged_plans)) / max(len(ranged_plans), 1),
+        "plan": ranged_plans[0] if ranged_plans else plans[0],
+        "ranged_p50_ms": median(ranged_durations) * 1000 if ranged_durations else None,
+        **summarize(durations, statements),
+    }
+
+
+async def run(database_url: str, sizes: list[int], likes_per_user: int, viewers: int, seed: int) -> list[dict]:
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+    engine = create_engine(database_url, instrumentation=instrumentation)
+    try:
+        results = []
+        for users in sizes:
+            spec = PopulationSpec(users=users, likes=users * likes_per_user, seed=seed)
+            result = await measure_pool(engine, instrumentation, spec, viewers, seed)
+            logging.info(
+                "%d users: index-only %.0f%%, range seek %.0f%%, p50 %.2fms (with range %.2fms), p95 %.2fms",
+                users,
+                result["index_only_share"] * 100,
+                result["range_seek_share"] * 100,
+                result["p50_ms"],
+                result["ranged_p50_ms"] or 0,
+                result["p95_ms"],
+            )
+            results.append(result)
+        return results
+    finally:
+        await engine.dispose()
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Check the candidate query plan on growing populations")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///bench.db")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--likes-per-user", type=int, default=10)
+    parser.add_argument("--viewers", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=PopulationSpec.seed)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = await run(args.database_url, args.sizes, args.likes_per_user, args.viewers, args.seed)
+    for line in results[-1]["plan"]:
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,144 @@
+"""
+Размер хранилища реакций до и после сжатия дизлайков в наборы отказов
+
+Заливает синтетическую базу, состаривает все реакции и прогоняет компактор. В отчете — строки и байты (вместе
+с индексами) таблиц ``likes`` и ``rejection_sets`` до и после, а также латентность ``get_next_candidate`` с
+наборами отказов. Доля лайков по умолчанию занижена: в боте каждое «Дальше» записывает дизлайк.
+
+Пример::
+
+    python -m benchmarks.compaction --users 20000 --likes 2000000 --output compaction.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.population import PopulationSpec, add_population_arguments, load_population, spec_from_arguments
+from benchmarks.repositories import summarize
+from datemate.infrastructure.db import LikeModel, RejectionSetModel
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.rejections import RejectionPolicy, compact_rejections
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+
+TABLES = ("likes", "rejection_sets")
+
+
+async def table_sizes(engine: AsyncEngine) -> dict[str, dict[str, int]]:
+    sizes = {}
+    async with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            await conn.execute(text("VACUUM"))
+            pages = dict(
+                (
+                    await conn.execute(
+                        text(
+                            "SELECT s.tbl_name, SUM(d.pgsize) FROM dbstat d "
+                            "JOIN sqlite_schema s ON s.name = d.name GROUP BY s.tbl_name"
+                        )
+                    )
+                ).all()
+            )
+        for model in (LikeModel, RejectionSetModel):
+            name = model.__tablename__
+            rows = (await conn.execute(select(func.count()).select_from(model))).scalar_one()
+            if conn.dialect.name == "sqlite":
+                size = pages.get(name, 0)
+            else:
+                size = (await conn.execute(text(f"SELECT pg_total_relation_size('{name}')"))).scalar_one()
+            sizes[name] = {"rows": rows, "bytes": int(size)}
+    return sizes
+
+
+async def run(
+    engine: AsyncEngine,
+    instrumentation: QueryInstrumentation,
+    spec: PopulationSpec,
+    policy: RejectionPolicy,
+    iterations: int,
+) -> dict:
+    await load_population(engine, spec)
+    session_factory = await init_db(engine)
+    async with engine.begin() as conn:
+        # Все реакции старше порога сжатия
+        await conn.execute(update(LikeModel).values(created_at=datetime.now(timezone.utc) - 2 * policy.compact_after))
+
+    before = await table_sizes(engine)
+    started = perf_counter()
+    stats = await compact_rejections(session_factory, policy)
+    elapsed = perf_counter() - started
+    after = await table_sizes(engine)
+
+    session_factory.configure(info={"rejections": policy})
+    rng = random.Random(spec.seed)
+    durations = []
+    statements = []
+    for _ in range(iterations):
+        async with session_factory() as session:
+            user = await UserRepository(session).get_by_id(rng.randint(1, spec.users))
+            with instrumentation.scope("get_next_candidate") as call_stats:
+                started_call = perf_counter()
+                await MatchRepository(session).get_next_candidate(user)
+                durations.append(perf_counter() - started_call)
+            statements.append(call_stats.statements)
+
+    async with engine.connect() as conn:
+        largest = (await conn.execute(select(func.max(RejectionSetModel.size)))).scalar_one()
+
+    total_before = sum(table["bytes"] for table in before.values())
+    total_after = sum(table["bytes"] for table in after.values())
+    return {
+        "before": before,
+        "after": after,
+        "shrink_factor": total_before / max(total_after, 1),
+        "compaction": {**dataclasses.asdict(stats), "seconds": elapsed},
+        "largest_set": largest,
+        "get_next_candidate": summarize(durations, statements),
+    }
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Measure rejection set compaction")
+    add_population_arguments(parser)
+    parser.add_argument("--like-ratio", type=float, default=0.1)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    spec = dataclasses.replace(spec_from_arguments(args), like_ratio=args.like_ratio)
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+    engine = create_engine(args.database_url, instrumentation=instrumentation)
+    try:
+        report = await run(
+            engine, instrumentation, spec, RejectionPolicy(compact_after=timedelta(days=7)), args.iterations
+        )
+    finally:
+        await engine.dispose()
+
+    for name in TABLES:
+        logging.info("%s: %s -> %s", name, report["before"][name], report["after"][name])
+    logging.info(
+        "Shrink x%.1f, compaction %.1fs, get_next_candidate p50 %.2fms",
+        report["shrink_factor"],
+        report["compaction"]["seconds"],
+        report["get_next_candidate"]["p50_ms"],
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
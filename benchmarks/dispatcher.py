@@ -0,0 +1,224 @@
+"""
+Сквозной нагрузочный прогон настоящего Dispatcher (как в ``datemate.app``) на синтетических апдейтах
+
+Виртуальные пользователи проходят регистрацию, свайпы и листание мэтчей; Bot API заменен
+``FakeTelegramSession`` с настраиваемой задержкой. Пример::
+
+    python -m benchmarks.dispatcher --users 500 --concurrency 50 --bot-latency 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from time import perf_counter
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.fake_bot import FakeTelegramSession, create_fake_bot
+from benchmarks.repositories import summarize
+from datemate.infrastructure.db.migrations import drop_schema
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.app import build_dispatcher
+from datemate.tgbot.functional import MessageDeletionQueue, Phrases
+
+USER_ID_OFFSET = 50_000_000
+
+
+class StatementCounter:
+    def __init__(self, engine: AsyncEngine):
+        self.count = 0
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, *args) -> None:
+        self.count += 1
+
+
+class DispatcherHarness:
+    def __init__(self, dp: Dispatcher, bot: Bot, fake_session: FakeTelegramSession, statements: StatementCounter):
+        self.dp = dp
+        self.bot = bot
+        self.fake_session = fake_session
+        self.statements = statements
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(telegram_id: int) -> dict:
+        return {"id": telegram_id, "is_bot": False, "first_name": "Load", "username": f"load{telegram_id}"}
+
+    @staticmethod
+    def _now() -> int:
+        return int(datetime.now(timezone.utc).timestamp())
+
+    async def _feed(self, flow: str, payload: dict) -> None:
+        update = Update.model_validate({"update_id": next(self._update_ids), **payload}, context={"bot": self.bot})
+        started = perf_counter()
+        await self.dp.feed_update(self.bot, update)
+        self.latencies[flow].append(perf_counter() - started)
+
+    async def send_message(self, flow: str, telegram_id: int, text: str | None = None, photo: str | None = None):
+        message = {
+            "message_id": next(self._message_ids),
+            "date": self._now(),
+            "chat": {"id": telegram_id, "type": "private"},
+            "from": self._user(telegram_id),
+        }
+        if text is not None:
+            message["text"] = text
+        if photo is not None:
+            message["photo"] = [{"file_id": photo, "file_unique_id": photo, "width": 640, "height": 480}]
+        await self._feed(flow, {"message": message})
+
+    async def press(self, flow: str, telegram_id: int, data: str) -> None:
+        callback = {
+            "id": str(next(self._update_ids)),
+            "from": self._user(telegram_id),
+            "chat_instance": str(telegram_id),
+            "data": data,
+            "message": {
+                "message_id": self.fake_session.last_message_id.get(telegram_id, 1),
+                "date": self._now(),
+                "chat": {"id": telegram_id, "type": "private"},
+                "text": "",
+            },
+        }
+        await self._feed(flow, {"callback_query": callback})
+
+    async def registration_flow(self, telegram_id: int, rng: random.Random) -> None:
+        sex = rng.choice("MF")
+        await self.send_message("registration", telegram_id, text="/start")
+        await self.press("registration", telegram_id, "language:en")
+        await self.press("registration", telegram_id, "action:register")
+        await self.send_message("registration", telegram_id, text="Load Tester")
+        await self.press("registration", telegram_id, f"sex:{sex}")
+        await self.press("registration", telegram_id, f"search_sex:{'F' if sex == 'M' else 'M'}")
+        await self.send_message("registration", telegram_id, text=str(rng.randint(17, 30)))
+        # Диапазон шире возрастов в прогоне, чтобы свайпам хватало кандидатов
+        await self.send_message("registration", telegram_id, text="16-35")
+        await self.press("registration", telegram_id, f"faculty:{rng.choice(['fkn', 'fen', 'vsb', 'fgn'])}")
+        await self.send_message("registration", telegram_id, text="Load test profile")
+        await self.send_message("registration", telegram_id, photo=f"photo_{telegram_id}")
+        await self.press("registration", telegram_id, "photos:done")
+
+    async def swipe_flow(self, telegram_id: int, rng: random.Random, swipes: int) -> None:
+        await self.press("swipe", telegram_id, "action:search")
+        for _ in range(swipes):
+            actions = [data for data in self.fake_session.callback_data(telegram_id) if data.startswith("rate:")]
+            if not actions:
+                return
+            wanted = "rate:like" if rng.random() < 0.5 else "rate:skip"
+            await self.press("swipe", telegram_id, next((a for a in actions if a.startswith(wanted)), actions[0]))
+
+    async def matches_flow(self, telegram_id: int, pages: int) -> None:
+        await self.press("matches", telegram_id, "action:matches")
+        for page in range(1, pages):
+            await self.press("matches", telegram_id, f"matches:page:{page}")
+
+    async def run_phase(self, name: str, users: list[int], concurrency: int, flow) -> dict:
+        semaphore = asyncio.Semaphore(concurrency)
+        updates_before = sum(len(values) for values in self.latencies.values())
+        statements_before = self.statements.count
+        api_calls_before = sum(self.fake_session.calls.values())
+
+        async def run_user(telegram_id: int) -> None:
+            async with semaphore:
+                await flow(telegram_id)
+
+        started = perf_counter()
+        await asyncio.gather(*(run_user(telegram_id) for telegram_id in users))
+        elapsed = perf_counter() - started
+
+        updates = sum(len(values) for values in self.latencies.values()) - updates_before
+        report = {
+            "updates": updates,
+            "seconds": elapsed,
+            "updates_per_second": updates / elapsed if elapsed else 0.0,
+            "db_statements_per_update": (self.statements.count - statements_before) / max(updates, 1),
+            "bot_api_calls_per_update": (sum(self.fake_session.calls.values()) - api_calls_before) / max(updates, 1),
+            "latency": summarize(self.latencies[name], [0] * len(self.latencies[name])),
+        }
+        report["latency"].pop("statements_per_call")
+        logging.info("%s: %s", name, report)
+        return report
+
+
+async def run_harness(
+    database_url: str,
+    users: int,
+    concurrency: int,
+    swipes: int,
+    pages: int,
+    bot_latency: float,
+    seed: int,
+) -> dict:
+    engine = create_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(drop_schema)
+    session_factory = await init_db(engine)
+    statements = StatementCounter(engine)
+
+    bot, fake_session = create_fake_bot(latency=bot_latency, jitter=bot_latency / 2, seed=seed)
+    deletion_queue = MessageDeletionQueue()
+    dp = build_dispatcher(session_factory, Phrases(), MemoryStorage(), deletion_queue)
+    harness = DispatcherHarness(dp, bot, fake_session, statements)
+
+    telegram_ids = [USER_ID_OFFSET + index for index in range(users)]
+    rngs = {telegram_id: random.Random(seed + telegram_id) for telegram_id in telegram_ids}
+    try:
+        report = {
+            "registration": await harness.run_phase(
+                "registration", telegram_ids, concurrency, lambda tid: harness.registration_flow(tid, rngs[tid])
+            ),
+            "swipe": await harness.run_phase(
+                "swipe", telegram_ids, concurrency, lambda tid: harness.swipe_flow(tid, rngs[tid], swipes)
+            ),
+            "matches": await harness.run_phase(
+                "matches", telegram_ids, concurrency, lambda tid: harness.matches_flow(tid, pages)
+            ),
+        }
+    finally:
+        await deletion_queue.close()
+        await engine.dispose()
+
+    report["bot_api_calls"] = dict(fake_session.calls)
+    return report
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end dispatcher throughput harness")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///dispatcher_bench.db")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--swipes", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--bot-latency", type=float, default=0.0, help="seconds per fake Bot API call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    report = await run_harness(
+        args.database_url, args.users, args.concurrency, args.swipes, args.pages, args.bot_latency, args.seed
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # Логи о каждом апдейте и о пересоздании главного сообщения искажают замер
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO)
+    asyncio.run(_main())
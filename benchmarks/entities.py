@@ -0,0 +1,115 @@
+"""
+Память и время загрузки анкет: ORM-объекты против ``UserProfile``
+
+Загружает все анкеты синтетической базы двумя способами — ``UserModel`` с факультетом через ``selectinload``
+(как репозитории отдавали их раньше) и ``UserProfile`` из строк ``profile_select`` — и сравнивает прирост памяти
+на объект по ``tracemalloc`` (вместе с identity map сессии) и время загрузки. Для ``UserProfile`` дополнительно
+считается размер pickle, то есть цена кэширования вне процесса.
+
+Пример::
+
+    python -m benchmarks.entities --users 50000 --likes 0 --output entities.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import pickle
+import tracemalloc
+from time import perf_counter
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import selectinload
+
+from benchmarks.population import PopulationSpec, add_population_arguments, load_population, spec_from_arguments
+from datemate.infrastructure.db import UserModel
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.repositories import profile_select, to_profile
+
+
+async def _load_models(session) -> list:
+    stmt = select(UserModel).options(selectinload(UserModel.faculty))
+    users = list((await session.execute(stmt)).scalars())
+    # Как в хендлерах: подпись анкеты читает факультет и фото
+    for user in users:
+        user.faculty.name, user.photos
+    return users
+
+
+async def _load_profiles(session) -> list:
+    return [to_profile(row) for row in await session.execute(profile_select())]
+
+
+async def measure(session_factory, load) -> dict:
+    async with session_factory() as session:
+        # Первый прогон прогревает кэш компиляции, чтобы он не попал в замер памяти
+        await load(session)
+    gc.collect()
+    async with session_factory() as session:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            started = perf_counter()
+            objects = await load(session)
+            elapsed = perf_counter() - started
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+    return {
+        "objects": len(objects),
+        "bytes_per_object": retained / max(len(objects), 1),
+        "load_ms": elapsed * 1000,
+        "sample": objects[0] if objects else None,
+    }
+
+
+async def run(engine: AsyncEngine, spec: PopulationSpec) -> dict:
+    await load_population(engine, spec)
+    session_factory = await init_db(engine)
+
+    models = await measure(session_factory, _load_models)
+    profiles = await measure(session_factory, _load_profiles)
+    sample = profiles.pop("sample")
+    models.pop("sample")
+    return {
+        "orm": models,
+        "profile": {**profiles, "pickle_bytes": len(pickle.dumps(sample)) if sample else 0},
+        "memory_ratio": models["bytes_per_object"] / max(profiles["bytes_per_object"], 1),
+    }
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Compare ORM instances with UserProfile entities")
+    add_population_arguments(parser)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    try:
+        report = await run(engine, spec_from_arguments(args))
+    finally:
+        await engine.dispose()
+
+    logging.info(
+        "ORM %.0f B/object in %.0fms, UserProfile %.0f B/object in %.0fms (x%.1f less memory), pickle %d B",
+        report["orm"]["bytes_per_object"],
+        report["orm"]["load_ms"],
+        report["profile"]["bytes_per_object"],
+        report["profile"]["load_ms"],
+        report["memory_ratio"],
+        report["profile"]["pickle_bytes"],
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
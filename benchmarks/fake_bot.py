@@ -0,0 +1,104 @@
+"""
+In-process замена Telegram Bot API для нагрузочных прогонов
+
+В отличие от ``tests.stubs.DummyBot`` подменяется не ``Bot``, а его сессия: хендлеры, шорткаты
+``callback.answer()`` и request-middleware работают с настоящим ``aiogram.Bot``, а ответы API
+синтезируются локально с настраиваемой задержкой.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+FAKE_TOKEN = "123456:fake-token-for-benchmarks"
+
+
+class FakeTelegramSession(BaseSession):
+    MESSAGE_METHODS = {"sendMessage", "sendPhoto", "editMessageText", "editMessageMedia", "editMessageCaption"}
+
+    def __init__(
+        self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0, file_content: bytes = b"", **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.jitter = jitter
+        # Отдается на любую загрузку файла (bot.download): у фейкового API нет настоящих файлов
+        self.file_content = file_content
+        self.calls: Counter[str] = Counter()
+        # Последняя клавиатура и id главного сообщения по чатам: так «пользователь» находит, куда нажимать
+        self.last_markup: dict[int, Any] = {}
+        self.last_message_id: dict[int, int] = {}
+        self._rng = random.Random(seed)
+        self._message_ids = 1_000
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType], timeout: int | None = None):
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        result: Any = True
+        if api_method in self.MESSAGE_METHODS:
+            result = self._message_result(method)
+        elif api_method == "getChat":
+            result = {"id": method.chat_id, "type": "private", "username": None}
+
+        response = self.check_response(bot, method, 200, self.json_dumps({"ok": True, "result": result}))
+        return response.result
+
+    def _message_result(self, method: TelegramMethod) -> dict:
+        chat_id = method.chat_id
+        message_id = getattr(method, "message_id", None)
+        if message_id is None:
+            self._message_ids += 1
+            message_id = self._message_ids
+
+        reply_markup = getattr(method, "reply_markup", None)
+        self.last_markup[chat_id] = reply_markup
+        self.last_message_id[chat_id] = message_id
+        return {
+            "message_id": message_id,
+            "date": int(datetime.now(timezone.utc).timestamp()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": getattr(method, "text", None) or "",
+        }
+
+    def callback_data(self, chat_id: int) -> list[str]:
+        markup = self.last_markup.get(chat_id)
+        if markup is None:
+            return []
+        return [button.callback_data for row in markup.inline_keyboard for button in row if button.callback_data]
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        self.calls["file"] += 1
+        for start in range(0, len(self.file_content), chunk_size):
+            yield self.file_content[start:start + chunk_size]
+
+    async def close(self) -> None:
+        return None
+
+
+def create_fake_bot(latency: float = 0.0, jitter: float = 0.0, seed: int = 0) -> tuple[Bot, FakeTelegramSession]:
+    session = FakeTelegramSession(latency=latency, jitter=jitter, seed=seed)
+    bot = Bot(FAKE_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    return bot, session
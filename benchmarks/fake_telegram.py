@@ -0,0 +1,236 @@
+"""
+Локальный HTTP-сервер, изображающий Telegram Bot API, для замеров сетевого пути бота без доступа к Telegram
+
+Реализует методы, которые вызывает бот, и умеет добавлять задержку, 429 и ошибки. Пример::
+
+    python -m benchmarks.fake_telegram --port 8081 --latency 0.05 --rate-limit-rate 0.01 --error-rate 0.01
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python -m datemate.main
+
+Апдейты для getUpdates подкладываются через ``POST /_updates`` (JSON-объект или список), статистика — ``GET /_stats``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+
+JSON_FIELDS = {"reply_markup", "media", "message_ids", "allowed_updates", "entities", "caption_entities"}
+
+
+@dataclass
+class FaultConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    error_rate: float = 0.0
+    seed: int | None = None
+
+
+class FakeTelegramServer:
+    def __init__(self, faults: FaultConfig | None = None):
+        self.faults = faults or FaultConfig()
+        self.calls: Counter[str] = Counter()
+        self.injected: Counter[str] = Counter()
+        self._rng = random.Random(self.faults.seed)
+        self._message_ids = 0
+        self._updates: list[dict] = []
+        self._next_update_id = 1
+        self._updates_available = asyncio.Event()
+
+        self._methods: dict[str, Callable[[dict], Awaitable[Any]]] = {
+            "getme": self.get_me,
+            "deletewebhook": self.always_true,
+            "getupdates": self.get_updates,
+            "sendmessage": self.send_message,
+            "sendphoto": self.send_message,
+            "editmessagetext": self.edit_message,
+            "editmessagemedia": self.edit_message,
+            "editmessagecaption": self.edit_message,
+            "deletemessage": self.always_true,
+            "deletemessages": self.always_true,
+            "answercallbackquery": self.always_true,
+            "getchat": self.get_chat,
+        }
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle_method)
+        app.router.add_post("/_updates", self.handle_inject_updates)
+        app.router.add_get("/_stats", self.handle_stats)
+        return app
+
+    @staticmethod
+    def _error(status: int, description: str, **parameters: Any) -> web.Response:
+        payload: dict[str, Any] = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return web.json_response(payload, status=status)
+
+    async def _read_params(self, request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+
+        params = dict(await request.post()) if request.can_read_body else {}
+        params.update(request.query)
+        for key in JSON_FIELDS & params.keys():
+            if isinstance(params[key], str):
+                params[key] = json.loads(params[key])
+        return params
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        handler = self._methods.get(method)
+        if handler is None:
+            return self._error(404, f"Not Found: method {method} is not implemented by the fake server")
+
+        self.calls[method] += 1
+        params = await self._read_params(request)
+
+        delay = self.faults.latency + (self._rng.uniform(0, self.faults.jitter) if self.faults.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        # Long polling не должен получать искусственных ошибок, иначе бот просто уйдет в backoff
+        if method != "getupdates":
+            if self._rng.random() < self.faults.rate_limit_rate:
+                self.injected["429"] += 1
+                return self._error(
+                    429,
+                    f"Too Many Requests: retry after {self.faults.retry_after}",
+                    retry_after=self.faults.retry_after,
+                )
+            if self._rng.random() < self.faults.error_rate:
+                self.injected["500"] += 1
+                return self._error(500, "Internal Server Error: injected by fake server")
+
+        return web.json_response({"ok": True, "result": await handler(params)})
+
+    async def handle_inject_updates(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.inject_updates(payload if isinstance(payload, list) else [payload])
+        return web.json_response({"ok": True})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "injected": dict(self.injected)})
+
+    def inject_updates(self, updates: list[dict]) -> None:
+        for update in updates:
+            self._updates.append({**update, "update_id": self._next_update_id})
+            self._next_update_id += 1
+        self._updates_available.set()
+
+    @staticmethod
+    def _now() -> int:
+        return int(datetime.now(timezone.utc).timestamp())
+
+    async def always_true(self, params: dict) -> bool:
+        return True
+
+    async def get_me(self, params: dict) -> dict:
+        return {"id": 123456, "is_bot": True, "first_name": "DateMate", "username": "datemate_fake_bot"}
+
+    async def get_chat(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        return {
+            "id": chat_id,
+            "type": "private",
+            "username": f"user{chat_id}",
+            "accent_color_id": 0,
+            "max_reaction_count": 0,
+            "accepted_gift_types": {
+                "unlimited_gifts": False,
+                "limited_gifts": False,
+                "unique_gifts": False,
+                "premium_subscription": False,
+            },
+        }
+
+    async def get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates:
+            self._updates_available.clear()
+            try:
+                await asyncio.wait_for(self._updates_available.wait(), timeout=float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                return []
+
+        limit = int(params.get("limit") or 100)
+        return self._updates[:limit]
+
+    def _message(self, params: dict, message_id: int | None = None) -> dict:
+        if message_id is None:
+            self._message_ids += 1
+            message_id = self._message_ids
+
+        message = {
+            "message_id": message_id,
+            "date": self._now(),
+            "chat": {"id": int(params["chat_id"]), "type": "private"},
+        }
+        media = params.get("media")
+        photo = params.get("photo") or (media.get("media") if isinstance(media, dict) else None)
+        if photo:
+            message["photo"] = [{"file_id": photo, "file_unique_id": photo, "width": 640, "height": 480}]
+            message["caption"] = params.get("caption") or (media or {}).get("caption")
+        else:
+            message["text"] = params.get("text") or ""
+        return message
+
+    async def send_message(self, params: dict) -> dict:
+        return self._message(params)
+
+    async def edit_message(self, params: dict) -> dict:
+        return self._message(params, message_id=int(params["message_id"]))
+
+
+async def start_fake_server(server: FakeTelegramServer, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+    runner = web.AppRunner(server.build_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 500")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(
+        FaultConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )
+    )
+    runner = await start_fake_server(server, args.host, args.port)
+    logging.info("Fake Telegram Bot API is listening on http://%s:%d", args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
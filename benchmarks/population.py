@@ -0,0 +1,188 @@
+"""
+Детерминированный генератор синтетической базы пользователей для бенчмарков
+
+Распределения приближены к реальным: неравномерное соотношение полов, популярность анкет по закону Ципфа
+и небольшая доля «активных свайперов», на которых приходится основная часть реакций.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import random
+from dataclasses import dataclass
+from itertools import accumulate
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from datemate.infrastructure.db import FacultyModel, LikeModel, MatchModel, UserModel
+from datemate.infrastructure.db.migrations import drop_schema
+from datemate.infrastructure.db.session import create_engine, init_db
+
+FACULTY_IDS = ("fkn", "fen", "vsb", "fgn")
+FACULTY_WEIGHTS = (0.4, 0.25, 0.2, 0.15)
+TELEGRAM_ID_OFFSET = 10_000_000
+
+
+@dataclass(frozen=True)
+class PopulationSpec:
+    users: int = 10_000
+    likes: int = 100_000
+    seed: int = 42
+    male_ratio: float = 0.55
+    like_ratio: float = 0.35
+    popularity_skew: float = 1.1
+    heavy_swiper_share: float = 0.1
+    heavy_swiper_weight: float = 0.6
+    age_range_share: float = 0.7
+    chunk_size: int = 5_000
+
+
+def _user_row(index: int, rng: random.Random, spec: PopulationSpec) -> dict:
+    sex = "M" if rng.random() < spec.male_ratio else "F"
+    search_sex = ("F" if sex == "M" else "M") if rng.random() < 0.92 else sex
+    age = min(max(int(rng.gauss(20, 2.5)), 16), 60)
+    # Большинство задает диапазон вокруг своего возраста, остальные ищут без ограничения
+    has_range = rng.random() < spec.age_range_share
+    return {
+        "id": index + 1,
+        "telegram_id": TELEGRAM_ID_OFFSET + index,
+        "name": f"User {index}",
+        "sex": sex,
+        "search_sex": search_sex,
+        "language": rng.choices(("ru", "en", "fr"), weights=(0.85, 0.12, 0.03))[0],
+        "age": age,
+        "min_age": max(age - rng.randint(1, 3), 16) if has_range else None,
+        "max_age": age + rng.randint(2, 5) if has_range else None,
+        "description": "benchmark profile",
+        "username": f"user{index}" if rng.random() < 0.8 else None,
+        "faculty_id": rng.choices(FACULTY_IDS, weights=FACULTY_WEIGHTS)[0],
+        "photo_ids": json.dumps([f"photo_{index}"]),
+    }
+
+
+def generate_users(spec: PopulationSpec) -> list[dict]:
+    rng = random.Random(spec.seed)
+    return [_user_row(index, rng, spec) for index in range(spec.users)]
+
+
+def _swipe_budgets(spec: PopulationSpec, rng: random.Random) -> list[int]:
+    heavy = max(1, int(spec.users * spec.heavy_swiper_share))
+    weights = [
+        spec.heavy_swiper_weight / heavy if index < heavy else (1 - spec.heavy_swiper_weight) / max(spec.users - heavy, 1)
+        for index in range(spec.users)
+    ]
+    rng.shuffle(weights)
+    # Пользователь не может оценить больше анкет, чем есть в базе
+    return [min(int(round(weight * spec.likes)), spec.users - 1) for weight in weights]
+
+
+def generate_likes(spec: PopulationSpec, users: list[dict]) -> Iterator[dict]:
+    rng = random.Random(spec.seed + 1)
+    budgets = _swipe_budgets(spec, rng)
+
+    # Популярность анкет по Ципфу: ранг случайный, вес 1 / rank^skew
+    ranks = list(range(1, spec.users + 1))
+    rng.shuffle(ranks)
+    popularity = [1 / rank ** spec.popularity_skew for rank in ranks]
+
+    pools: dict[str, tuple[list[int], list[float]]] = {}
+    for sex in ("M", "F"):
+        ids = [user["id"] for user in users if user["sex"] == sex]
+        pools[sex] = (ids, list(accumulate(popularity[user_id - 1] for user_id in ids)))
+
+    for liker, budget in zip(users, budgets):
+        ids, cumulative = pools[liker["search_sex"]]
+        if not ids or budget <= 0:
+            continue
+
+        budget = min(budget, len(ids) - 1)
+        seen: set[int] = set()
+        attempts = 0
+        while len(seen) < budget and attempts < budget * 4:
+            attempts += 1
+            target_id = ids[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+            if target_id == liker["id"] or target_id in seen:
+                continue
+            seen.add(target_id)
+            # Популярные анкеты лайкают чаще
+            like_probability = min(spec.like_ratio * (1 + popularity[target_id - 1] * 10), 0.95)
+            yield {"liker_id": liker["id"], "target_id": target_id, "is_like": rng.random() < like_probability}
+
+
+def _chunks(rows, size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def load_population(engine: AsyncEngine, spec: PopulationSpec) -> dict[str, int]:
+    """Пересоздает схему и заливает синтетическую базу; возвращает количество строк по таблицам"""
+    async with engine.begin() as conn:
+        await conn.run_sync(drop_schema)
+    await init_db(engine)
+
+    users = generate_users(spec)
+    started = perf_counter()
+    async with engine.begin() as conn:
+        for chunk in _chunks(users, spec.chunk_size):
+            await conn.execute(insert(UserModel), chunk)
+
+        for chunk in _chunks(generate_likes(spec, users), spec.chunk_size):
+            await conn.execute(insert(LikeModel), chunk)
+
+        # Мэтчи строятся из взаимных лайков на стороне базы, чтобы не держать все пары в памяти
+        await conn.execute(
+            text(
+                "INSERT INTO matches (user_left_id, user_right_id) "
+                "SELECT a.liker_id, a.target_id FROM likes a "
+                "JOIN likes b ON b.liker_id = a.target_id AND b.target_id = a.liker_id "
+                "WHERE a.is_like AND b.is_like AND a.liker_id < a.target_id"
+            )
+        )
+
+    counts = {}
+    async with engine.connect() as conn:
+        for model in (FacultyModel, UserModel, LikeModel, MatchModel):
+            counts[model.__tablename__] = (await conn.execute(select(func.count()).select_from(model))).scalar_one()
+    logging.info("Loaded population %s in %.1fs: %s", spec, perf_counter() - started, counts)
+    return counts
+
+
+def add_population_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=PopulationSpec.users)
+    parser.add_argument("--likes", type=int, default=PopulationSpec.likes)
+    parser.add_argument("--seed", type=int, default=PopulationSpec.seed)
+
+
+def spec_from_arguments(args: argparse.Namespace) -> PopulationSpec:
+    return PopulationSpec(users=args.users, likes=args.likes, seed=args.seed)
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic DateMate population")
+    add_population_arguments(parser)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    try:
+        await load_population(engine, spec_from_arguments(args))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
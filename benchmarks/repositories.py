@@ -0,0 +1,252 @@
+"""
+Микробенчмарки методов UserRepository и MatchRepository на синтетической базе
+
+Пример::
+
+    python -m benchmarks.repositories --users 100000 --likes 10000000 --output results.json
+    python -m benchmarks.repositories --skip-load --compare results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import subprocess
+from datetime import datetime, timezone
+from statistics import quantiles
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.population import (
+    TELEGRAM_ID_OFFSET,
+    PopulationSpec,
+    add_population_arguments,
+    load_population,
+    spec_from_arguments,
+)
+from datemate.infrastructure.db import LikeModel, UserModel
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.ranking import RankingEngine
+from datemate.infrastructure.user_index import UserIndex
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+
+# Бенчмарк готовит аргументы (в замер не входит) и возвращает замеряемый вызов или None, если он неприменим
+BenchCall = Callable[[AsyncSession, random.Random, int], Awaitable[Callable[[], Awaitable[object]] | None]]
+
+
+def summarize(durations: list[float], statements: list[int]) -> dict[str, float]:
+    cuts = quantiles(durations, n=100, method="inclusive") if len(durations) > 1 else durations * 99
+    return {
+        "calls": len(durations),
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "mean_ms": sum(durations) / len(durations) * 1000,
+        "statements_per_call": sum(statements) / len(statements),
+    }
+
+
+async def bench_get_by_telegram_id(session, rng, users):
+    telegram_id = TELEGRAM_ID_OFFSET + rng.randrange(users)
+    return lambda: UserRepository(session).get_by_telegram_id(telegram_id)
+
+
+async def bench_get_by_id(session, rng, users):
+    user_id = rng.randint(1, users)
+    return lambda: UserRepository(session).get_by_id(user_id)
+
+
+async def bench_upsert_user(session, rng, users):
+    user = await UserRepository(session).get_by_id(rng.randint(1, users))
+    return lambda: UserRepository(session).upsert_user(
+        telegram_id=user.telegram_id,
+        username=user.username,
+        name=user.name,
+        sex=user.sex,
+        search_sex=user.search_sex,
+        language=user.language,
+        age=user.age,
+        faculty_id=user.faculty_id,
+        description=user.description,
+        photo_ids=user.photos,
+    )
+
+
+async def bench_get_next_candidate(session, rng, users):
+    user = await UserRepository(session).get_by_id(rng.randint(1, users))
+    return lambda: MatchRepository(session).get_next_candidate(user)
+
+
+async def bench_ranking_pick(session, rng, users):
+    ranking = session.info.get("ranking")
+    if ranking is None:
+        return None
+
+    user = await UserRepository(session).get_by_id(rng.randint(1, users))
+    rated_ids = (await session.execute(select(LikeModel.target_id).where(LikeModel.liker_id == user.id))).scalars().all()
+
+    async def call():
+        return ranking.pick(user, rated_ids)
+
+    return call
+
+
+async def bench_set_reaction(session, rng, users):
+    liker_id = rng.randint(1, users)
+    target_id = rng.randint(1, users)
+    if target_id == liker_id:
+        target_id = target_id % users + 1
+    is_like = rng.random() < 0.5
+    return lambda: MatchRepository(session).set_reaction(liker_id, target_id, is_like=is_like)
+
+
+async def bench_count_matches(session, rng, users):
+    user_id = rng.randint(1, users)
+    return lambda: MatchRepository(session).count_matches(user_id)
+
+
+async def bench_list_matches(session, rng, users):
+    user_id = rng.randint(1, users)
+    return lambda: MatchRepository(session).list_matches(user_id, offset=0, limit=1)
+
+
+BENCHMARKS: dict[str, BenchCall] = {
+    "UserRepository.get_by_telegram_id": bench_get_by_telegram_id,
+    "UserRepository.get_by_id": bench_get_by_id,
+    "UserRepository.upsert_user": bench_upsert_user,
+    "MatchRepository.get_next_candidate": bench_get_next_candidate,
+    "RankingEngine.pick": bench_ranking_pick,
+    "MatchRepository.set_reaction": bench_set_reaction,
+    "MatchRepository.count_matches": bench_count_matches,
+    "MatchRepository.list_matches": bench_list_matches,
+}
+
+
+async def run_benchmarks(
+    session_factory: async_sessionmaker[AsyncSession],
+    instrumentation: QueryInstrumentation,
+    iterations: int,
+    seed: int,
+    only: set[str] | None = None,
+) -> dict[str, dict[str, float]]:
+    async with session_factory() as session:
+        users = (await session.execute(select(func.max(UserModel.id)))).scalar_one() or 0
+    if not users:
+        raise RuntimeError("Population is empty, run without --skip-load first")
+
+    results = {}
+    for name, prepare in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+
+        rng = random.Random(seed)
+        durations: list[float] = []
+        statements: list[int] = []
+        for _ in range(iterations):
+            async with session_factory() as session:
+                call = await prepare(session, rng, users)
+                if call is None:
+                    break
+                with instrumentation.scope(name) as stats:
+                    started = perf_counter()
+                    await call()
+                    durations.append(perf_counter() - started)
+            statements.append(stats.statements)
+
+        if not durations:
+            continue
+        results[name] = summarize(durations, statements)
+        logging.info("%s: %s", name, results[name])
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict) -> list[str]:
+    lines = []
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            continue
+        lines.append(
+            f"{name}: p50 {before['p50_ms']:.2f} -> {result['p50_ms']:.2f}ms, "
+            f"p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f}ms, "
+            f"statements {before['statements_per_call']:.1f} -> {result['statements_per_call']:.1f}"
+        )
+    return lines
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark DateMate repositories")
+    add_population_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the population already in the database")
+    parser.add_argument("--only", action="append", help="benchmark name, may be repeated")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    parser.add_argument(
+        "--no-ranking", action="store_true", help="pick candidates with the plain SQL query, without the user index"
+    )
+    args = parser.parse_args()
+
+    spec: PopulationSpec = spec_from_arguments(args)
+    # Порог медленных запросов не нужен: инструментация используется только для подсчета запросов
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"), n_plus_one_threshold=10**9)
+    engine = create_engine(args.database_url, instrumentation=instrumentation)
+    try:
+        if not args.skip_load:
+            await load_population(engine, spec)
+        session_factory = await init_db(engine)
+        if not args.no_ranking:
+            user_index = UserIndex()
+            await user_index.refresh(session_factory)
+            session_factory.configure(
+                info={"user_index": user_index, "ranking": RankingEngine(user_index, seed=args.seed)}
+            )
+        results = await run_benchmarks(
+            session_factory, instrumentation, args.iterations, args.seed, set(args.only) if args.only else None
+        )
+    finally:
+        await engine.dispose()
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "database": engine.dialect.name,
+            "users": spec.users,
+            "likes": spec.likes,
+            "seed": spec.seed,
+            "iterations": args.iterations,
+            "ranking": not args.no_ranking,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous:
+            for line in compare(json.load(previous), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
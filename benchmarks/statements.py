@@ -0,0 +1,149 @@
+"""
+Процессорное время горячих методов репозиториев: готовые запросы против собранных на каждый вызов
+
+Горячие запросы ``repositories`` собираются один раз (функции под ``@cache``) и получают значения связанными
+параметрами. Бенчмарк замеряет ``time.process_time`` на вызов ``get_next_candidate``, ``set_reaction`` и
+``list_matches`` в двух режимах: как есть и с подмененными функциями, которые строят запрос заново на каждый вызов,
+как репозитории делали раньше. Отдельно замеряется только подготовка запроса — построение и ключ кэша компиляции,
+то есть то, что SQLAlchemy делает в Python до обращения к базе.
+
+Пример::
+
+    python -m benchmarks.statements --users 10000 --likes 100000 --iterations 500 --output statements.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from contextlib import contextmanager
+from time import process_time
+from unittest import mock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.population import PopulationSpec, add_population_arguments, load_population, spec_from_arguments
+from benchmarks.repositories import BENCHMARKS
+from datemate.infrastructure import repositories
+from datemate.infrastructure.db import UserModel
+from datemate.infrastructure.db.session import create_engine, init_db
+
+HOT_METHODS = ("MatchRepository.get_next_candidate", "MatchRepository.set_reaction", "MatchRepository.list_matches")
+
+
+def statement_builders() -> dict[str, object]:
+    return {
+        name: value
+        for name, value in vars(repositories).items()
+        if callable(value) and hasattr(value, "cache_info") and hasattr(value, "__wrapped__")
+    }
+
+
+@contextmanager
+def rebuilt_statements():
+    """Каждая функция-запрос строит конструкцию заново, как до кэширования"""
+    rebuilt = {name: builder.__wrapped__ for name, builder in statement_builders().items()}
+    with mock.patch.multiple(repositories, **rebuilt):
+        yield
+
+
+def _builder_args(name: str, builder) -> tuple:
+    # Все варианты, кроме profile_by, выбираются флагами
+    return ("id",) if name == "profile_by" else (False,) * builder.__wrapped__.__code__.co_argcount
+
+
+def measure_preparation(iterations: int) -> dict[str, dict[str, float]]:
+    """Микросекунды на построение запроса и его ключ кэша"""
+    results = {}
+    for name, builder in statement_builders().items():
+        args = _builder_args(name, builder)
+        timings = {}
+        for mode, build in (("rebuilt", builder.__wrapped__), ("prebuilt", builder)):
+            started = process_time()
+            for _ in range(iterations):
+                stmt = build(*args)
+                if hasattr(stmt, "_generate_cache_key"):
+                    stmt._generate_cache_key()
+            timings[f"{mode}_us"] = (process_time() - started) / iterations * 1e6
+        results[name] = timings
+    return results
+
+
+async def measure_calls(session_factory, iterations: int, seed: int) -> dict[str, float]:
+    async with session_factory() as session:
+        users = (await session.execute(select(func.max(UserModel.id)))).scalar_one()
+
+    results = {}
+    for name in HOT_METHODS:
+        prepare = BENCHMARKS[name]
+        rng = random.Random(seed)
+        # Прогрев: кэш компиляции и пул соединений заполняются до замера
+        async with session_factory() as session:
+            await (await prepare(session, rng, users))()
+
+        spent = 0.0
+        for _ in range(iterations):
+            async with session_factory() as session:
+                call = await prepare(session, rng, users)
+                started = process_time()
+                await call()
+                spent += process_time() - started
+        results[name] = spent / iterations * 1e6
+    return results
+
+
+async def run(engine: AsyncEngine, spec: PopulationSpec, iterations: int, seed: int) -> dict:
+    await load_population(engine, spec)
+    session_factory = await init_db(engine)
+
+    # Холостой проход: set_reaction в обоих замерах обновляет уже вставленные пары, а не вставляет новые
+    await measure_calls(session_factory, iterations, seed)
+    with rebuilt_statements():
+        rebuilt = await measure_calls(session_factory, iterations, seed)
+    prebuilt = await measure_calls(session_factory, iterations, seed)
+    return {
+        "calls": {
+            name: {
+                "rebuilt_us": rebuilt[name],
+                "prebuilt_us": prebuilt[name],
+                "saved_share": 1 - prebuilt[name] / rebuilt[name] if rebuilt[name] else 0,
+            }
+            for name in HOT_METHODS
+        },
+        "preparation": measure_preparation(iterations),
+    }
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Compare CPU per call with prebuilt and rebuilt statements")
+    add_population_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    try:
+        report = await run(engine, spec_from_arguments(args), args.iterations, args.seed)
+    finally:
+        await engine.dispose()
+
+    for name, result in report["calls"].items():
+        logging.info(
+            "%s: %.0fus -> %.0fus CPU per call (%.0f%% less)",
+            name,
+            result["rebuilt_us"],
+            result["prebuilt_us"],
+            result["saved_share"] * 100,
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,87 @@
+"""
+Пакетный расчет подсказок на синтетической базе
+
+Заливает базу, считает подсказки для всех пользователей, затем меняет анкеты у доли ``--changed-share``
+пользователей и повторяет расчет: второй проход должен пересчитать только их. В отчете — время и скорость
+обоих проходов и число записанных подсказок.
+
+Пример::
+
+    python -m benchmarks.suggestions --users 100000 --likes 1000000 --workers 4 --output suggestions.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+from dataclasses import asdict
+from time import perf_counter
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.population import PopulationSpec, add_population_arguments, load_population, spec_from_arguments
+from datemate.infrastructure.db import UserModel
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.suggestions import SuggestionPolicy, precompute_suggestions
+
+
+async def _timed_pass(session_factory, policy: SuggestionPolicy) -> dict:
+    started = perf_counter()
+    stats = await precompute_suggestions(session_factory, policy)
+    elapsed = perf_counter() - started
+    return {**asdict(stats), "seconds": elapsed, "users_per_second": stats.computed / elapsed if elapsed else 0}
+
+
+async def run(engine: AsyncEngine, spec: PopulationSpec, policy: SuggestionPolicy, changed_share: float) -> dict:
+    await load_population(engine, spec)
+    session_factory = await init_db(engine)
+
+    full = await _timed_pass(session_factory, policy)
+
+    changed = random.Random(spec.seed).sample(range(1, spec.users + 1), int(spec.users * changed_share))
+    async with session_factory() as session, session.begin():
+        await session.execute(update(UserModel).where(UserModel.id.in_(changed)).values(age=UserModel.age + 1))
+
+    incremental = await _timed_pass(session_factory, policy)
+    return {"users": spec.users, "changed": len(changed), "full": full, "incremental": incremental}
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch match-suggestion precomputation")
+    add_population_arguments(parser)
+    parser.add_argument("--workers", type=int, default=None, help="processes in the pool, CPU count by default")
+    parser.add_argument("--top-n", type=int, default=SuggestionPolicy.top_n)
+    parser.add_argument("--chunk-size", type=int, default=SuggestionPolicy.chunk_size)
+    parser.add_argument("--changed-share", type=float, default=0.01)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    policy = SuggestionPolicy(top_n=args.top_n, chunk_size=args.chunk_size, workers=args.workers)
+    engine = create_engine(args.database_url)
+    try:
+        report = await run(engine, spec_from_arguments(args), policy, args.changed_share)
+    finally:
+        await engine.dispose()
+
+    for name in ("full", "incremental"):
+        result = report[name]
+        logging.info(
+            "%s pass: %d users computed, %d suggestions in %.1fs (%.0f users/s)",
+            name,
+            result["computed"],
+            result["rows"],
+            result["seconds"],
+            result["users_per_second"],
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
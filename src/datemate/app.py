@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from functools import partial
+from typing import TYPE_CHECKING
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from datemate.config import Settings
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.liked_me import LikedMeSets
+from datemate.infrastructure.match_events import MatchEventQueue
+from datemate.infrastructure.metrics import MetricsRegistry, log_metrics, start_metrics_server
+from datemate.infrastructure.rejections import RejectionPolicy, compact_rejections
+from datemate.infrastructure.scheduler import Scheduler
+from datemate.startup import StartupTimer
+from datemate.tgbot.functional import CandidatePrefetcher, MessageDeletionQueue, Phrases
+from datemate.tgbot.functional.notifications import MatchNotifier
+from datemate.tgbot.handlers.matchmaking import router as matchmaking_router
+from datemate.tgbot.handlers.registration import router as registration_router
+from datemate.tgbot.middlewares.db import DbSessionMiddleware
+from datemate.tgbot.middlewares.interface import InterfaceMiddleware
+from datemate.tgbot.middlewares.metrics import (
+    BotApiMetricsMiddleware,
+    MetricsMiddleware,
+    QueryStatsMiddleware,
+    TimedStorage,
+)
+from datemate.tgbot.session import BotSessionStats, create_bot_session
+
+if TYPE_CHECKING:
+    from datemate.infrastructure.ranking import RankingEngine, RankingWeights
+    from datemate.infrastructure.suggestions import SuggestionPolicy
+    from datemate.infrastructure.user_index import UserIndex
+
+
+def build_dispatcher(
+    session_factory: async_sessionmaker[AsyncSession],
+    phrases: Phrases,
+    storage: BaseStorage,
+    deletion_queue: MessageDeletionQueue | None = None,
+    metrics: MetricsRegistry | None = None,
+    sql_instrumentation: QueryInstrumentation | None = None,
+) -> Dispatcher:
+    dp = Dispatcher(storage=storage, phrases=phrases, prefetcher=CandidatePrefetcher())
+    dp.include_router(registration_router)
+    dp.include_router(matchmaking_router)
+
+    if metrics:
+        # Регистрируется первой, чтобы учитывать и работу остальных middleware
+        dp.message.middleware(MetricsMiddleware(metrics))
+        dp.callback_query.middleware(MetricsMiddleware(metrics))
+
+    if sql_instrumentation:
+        dp.message.middleware(QueryStatsMiddleware(sql_instrumentation))
+        dp.callback_query.middleware(QueryStatsMiddleware(sql_instrumentation))
+
+    dp.message.middleware(DbSessionMiddleware(session_factory))
+    dp.callback_query.middleware(DbSessionMiddleware(session_factory))
+    dp.message.middleware(InterfaceMiddleware(phrases, deletion_queue))
+    dp.callback_query.middleware(InterfaceMiddleware(phrases, deletion_queue))
+    return dp
+
+
+def create_storage(settings: Settings) -> BaseStorage:
+    if settings.fsm_storage == "redis":
+        # redis подтягивается только когда выбран этот бэкенд
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(settings.redis_url)
+    return MemoryStorage()
+
+
+def create_match_event_queue(settings: Settings) -> MatchEventQueue:
+    if settings.match_events_storage == "redis":
+        from redis.asyncio import Redis
+
+        from datemate.infrastructure.match_events import RedisMatchEventQueue
+
+        return RedisMatchEventQueue(Redis.from_url(settings.redis_url))
+    return MatchEventQueue()
+
+
+def create_liked_me(settings: Settings) -> LikedMeSets:
+    from redis.asyncio import Redis
+
+    # Без таймаутов недоступный по сети Redis подвешивает свайп вместо перехода на SQL
+    redis = Redis.from_url(
+        settings.redis_url,
+        socket_connect_timeout=settings.liked_me_timeout,
+        socket_timeout=settings.liked_me_timeout,
+    )
+    return LikedMeSets(redis, ttl=settings.liked_me_ttl, limit=settings.liked_me_limit)
+
+
+def ranking_weights(settings: Settings) -> RankingWeights:
+    from datemate.infrastructure.ranking import RankingWeights
+
+    return RankingWeights(
+        faculty=settings.ranking_faculty_weight,
+        age=settings.ranking_age_weight,
+        popularity=settings.ranking_popularity_weight,
+        recency=settings.ranking_recency_weight,
+        top_k=settings.ranking_top_k,
+        temperature=settings.ranking_temperature,
+    )
+
+
+def create_ranking(settings: Settings) -> tuple[UserIndex, RankingEngine]:
+    # numpy подгружается только при включенном ранжировании или подсказках
+    from datemate.infrastructure.ranking import RankingEngine
+    from datemate.infrastructure.user_index import UserIndex
+
+    # Индекс загружается в фоне (см. run): пока он не готов, поиск идет через SQL
+    user_index = UserIndex()
+    return user_index, RankingEngine(user_index, ranking_weights(settings))
+
+
+def create_suggestion_policy(settings: Settings) -> SuggestionPolicy:
+    from datemate.infrastructure.suggestions import SuggestionPolicy
+
+    return SuggestionPolicy(
+        top_n=settings.suggestions_top_n,
+        workers=settings.suggestions_workers,
+        max_age=timedelta(hours=settings.suggestions_max_age_hours),
+        active_within=timedelta(days=settings.suggestions_active_days),
+        weights=ranking_weights(settings),
+    )
+
+
+def create_rejection_policy(settings: Settings) -> RejectionPolicy:
+    expiry = settings.rejection_expiry_days
+    return RejectionPolicy(
+        compact_after=timedelta(days=settings.rejection_compact_after_days),
+        period=timedelta(days=settings.rejection_period_days),
+        expiry=timedelta(days=expiry) if expiry else None,
+    )
+
+
+async def run(settings: Settings, timer: StartupTimer, profile_only: bool = False) -> None:
+    with timer.phase("phrases"):
+        phrases = Phrases()
+    metrics = MetricsRegistry() if settings.metrics_enabled else None
+
+    sql_instrumentation = None
+    if settings.sql_instrumentation_enabled:
+        sql_instrumentation = QueryInstrumentation(settings.slow_query_ms, settings.n_plus_one_threshold)
+
+    with timer.phase("db_init"):
+        engine_options = {"instrumentation": sql_instrumentation, "track_updates": metrics is not None}
+        engine = create_engine(settings.database_url, **engine_options)
+        replicas = [create_engine(url, **engine_options) for url in settings.database_replica_urls]
+        session_factory = await init_db(
+            engine,
+            check_indexes=settings.db_check_indexes,
+            replicas=replicas,
+            read_your_writes=settings.replica_read_your_writes,
+        )
+
+    # Репозитории берут общие на процесс сервисы из session.info
+    session_info = dict(session_factory.kw.get("info") or {})
+    user_index = None
+    if settings.ranking_enabled:
+        with timer.phase("ranking"):
+            user_index, ranking = create_ranking(settings)
+        session_info.update(user_index=user_index, ranking=ranking)
+    rejection_policy = None
+    if settings.rejection_compaction_enabled:
+        rejection_policy = session_info["rejections"] = create_rejection_policy(settings)
+    notifier = None
+    if settings.match_notifications_enabled:
+        match_events = session_info["match_events"] = create_match_event_queue(settings)
+        notifier = MatchNotifier(
+            match_events,
+            session_factory,
+            phrases,
+            workers=settings.match_notification_workers,
+            min_interval=1 / settings.match_notification_rate,
+            max_retries=settings.match_notification_retries,
+        )
+    suggestion_policy = None
+    if settings.suggestions_enabled:
+        suggestion_policy = session_info["suggestions"] = create_suggestion_policy(settings)
+    liked_me = None
+    if settings.liked_me_enabled:
+        liked_me = session_info["liked_me"] = create_liked_me(settings)
+    if session_info:
+        session_factory.configure(info=session_info)
+
+    with timer.phase("storage"):
+        storage = create_storage(settings)
+    if metrics:
+        storage = TimedStorage(storage)
+
+    session_stats = None
+    if metrics:
+        session_stats = BotSessionStats()
+        metrics.add_collector(session_stats.prometheus_lines)
+    bot_session = create_bot_session(settings, session_stats)
+
+    bot = Bot(settings.bot_token, session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    if metrics:
+        bot.session.middleware(BotApiMetricsMiddleware(metrics))
+
+    deletion_queue = MessageDeletionQueue()
+    with timer.phase("routers"):
+        dp = build_dispatcher(session_factory, phrases, storage, deletion_queue, metrics, sql_instrumentation)
+
+    if profile_only:
+        timer.log()
+        if notifier:
+            await notifier.close()
+        if liked_me:
+            await liked_me.close()
+        await storage.close()
+        await bot.session.close()
+        for db_engine in (engine, *replicas):
+            await db_engine.dispose()
+        return
+
+    # Вся периодическая работа идет через планировщик с общим лимитом одновременных запусков
+    scheduler = Scheduler(settings.scheduler_max_concurrency, settings.scheduler_drain_timeout)
+    if user_index is not None:
+        # Первая загрузка индекса не задерживает старт поллинга
+        refresh_index = partial(user_index.refresh, session_factory)
+        if settings.ranking_refresh_interval:
+            scheduler.every("user_index_refresh", settings.ranking_refresh_interval, refresh_index, first_run=0)
+        else:
+            scheduler.once("user_index_load", refresh_index)
+    if rejection_policy is not None:
+        scheduler.every(
+            "rejection_compaction",
+            settings.rejection_compaction_interval,
+            partial(compact_rejections, session_factory, rejection_policy),
+            first_run=0,
+        )
+    if suggestion_policy is not None:
+        from datemate.infrastructure.suggestions import precompute_suggestions
+
+        scheduler.every(
+            "suggestion_precompute",
+            settings.suggestions_interval,
+            partial(precompute_suggestions, session_factory, suggestion_policy),
+            first_run=0,
+        )
+    if liked_me is not None:
+        # Множества доверяют метке поколения в памяти процесса, поэтому ими пользуется только один процесс бота
+        await liked_me.acquire()
+        scheduler.every("liked_me_lease", liked_me.lease / 3, liked_me.claim, jitter=0)
+    metrics_runner = None
+    if metrics:
+        metrics.add_collector(scheduler.prometheus_lines)
+        if settings.metrics_port:
+            metrics_runner = await start_metrics_server(metrics, settings.metrics_host, settings.metrics_port)
+        if settings.metrics_log_interval:
+            scheduler.every("metrics_log", settings.metrics_log_interval, partial(log_metrics, metrics), jitter=0)
+    scheduler.start()
+
+    if notifier:
+        await notifier.start(bot)
+
+    await bot.delete_webhook(drop_pending_updates=True)
+    timer.log()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        if notifier:
+            await notifier.close()
+        await deletion_queue.close()
+        await scheduler.close()
+        if liked_me:
+            await liked_me.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await storage.close()
+        await bot.session.close()
+        for db_engine in (engine, *replicas):
+            await db_engine.dispose()
@@ -1,15 +1,110 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, model_validator
 from dotenv import load_dotenv
 
 
 class Settings(BaseSettings):
     bot_token: str = Field(...)
-    redis_url: str = Field(...)
+    # FSM-хранилище: memory или redis (тогда нужен redis_url)
+    fsm_storage: Literal["memory", "redis"] = "memory"
+    redis_url: str | None = None
     database_url: str = Field(...)
+    # Реплики для чтений репозиториев (JSON-список URL). Пользователь, который только что писал, читает из основной
+    # базы еще replica_read_your_writes секунд
+    database_replica_urls: list[str] = []
+    replica_read_your_writes: float = 5
+    # Сверять индексы базы при каждом старте, а не только после применения миграций
+    db_check_indexes: bool = False
+    # Альтернативный адрес Bot API, например локальный benchmarks.fake_telegram
+    telegram_api_url: str | None = None
+
+    # HTTP-сессия Bot API: пул соединений, keep-alive, DNS-кэш, таймауты (секунды) и orjson, если установлен
+    bot_connection_limit: int = 100
+    bot_connection_limit_per_host: int = 0
+    bot_keepalive_timeout: float = 60
+    bot_dns_cache_ttl: int = 3600
+    bot_request_timeout: float = 60
+    bot_connect_timeout: float | None = 10
+    bot_fast_json: bool = True
+
+    # Ранжирование кандидатов (NumPy) по индексу анкет в памяти: веса скоринга, размер top-K для выбора.
+    # Индекс обновляется точечно, полная перезагрузка из БД раз в ranking_refresh_interval секунд
+    ranking_enabled: bool = True
+    ranking_refresh_interval: float = 3600
+    ranking_faculty_weight: float = 1.0
+    ranking_age_weight: float = 1.0
+    ranking_popularity_weight: float = 0.5
+    ranking_recency_weight: float = 0.5
+    ranking_top_k: int = 20
+    ranking_temperature: float = 0.3
+
+    # Сжатие дизлайков старше rejection_compact_after_days в наборы отказов по периодам rejection_period_days.
+    # Компактор запускается раз в rejection_compaction_interval секунд; без rejection_expiry_days отказы не истекают.
+    # Если выключить после сжатия, сжатые отказы перестанут учитываться в поиске
+    rejection_compaction_enabled: bool = False
+    rejection_compact_after_days: float = 7
+    rejection_period_days: float = 30
+    rejection_expiry_days: float | None = None
+    rejection_compaction_interval: float = 3600
+
+    # Уведомление второй стороны о мэтче в фоне: очередь в памяти или в Redis (redis_url), пул воркеров с общим лимитом
+    # сообщений в секунду и повторами при 429 и ошибках сети
+    match_notifications_enabled: bool = True
+    match_events_storage: Literal["memory", "redis"] = "memory"
+    match_notification_workers: int = 4
+    match_notification_rate: float = 25
+    match_notification_retries: int = 3
+
+    # Множества «кто меня лайкнул» в Redis (redis_url) для проверки встречного лайка и приоритета кандидатов.
+    # Множество живет liked_me_ttl секунд с пересборки; больше liked_me_limit лайков — приоритет считает SQL.
+    # Команда дольше liked_me_timeout секунд считается сбоем Redis
+    liked_me_enabled: bool = False
+    liked_me_ttl: float = 86400
+    liked_me_limit: int = 500
+    liked_me_timeout: float = 0.5
+
+    # Пакетный расчет подсказок: раз в suggestions_interval секунд top-N кандидатов для активных пользователей
+    # (реагировали за suggestions_active_days) считаются в пуле процессов и выдаются поиском после лайкнувших.
+    # Пересчитываются только пользователи с изменившейся анкетой или реакциями и подсказки старше
+    # suggestions_max_age_hours. Скоринг — веса ranking_*
+    suggestions_enabled: bool = False
+    suggestions_interval: float = 900
+    suggestions_top_n: int = 30
+    suggestions_workers: int | None = None
+    suggestions_max_age_hours: float = 24
+    suggestions_active_days: float = 30
+
+    # Фоновые задачи: сколько может выполняться одновременно и сколько секунд ждать начатые при остановке
+    scheduler_max_concurrency: int = 2
+    scheduler_drain_timeout: float = 10
+
+    metrics_enabled: bool = True
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int | None = None
+    metrics_log_interval: float = 300
+
+    sql_instrumentation_enabled: bool = False
+    slow_query_ms: float = 200
+    n_plus_one_threshold: int = 3
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
+    @model_validator(mode="after")
+    def _require_redis_url(self) -> "Settings":
+        # Без этой проверки Redis.from_url(None) падает уже в run() с непонятной ошибкой
+        features = []
+        if self.fsm_storage == "redis":
+            features.append("FSM_STORAGE=redis")
+        if self.match_notifications_enabled and self.match_events_storage == "redis":
+            features.append("MATCH_EVENTS_STORAGE=redis")
+        if self.liked_me_enabled:
+            features.append("LIKED_ME_ENABLED=true")
+        if features and not self.redis_url:
+            raise ValueError(f"REDIS_URL is required for {', '.join(features)}")
+        return self
+
 
 def load_settings() -> Settings:
     load_dotenv()
@@ -1,3 +1,5 @@
 from .faculty import Faculty
+from .match import Match, Reaction
+from .user import UserProfile
 
-__all__ = ["Faculty"]
+__all__ = ["Faculty", "Match", "Reaction", "UserProfile"]
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True, slots=True)
+class Reaction:
+    id: int
+    liker_id: int
+    target_id: int
+    is_like: bool
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    id: int
+    user_left_id: int
+    user_right_id: int
+    created_at: datetime
+
+    def other_id(self, user_id: int) -> int:
+        return self.user_right_id if self.user_left_id == user_id else self.user_left_id
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """
+    Снимок анкеты без связи с сессией
+
+    Репозитории собирают его прямо из строки запроса, поэтому обращение к полю после закрытия сессии не ходит в базу
+    """
+
+    id: int
+    telegram_id: int
+    name: str
+    sex: str
+    search_sex: str
+    language: str
+    age: int
+    description: str | None
+    username: str | None
+    faculty_id: str
+    faculty_name: str | None
+    photos: tuple[str, ...] = ()
+    # Интересующий возраст; None — без ограничения
+    min_age: int | None = None
+    max_age: int | None = None
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import Protocol, TYPE_CHECKING
+from typing import Iterable, Protocol, TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from datemate.infrastructure.db import FacultyModel, LikeModel, MatchModel, UserModel
+    from datemate.domain.entities import Match, Reaction, UserProfile
+    from datemate.infrastructure.db import FacultyModel
 
 
 class FacultyRepository(Protocol):
@@ -15,10 +16,10 @@ class FacultyRepository(Protocol):
 
 
 class UserRepository(Protocol):
-    async def get_by_telegram_id(self, telegram_id: int) -> UserModel | None:
+    async def get_by_telegram_id(self, telegram_id: int) -> UserProfile | None:
         ...
 
-    async def get_by_id(self, user_id: int) -> UserModel | None:
+    async def get_by_id(self, user_id: int) -> UserProfile | None:
         ...
 
     async def upsert_user(
@@ -33,15 +34,17 @@ class UserRepository(Protocol):
         faculty_id: str,
         description: str,
         photo_ids: list[str],
-    ) -> UserModel:
+        min_age: int | None = None,
+        max_age: int | None = None,
+    ) -> UserProfile:
         ...
 
 
 class MatchRepository(Protocol):
-    async def get_next_candidate(self, user: UserModel) -> UserModel | None:
+    async def get_next_candidate(self, user: UserProfile, exclude_ids: Iterable[int] = ()) -> UserProfile | None:
         ...
 
-    async def set_reaction(self, liker_id: int, target_id: int, is_like: bool) -> tuple[LikeModel, bool]:
+    async def set_reaction(self, liker_id: int, target_id: int, is_like: bool) -> tuple[Reaction, bool]:
         ...
 
     async def count_matches(self, user_id: int) -> int:
@@ -49,5 +52,5 @@ class MatchRepository(Protocol):
 
     async def list_matches(
         self, user_id: int, offset: int = 0, limit: int = 1
-    ) -> tuple[list[tuple[MatchModel, UserModel]], int]:
+    ) -> tuple[list[tuple[Match, UserProfile]], int]:
         ...
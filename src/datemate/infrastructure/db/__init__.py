@@ -1,3 +1,21 @@
-from .models import Base, FacultyModel, LikeModel, MatchModel, UserModel
+from .models import (
+    Base,
+    FacultyModel,
+    LikeModel,
+    MatchModel,
+    RejectionSetModel,
+    SuggestionInputsModel,
+    SuggestionModel,
+    UserModel,
+)
 
-__all__ = ["Base", "FacultyModel", "UserModel", "LikeModel", "MatchModel"]
+__all__ = [
+    "Base",
+    "FacultyModel",
+    "UserModel",
+    "LikeModel",
+    "MatchModel",
+    "RejectionSetModel",
+    "SuggestionModel",
+    "SuggestionInputsModel",
+]
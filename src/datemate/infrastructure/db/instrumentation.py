@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from datemate.infrastructure.metrics import current_update, track
+
+_STARTED_KEY = "datemate_query_started"
+
+# Списки плейсхолдеров в IN (...) схлопываются, чтобы selectinload с разным числом id давал одну форму запроса
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|%\(\w+\)s)\s*,)+\s*(?:\?|%s|\$\d+|%\(\w+\)s)\s*\)")
+
+logger = logging.getLogger("datemate.sql")
+
+
+def instrument_engine(engine: AsyncEngine, instrumentation: QueryInstrumentation | None = None) -> None:
+    """
+    Одна пара хуков на движок: время запроса меряется один раз
+
+    Оно идет в тайминги текущего апдейта (``MetricsMiddleware``) и, если передан ``instrumentation``,
+    в статистику медленных запросов и N+1. Вне апдейта и вне ``scope`` запрос никуда не записывается
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED_KEY, []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info[_STARTED_KEY].pop()
+        track("db", elapsed)
+        timings = current_update.get()
+        if timings is not None:
+            timings.db_statements += 1
+        if instrumentation is not None:
+            instrumentation.observe(statement, parameters, elapsed)
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class QueryStats:
+    """Запросы, выполненные в рамках одного апдейта"""
+
+    __slots__ = ("handler", "statements", "elapsed", "shapes")
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.statements = 0
+        self.elapsed = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+current_queries: ContextVar[QueryStats | None] = ContextVar("current_queries", default=None)
+
+
+class QueryInstrumentation:
+    def __init__(self, slow_query_ms: float = 200, n_plus_one_threshold: int = 3):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def observe(self, statement: str, parameters, elapsed: float) -> None:
+        stats = current_queries.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.elapsed += elapsed
+            stats.shapes[statement_shape(statement)] += 1
+
+        if elapsed * 1000 >= self.slow_query_ms:
+            logger.warning(
+                "Slow query %.1fms in %s: %s %r",
+                elapsed * 1000,
+                stats.handler if stats is not None else "-",
+                " ".join(statement.split()),
+                parameters,
+            )
+
+    @contextmanager
+    def scope(self, handler: str) -> Iterator[QueryStats]:
+        stats = QueryStats(handler)
+        token = current_queries.set(stats)
+        try:
+            yield stats
+        finally:
+            current_queries.reset(token)
+            self.report(stats)
+
+    def report(self, stats: QueryStats) -> None:
+        if not stats.statements:
+            return
+
+        logger.debug("%s: %d statements, %.1fms", stats.handler, stats.statements, stats.elapsed * 1000)
+        for shape, count in stats.repeated_shapes(self.n_plus_one_threshold):
+            logger.warning("Possible N+1 in %s: %d x %s", stats.handler, count, shape)
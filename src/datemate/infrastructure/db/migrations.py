@@ -0,0 +1,352 @@
+"""
+Версионированные миграции схемы и справочников
+
+Номер примененной ревизии хранится в таблице ``schema_version``. Ревизии идемпотентны: базовая создает недостающие
+таблицы, следующие добавляют только то, чего в базе еще нет. Поэтому одинаково обновляются и свежая база, и база,
+созданная раньше через ``create_all``.
+
+Каждая ревизия описывает свои таблицы, колонки и индексы сама, в том виде, какой они имели на момент ревизии,
+и не читает модели. Иначе изменение или удаление индекса в моделях ломало бы старые ревизии.
+
+Ревизии с ``transactional=False`` выполняются в autocommit: на Postgres индексы строятся ``CONCURRENTLY``,
+без блокировки записи. Запуск вне бота::
+
+    PYTHONPATH=src python -m datemate.infrastructure.db.migrations status
+    PYTHONPATH=src python -m datemate.infrastructure.db.migrations upgrade
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from datemate.infrastructure.db.models import Base
+
+logger = logging.getLogger("datemate.migrations")
+
+version_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+DEFAULT_FACULTIES: dict[str, str] = {
+    "fkn": "ФКН",
+    "fen": "ФЭН",
+    "vsb": "ВШБ",
+    "fgn": "ФГН",
+}
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    transactional: bool = True
+
+
+def create_index(conn: Connection, index: Index) -> None:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+    if conn.dialect.name == "postgresql":
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+
+    logger.info("Creating index %s", index.name)
+    conn.exec_driver_sql(ddl)
+
+
+def drop_index(conn: Connection, table_name: str, name: str) -> None:
+    if name not in {index["name"] for index in inspect(conn).get_indexes(table_name)}:
+        return
+    concurrently = " CONCURRENTLY" if conn.dialect.name == "postgresql" else ""
+    logger.info("Dropping index %s", name)
+    conn.exec_driver_sql(f"DROP INDEX{concurrently} {conn.dialect.identifier_preparer.quote(name)}")
+
+
+def add_columns(conn: Connection, table: Table, *names: str) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        column = str(CreateColumn(table.c[name]).compile(dialect=conn.dialect))
+        logger.info("Adding column %s.%s", table.name, name)
+        conn.exec_driver_sql(f"ALTER TABLE {conn.dialect.identifier_preparer.quote(table.name)} ADD COLUMN {column}")
+
+
+def _users_ref(metadata: MetaData) -> Table:
+    # Для внешних ключей новых таблиц достаточно первичного ключа users
+    return Table("users", metadata, Column("id", Integer, primary_key=True))
+
+
+def _baseline(conn: Connection) -> None:
+    metadata = MetaData()
+    Table(
+        "faculties",
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("name", String, nullable=False, unique=True),
+    )
+    Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("telegram_id", BigInteger, nullable=False, unique=True, index=True),
+        Column("name", String, nullable=False),
+        Column("sex", String(1), nullable=False),
+        Column("search_sex", String(1), nullable=False),
+        Column("language", String(2), nullable=False),
+        Column("age", Integer, nullable=False),
+        Column("description", Text, nullable=True),
+        Column("username", String, nullable=True),
+        Column("faculty_id", String, ForeignKey("faculties.id"), nullable=False),
+        Column("photo_ids", Text, nullable=False),
+    )
+    Table(
+        "likes",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("liker_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("target_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("is_like", Boolean, nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        UniqueConstraint("liker_id", "target_id", name="uq_likes_pair"),
+    )
+    Table(
+        "matches",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("user_left_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("user_right_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        UniqueConstraint("user_left_id", "user_right_id", name="uq_matches_pair"),
+    )
+    metadata.create_all(conn)
+
+
+def _search_indexes(conn: Connection) -> None:
+    metadata = MetaData()
+    likes = Table(
+        "likes", metadata, Column("target_id", Integer), Column("is_like", Boolean), Column("liker_id", Integer)
+    )
+    users = Table("users", metadata, Column("sex", String(1)), Column("search_sex", String(1)))
+    matches = Table(
+        "matches",
+        metadata,
+        Column("user_left_id", Integer),
+        Column("user_right_id", Integer),
+        Column("created_at", DateTime(timezone=True)),
+    )
+    for index in (
+        Index("ix_likes_target_is_like_liker", likes.c.target_id, likes.c.is_like, likes.c.liker_id),
+        Index("ix_users_sex_search_sex", users.c.sex, users.c.search_sex),
+        Index("ix_matches_left_created", matches.c.user_left_id, matches.c.created_at),
+        Index("ix_matches_right_created", matches.c.user_right_id, matches.c.created_at),
+    ):
+        create_index(conn, index)
+
+
+def _seed_faculties(conn: Connection) -> None:
+    faculties = Table("faculties", MetaData(), Column("id", String, primary_key=True), Column("name", String))
+    # insert с on_conflict_do_nothing есть у postgresql и sqlite; модуль диалекта уже загружен движком
+    insert = importlib.import_module(f"sqlalchemy.dialects.{conn.dialect.name}").insert
+    rows = [{"id": faculty_id, "name": name} for faculty_id, name in DEFAULT_FACULTIES.items()]
+    conn.execute(insert(faculties).on_conflict_do_nothing(), rows)
+
+
+def _age_range(conn: Connection) -> None:
+    users = Table(
+        "users",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("sex", String(1)),
+        Column("search_sex", String(1)),
+        Column("age", Integer),
+        Column("min_age", Integer, nullable=True),
+        Column("max_age", Integer, nullable=True),
+    )
+    add_columns(conn, users, "min_age", "max_age")
+    index = Index(
+        "ix_users_sex_search_sex_age",
+        users.c.sex,
+        users.c.search_sex,
+        users.c.age,
+        users.c.min_age,
+        users.c.max_age,
+        postgresql_include=["id"],
+    )
+    create_index(conn, index)
+    # Индекс по (sex, search_sex) — префикс нового и больше не нужен
+    drop_index(conn, users.name, "ix_users_sex_search_sex")
+
+
+def _rejection_sets(conn: Connection) -> None:
+    metadata = MetaData()
+    _users_ref(metadata)
+    Table(
+        "rejection_sets",
+        metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("period", Integer, primary_key=True),
+        Column("targets", LargeBinary, nullable=False),
+        Column("size", Integer, nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    )
+    metadata.create_all(conn, tables=[metadata.tables["rejection_sets"]])
+
+
+def _suggestions(conn: Connection) -> None:
+    metadata = MetaData()
+    _users_ref(metadata)
+    Table(
+        "suggestions",
+        metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("rank", Integer, primary_key=True),
+        Column("candidate_id", Integer, ForeignKey("users.id"), nullable=False),
+    )
+    Table(
+        "suggestion_inputs",
+        metadata,
+        Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+        Column("fingerprint", BigInteger, nullable=False),
+        Column("computed_at", DateTime(timezone=True), nullable=False),
+    )
+    metadata.create_all(conn, tables=[metadata.tables["suggestions"], metadata.tables["suggestion_inputs"]])
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "baseline", _baseline),
+    Migration(2, "search indexes", _search_indexes, transactional=False),
+    Migration(3, "default faculties", _seed_faculties),
+    Migration(4, "age range preferences", _age_range, transactional=False),
+    Migration(5, "rejection sets", _rejection_sets),
+    Migration(6, "match suggestions", _suggestions),
+)
+
+
+def _version_query():
+    return select(func.coalesce(func.max(schema_version.c.version), 0))
+
+
+def _apply(conn: Connection, migration: Migration) -> None:
+    migration.upgrade(conn)
+    conn.execute(schema_version.insert().values(version=migration.version, name=migration.name))
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    # В актуальной базе это единственный запрос при старте, поэтому без интроспекции: таблицу создаем по ошибке
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(_version_query())).scalar_one()
+    except (OperationalError, ProgrammingError):
+        async with engine.begin() as conn:
+            await conn.run_sync(version_metadata.create_all)
+            return (await conn.execute(_version_query())).scalar_one()
+
+
+async def migrate(engine: AsyncEngine) -> list[Migration]:
+    """Применяет недостающие ревизии и возвращает их"""
+    version = await current_version(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+
+        logger.info("Applying migration %d: %s", migration.version, migration.name)
+        if migration.transactional:
+            async with engine.begin() as conn:
+                await conn.run_sync(_apply, migration)
+        else:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.run_sync(_apply, migration)
+        applied.append(migration)
+
+    return applied
+
+
+def _missing_indexes(conn: Connection) -> list[str]:
+    inspector = inspect(conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index.name for index in table.indexes if index.name not in existing)
+
+    # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс, которым планировщик не пользуется
+    if conn.dialect.name == "postgresql":
+        invalid = conn.execute(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE NOT indisvalid")
+        ).scalars()
+        missing.extend(f"{name} (invalid)" for name in invalid)
+
+    return missing
+
+
+async def missing_indexes(engine: AsyncEngine) -> list[str]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_missing_indexes)
+
+
+def drop_schema(conn: Connection) -> None:
+    Base.metadata.drop_all(conn)
+    version_metadata.drop_all(conn)
+
+
+async def _main() -> None:
+    from datemate.config import load_settings
+    from datemate.infrastructure.db.session import create_engine
+
+    parser = argparse.ArgumentParser(description="DateMate schema migrations")
+    parser.add_argument("command", choices=("status", "upgrade"))
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL from the settings")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or load_settings().database_url)
+    try:
+        if args.command == "upgrade":
+            await migrate(engine)
+
+        version = await current_version(engine)
+        pending = [migration.name for migration in MIGRATIONS if migration.version > version]
+        print(f"version: {version}, pending: {pending or '-'}")
+        print(f"missing indexes: {await missing_indexes(engine) or '-'}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
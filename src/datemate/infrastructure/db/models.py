@@ -9,7 +9,9 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
@@ -30,6 +32,20 @@ class FacultyModel(Base):
 
 class UserModel(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Подбор кандидатов фильтрует по полу, искомому полу и диапазону возраста. Границы предпочтений кандидата
+        # тоже лежат в индексе, чтобы выбор id обходился без чтения таблицы. SQLite хранит rowid в индексе сам,
+        # на Postgres id добавлен в INCLUDE
+        Index(
+            "ix_users_sex_search_sex_age",
+            "sex",
+            "search_sex",
+            "age",
+            "min_age",
+            "max_age",
+            postgresql_include=["id"],
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, nullable=False, unique=True, index=True)
@@ -38,6 +54,9 @@ class UserModel(Base):
     search_sex = Column(String(1), nullable=False)
     language = Column(String(2), nullable=False, default="ru")
     age = Column(Integer, nullable=False)
+    # Интересующий возраст; NULL — без ограничения (анкеты, заполненные до появления фильтра)
+    min_age = Column(Integer, nullable=True)
+    max_age = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)
     username = Column(String, nullable=True)
     faculty_id = Column(String, ForeignKey("faculties.id"), nullable=False)
@@ -76,6 +95,8 @@ class LikeModel(Base):
     __tablename__ = "likes"
     __table_args__ = (
         UniqueConstraint("liker_id", "target_id", name="uq_likes_pair"),
+        # Входящие лайки: "кто лайкнул меня" без обращения к таблице
+        Index("ix_likes_target_is_like_liker", "target_id", "is_like", "liker_id"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -94,6 +115,9 @@ class MatchModel(Base):
     __tablename__ = "matches"
     __table_args__ = (
         UniqueConstraint("user_left_id", "user_right_id", name="uq_matches_pair"),
+        # Список мэтчей пользователя с сортировкой по дате, по индексу на каждую сторону пары
+        Index("ix_matches_left_created", "user_left_id", "created_at"),
+        Index("ix_matches_right_created", "user_right_id", "created_at"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -107,3 +131,35 @@ class MatchModel(Base):
     user_right = relationship(
         "UserModel", foreign_keys=[user_right_id], back_populates="matches_as_right"
     )
+
+
+class RejectionSetModel(Base):
+    """Сжатые дизлайки пользователя за период, см. ``infrastructure/rejections.py``"""
+
+    __tablename__ = "rejection_sets"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(Integer, primary_key=True)
+    targets = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class SuggestionModel(Base):
+    """Заранее посчитанные кандидаты пользователя по порядку, см. ``infrastructure/suggestions.py``"""
+
+    __tablename__ = "suggestions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    candidate_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+
+class SuggestionInputsModel(Base):
+    """Отпечаток входных данных, по которым считались подсказки пользователя"""
+
+    __tablename__ = "suggestion_inputs"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    fingerprint = Column(BigInteger, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,48 @@
+"""
+Маршрутизация чтений репозиториев на реплики
+
+Запись и миграции всегда идут в основную базу. Репозитории отправляют чтения на реплики по кругу, передавая движок
+через ``bind_arguments``, а ``ReplicaRouter`` приходит через ``info`` фабрики сессий. Чтобы пользователь сразу видел
+свои изменения, запись закрепляет его за основной базой на ``read_your_writes`` секунд — с запасом на отставание
+реплики. Чтение, которое касается закрепленного пользователя, идет в основную базу.
+"""
+
+from __future__ import annotations
+
+from itertools import cycle
+from typing import Hashable, Sequence
+
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+class ReplicaRouter:
+    def __init__(self, replicas: Sequence[AsyncEngine], read_your_writes: float = 5, maxsize: int = 100_000):
+        if not replicas:
+            raise ValueError("ReplicaRouter needs at least one replica")
+        self.replicas = tuple(replicas)
+        self._next = cycle(self.replicas)
+        self._pinned: TTLCache[Hashable, bool] = TTLCache(maxsize=maxsize, ttl=read_your_writes)
+
+    def pin(self, *keys: Hashable) -> None:
+        for key in keys:
+            self._pinned[key] = True
+
+    def reader(self, *keys: Hashable) -> AsyncEngine | None:
+        """Реплика для чтения или None, если кто-то из ``keys`` недавно писал и читать надо из основной базы"""
+        if any(key in self._pinned for key in keys):
+            return None
+        return next(self._next)
+
+
+def read_bind(session: AsyncSession, *keys: Hashable) -> dict | None:
+    """``bind_arguments`` для чтения, которое касается пользователей ``keys``"""
+    router: ReplicaRouter | None = session.info.get("replicas")
+    replica = router.reader(*keys) if router is not None else None
+    return {"bind": replica.sync_engine} if replica is not None else None
+
+
+def pin_writer(session: AsyncSession, *keys: Hashable) -> None:
+    router: ReplicaRouter | None = session.info.get("replicas")
+    if router is not None:
+        router.pin(*keys)
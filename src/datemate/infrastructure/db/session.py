@@ -1,35 +1,43 @@
 from __future__ import annotations
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
-
-from datemate.infrastructure.db import Base, FacultyModel
-
-
-def create_engine(database_url: str) -> AsyncEngine:
-    return create_async_engine(database_url, echo=False, future=True)
-
+import logging
+from typing import Sequence
 
-async def init_db(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    session_factory = async_sessionmaker(engine, expire_on_commit=False)
-    async with session_factory() as session:
-        existing = await session.execute(select(FacultyModel.id))
-        existing_ids = {row[0] for row in existing.all()}
-
-        default_faculties = {
-            "fkn": "ФКН",
-            "fen": "ФЭН",
-            "vsb": "ВШБ",
-            "fgn": "ФГН",
-        }
-
-        for faculty_id, name in default_faculties.items():
-            if faculty_id not in existing_ids:
-                session.add(FacultyModel(id=faculty_id, name=name))
-
-        await session.commit()
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-    return session_factory
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation, instrument_engine
+from datemate.infrastructure.db.migrations import migrate, missing_indexes
+from datemate.infrastructure.db.replicas import ReplicaRouter
+
+
+def create_engine(
+    database_url: str, instrumentation: QueryInstrumentation | None = None, track_updates: bool = False
+) -> AsyncEngine:
+    """``track_updates`` — время и число запросов в метрики хендлеров; хуки ставятся один раз на оба назначения"""
+    engine = create_async_engine(database_url, echo=False, future=True)
+    if instrumentation is not None or track_updates:
+        instrument_engine(engine, instrumentation)
+    return engine
+
+
+async def init_db(
+    engine: AsyncEngine,
+    check_indexes: bool = False,
+    replicas: Sequence[AsyncEngine] = (),
+    read_your_writes: float = 5,
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Доводит схему и справочники до актуальной ревизии
+
+    Если база уже актуальна, это один запрос номера ревизии: без DDL, интроспекции и проверки сидов.
+    Индексы сверяются после применения миграций или по ``check_indexes``. С ``replicas`` чтения репозиториев
+    уходят на реплики (см. ``replicas.py``); миграции применяются только к основной базе.
+    """
+    applied = await migrate(engine)
+    if applied or check_indexes:
+        missing = await missing_indexes(engine)
+        if missing:
+            logging.warning("Missing database indexes: %s, run the migrations", ", ".join(missing))
+
+    info = {"replicas": ReplicaRouter(replicas, read_your_writes)} if replicas else {}
+    return async_sessionmaker(engine, expire_on_commit=False, info=info)
@@ -0,0 +1,268 @@
+"""
+Потоковая выгрузка и загрузка таблиц ``users``, ``likes``, ``matches`` и ``rejection_sets``
+
+Каждая таблица пишется в отдельный файл ``<table>.csv`` или ``<table>.ndjson``. Строки никогда не собираются
+в памяти целиком: выгрузка читает таблицу серверным курсором пачками по ``chunk_size``, загрузка вставляет такими же
+пачками. На Postgres CSV гоняется через ``COPY`` драйвера asyncpg, NDJSON загружается бинарным ``COPY`` из записей;
+на SQLite работает ``executemany`` пачками. Запуск::
+
+    PYTHONPATH=src python -m datemate.main export dump/ --format ndjson
+    PYTHONPATH=src python -m datemate.main import dump/
+
+Загружать нужно в пустые таблицы: строки переносятся вместе с id, после загрузки на Postgres сдвигаются
+последовательности id. NULL в CSV пишется как ``\\N`` (так же настраивается ``COPY``), поэтому пустая строка
+остается пустой строкой.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+from sqlalchemy import Column, Table, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from datemate.infrastructure.db.models import Base
+
+logger = logging.getLogger("datemate.transfer")
+
+# В порядке внешних ключей: загрузка идет в этом порядке
+TABLES = ("users", "likes", "matches", "rejection_sets")
+FORMATS = ("csv", "ndjson")
+CHUNK_SIZE = 5_000
+# Размер блока файла, которым CSV отдается в COPY
+COPY_BLOCK_SIZE = 1 << 20
+# Метка NULL в CSV, как в текстовом COPY у Postgres: пустое поле в CSV — это пустая строка
+CSV_NULL = "\\N"
+
+
+class TransferProgress:
+    def __init__(self, label: str, interval: float = 5.0):
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self._started = self._reported = perf_counter()
+
+    @property
+    def rate(self) -> float:
+        elapsed = perf_counter() - self._started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        now = perf_counter()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            logger.info("%s: %d rows, %.0f rows/s", self.label, self.rows, self.rate)
+
+    def finish(self, rows: int | None = None) -> int:
+        # COPY сообщает точное число строк только в конце, до этого счет идет по переводам строк
+        if rows is not None:
+            self.rows = rows
+        logger.info(
+            "%s: done, %d rows in %.1fs, %.0f rows/s",
+            self.label,
+            self.rows,
+            perf_counter() - self._started,
+            self.rate,
+        )
+        return self.rows
+
+
+def _table(name: str) -> Table:
+    if name not in TABLES:
+        raise ValueError(f"Unknown table {name}, expected one of {', '.join(TABLES)}")
+    return Base.metadata.tables[name]
+
+
+def _columns(table: Table) -> list[str]:
+    return [column.name for column in table.columns]
+
+
+def _to_text(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, bytes):
+        # Как bytea в COPY у Postgres, чтобы файлы переносились между базами
+        return "\\x" + value.hex()
+    return value
+
+
+def _parser(column: Column) -> Callable[[Any], Any]:
+    python_type = column.type.python_type
+    if python_type is bool:
+        return lambda value: value if isinstance(value, bool) else value.lower() in {"t", "true", "1"}
+    if python_type is int:
+        return int
+    if python_type is datetime:
+        return lambda value: value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if python_type is bytes:
+        return lambda value: bytes.fromhex(value.removeprefix("\\x"))
+    return str
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_rows(path: Path, table: Table) -> Iterator[dict]:
+    """Строки файла с приведенными к типам колонок значениями; NULL — ``CSV_NULL`` в CSV и null в NDJSON"""
+    parsers = {column.name: _parser(column) for column in table.columns}
+
+    def convert(raw: dict, null: Any) -> dict:
+        return {name: None if value is None or value == null else parsers[name](value) for name, value in raw.items()}
+
+    with path.open(encoding="utf-8", newline="") as source:
+        if path.suffix == ".csv":
+            for raw in csv.DictReader(source):
+                yield convert(raw, CSV_NULL)
+        else:
+            for line in source:
+                if line.strip():
+                    yield convert(json.loads(line), None)
+
+
+def _file(directory: Path, table_name: str) -> Path:
+    for fmt in FORMATS:
+        path = directory / f"{table_name}.{fmt}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No {table_name}.csv or {table_name}.ndjson in {directory}")
+
+
+async def _driver_connection(conn: AsyncConnection):
+    return (await conn.get_raw_connection()).driver_connection
+
+
+async def export_table(
+    conn: AsyncConnection, table_name: str, path: Path, fmt: str = "csv", chunk_size: int = CHUNK_SIZE
+) -> int:
+    table = _table(table_name)
+    columns = _columns(table)
+    progress = TransferProgress(f"export {table_name}")
+
+    if conn.dialect.name == "postgresql" and fmt == "csv":
+        driver = await _driver_connection(conn)
+        status = await driver.copy_from_table(
+            table_name, columns=columns, output=str(path), format="csv", header=True, null=CSV_NULL
+        )
+        return progress.finish(int(status.split()[-1]))
+
+    stmt = select(table).order_by(*table.primary_key.columns).execution_options(yield_per=chunk_size)
+    result = await conn.stream(stmt)
+    with path.open("w", encoding="utf-8", newline="") as output:
+        writer = csv.writer(output) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        async for partition in result.partitions():
+            if writer:
+                writer.writerows([CSV_NULL if value is None else _to_text(value) for value in row] for row in partition)
+            else:
+                output.writelines(
+                    json.dumps(dict(zip(columns, map(_to_text, row))), ensure_ascii=False) + "\n" for row in partition
+                )
+            progress.add(len(partition))
+    return progress.finish()
+
+
+async def _copy_csv(conn: AsyncConnection, table_name: str, path: Path, progress: TransferProgress) -> int:
+    async def blocks() -> AsyncIterator[bytes]:
+        with path.open("rb") as source:
+            while block := source.read(COPY_BLOCK_SIZE):
+                progress.add(block.count(b"\n"))
+                yield block
+
+    with path.open(encoding="utf-8", newline="") as source:
+        header = next(csv.reader(source))
+    driver = await _driver_connection(conn)
+    status = await driver.copy_to_table(
+        table_name, source=blocks(), columns=header, format="csv", header=True, null=CSV_NULL
+    )
+    return int(status.split()[-1])
+
+
+async def import_table(conn: AsyncConnection, table_name: str, path: Path, chunk_size: int = CHUNK_SIZE) -> int:
+    table = _table(table_name)
+    progress = TransferProgress(f"import {table_name}")
+
+    if conn.dialect.name != "postgresql":
+        for chunk in _chunks(read_rows(path, table), chunk_size):
+            await conn.execute(insert(table), chunk)
+            progress.add(len(chunk))
+        return progress.finish()
+
+    if path.suffix == ".csv":
+        rows = await _copy_csv(conn, table_name, path, progress)
+    else:
+        driver = await _driver_connection(conn)
+        columns = _columns(table)
+        for chunk in _chunks(read_rows(path, table), chunk_size):
+            records = [tuple(row.get(column) for column in columns) for row in chunk]
+            await driver.copy_records_to_table(table_name, records=records, columns=columns)
+            progress.add(len(chunk))
+        rows = None
+
+    if "id" not in table.c:
+        return progress.finish(rows)
+
+    # Строки пришли со своими id, последовательность надо сдвинуть за максимальный
+    await conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table_name}), 0) + 1, false)"
+        )
+    )
+    return progress.finish(rows)
+
+
+async def export_tables(
+    engine: AsyncEngine,
+    directory: Path,
+    tables: Iterable[str] = TABLES,
+    fmt: str = "csv",
+    chunk_size: int = CHUNK_SIZE,
+) -> dict[str, int]:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}, expected one of {', '.join(FORMATS)}")
+    directory.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    # Одна транзакция на все таблицы: выгрузка согласована на Postgres (REPEATABLE READ)
+    async with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            for table_name in tables:
+                counts[table_name] = await export_table(
+                    conn, table_name, directory / f"{table_name}.{fmt}", fmt, chunk_size
+                )
+    return counts
+
+
+async def import_tables(
+    engine: AsyncEngine, directory: Path, tables: Iterable[str] | None = None, chunk_size: int = CHUNK_SIZE
+) -> dict[str, int]:
+    if tables is None:
+        # Без явного списка загружается все, что есть в выгрузке
+        tables = [table_name for table_name in TABLES if any(directory.glob(f"{table_name}.*"))]
+    tables = sorted({_table(table_name).name for table_name in tables}, key=TABLES.index)
+    # Все файлы проверяются до начала загрузки, чтобы не остаться с частью таблиц
+    files = {table_name: _file(directory, table_name) for table_name in tables}
+    counts = {}
+    async with engine.begin() as conn:
+        for table_name in tables:
+            counts[table_name] = await import_table(conn, table_name, files[table_name], chunk_size)
+    return counts
@@ -0,0 +1,176 @@
+"""
+Множества «кто меня лайкнул» в Redis
+
+Для каждого пользователя хранится множество id тех, кто его лайкнул. ``MatchRepository`` проверяет по нему
+встречный лайк и выбирает «лайкнувших первыми» кандидатов по первичному ключу, не обращаясь к ``likes``.
+``set_reaction`` обновляет множество цели после коммита. Множество, которого нет (или которое появилось
+только от записей), пересобирается из базы при первом чтении; собранное помечено служебным элементом — меткой
+поколения. Собранное множество живет ``ttl`` секунд с пересборки: записи срок не продлевают, поэтому лайк,
+который не дошел до Redis по неизвестной причине, вернется не позже чем через ``ttl``.
+
+Redis здесь — только ускорение. Любая ошибка возвращает None, и репозиторий идет прежним путем через SQL.
+После ошибки Redis не трогается ``retry_after`` секунд. Метка поколения случайная для каждого процесса и
+меняется после любой не прошедшей записи, поэтому множества, собранные до перезапуска или до сбоя (запись в
+них могла потеряться), считаются несобранными и пересобираются из базы.
+
+Метка живет только в памяти процесса, поэтому множествами пользуется один процесс бота (как и long polling
+Telegram). Это закреплено арендой в Redis: ``acquire`` при старте ждет, пока аренду отпустит прежний процесс,
+и отказывается запускать второй, а ``claim`` продлевает ее. Без аренды процесс идет через SQL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import secrets
+from time import monotonic
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger("datemate.liked_me")
+
+LikersLoader = Callable[[], Awaitable[Iterable[int]]]
+
+
+class LikedMeSets:
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "datemate:liked_me",
+        ttl: float = 86400,
+        limit: int = 500,
+        retry_after: float = 30,
+        lease: float = 30,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = int(ttl)
+        # Множества больше limit не выгружаются целиком: для таких пользователей приоритет считает SQL
+        self.limit = limit
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+        self._renew()
+        # Аренда множеств процессом: продлевается claim, истекает через lease секунд после его остановки
+        self.lease = lease
+        self.owner_key = f"{prefix}:owner"
+        self._owner = secrets.token_hex(8)
+        self.owned = False
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    @property
+    def available(self) -> bool:
+        return self.owned and monotonic() >= self._retry_at
+
+    async def claim(self) -> bool | None:
+        """Занимает или продлевает аренду; False — множества держит другой процесс, None — Redis недоступен"""
+        key, lease = self.owner_key, max(int(self.lease), 1)
+        try:
+            claimed = bool(await self.redis.set(key, self._owner, nx=True, ex=lease))
+            if not claimed:
+                owner = await self.redis.get(key)
+                claimed = owner is not None and owner.decode() == self._owner
+                if claimed:
+                    await self.redis.expire(key, lease)
+        except Exception:
+            logger.warning("Redis is unavailable, can't claim liked-me sets", exc_info=True)
+            return None
+        if claimed and not self.owned:
+            # Пока аренда была не у нас, множества менял другой процесс или никто
+            self._renew()
+        elif self.owned and not claimed:
+            logger.error("Liked-me sets are claimed by another process, falling back to SQL")
+        self.owned = claimed
+        return claimed
+
+    async def acquire(self) -> None:
+        """Аренда при старте: ждет до ``lease`` секунд, пока ее отпустит упавший прежний процесс"""
+        deadline = monotonic() + self.lease
+        while await self.claim() is False:
+            if monotonic() >= deadline:
+                raise RuntimeError("Liked-me sets are used by another bot process, only one may run with them")
+            await asyncio.sleep(1)
+
+    def _failed(self, action: str, user_id: int) -> None:
+        logger.warning("Redis is unavailable (%s for user %s), falling back to SQL", action, user_id, exc_info=True)
+        self._retry_at = monotonic() + self.retry_after
+
+    def _renew(self) -> None:
+        # id пользователей положительные, поэтому отрицательная метка не пересекается с настоящими лайками
+        self.built = -1 - secrets.randbelow(2**62)
+
+    async def record(self, liker_id: int, target_id: int, is_like: bool) -> None:
+        """Лайк добавляет ``liker_id`` в множество ``target_id``, дизлайк убирает"""
+        if not self.available:
+            self._renew()
+            return
+        key = self._key(target_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if is_like:
+                    pipe.sadd(key, liker_id)
+                else:
+                    pipe.srem(key, liker_id)
+                # Срок ставится только новому ключу: EXPIRE NX (Redis 7) не продлевает собранное множество
+                pipe.expire(key, self.ttl, nx=True)
+                await pipe.execute()
+        except Exception:
+            self._renew()
+            self._failed("record", target_id)
+
+    async def liked(self, user_id: int, liker_id: int, load: LikersLoader) -> bool | None:
+        """Лайкал ли ``liker_id`` пользователя; None — ответа нет, нужен SQL"""
+        if not self.available:
+            return None
+        try:
+            is_member, built = await self.redis.smismember(self._key(user_id), [liker_id, self.built])
+            if built:
+                return bool(is_member)
+            return liker_id in await self._rebuild(user_id, load)
+        except Exception:
+            self._failed("liked", user_id)
+            return None
+
+    async def likers(self, user_id: int, load: LikersLoader) -> set[int] | None:
+        """Все, кто лайкнул пользователя; None — ответа нет или множество больше ``limit``"""
+        if not self.available:
+            return None
+        try:
+            # Собранное множество не больше limit + 1 элементов приходит целиком вместе с меткой
+            members = {int(member) for member in await self.redis.srandmember(self._key(user_id), self.limit + 2)}
+            if len(members) > self.limit + 1:
+                return None
+            if self.built in members:
+                # Метки прошлых поколений тоже отрицательные
+                return {member for member in members if member > 0}
+            likers = await self._rebuild(user_id, load)
+            return likers if len(likers) <= self.limit else None
+        except Exception:
+            self._failed("likers", user_id)
+            return None
+
+    async def _rebuild(self, user_id: int, load: LikersLoader) -> set[int]:
+        likers = set(await load())
+        key = self._key(user_id)
+        # Объединение, а не замена: лайк, записанный между чтением базы и этой командой, не теряется
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.sadd(key, self.built, *likers)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        return likers
+
+    async def close(self) -> None:
+        if self.owned:
+            # Отпускаем аренду, чтобы перезапуск не ждал ее истечения
+            key = self.owner_key
+            try:
+                owner = await self.redis.get(key)
+                if owner is not None and owner.decode() == self._owner:
+                    await self.redis.delete(key)
+            except Exception:
+                logger.warning("Can't release liked-me sets", exc_info=True)
+            self.owned = False
+        await self.redis.aclose()
@@ -0,0 +1,99 @@
+"""
+Очередь событий о новых мэтчах
+
+``MatchRepository._ensure_match`` публикует событие и сразу возвращается: уведомление второй стороны доставляет
+пул воркеров ``MatchNotifier`` в фоне, и свайп не ждет Bot API. По умолчанию очередь живет в памяти процесса
+и теряет недоставленные события при перезапуске. ``RedisMatchEventQueue`` хранит их в списке Redis: воркер
+перекладывает событие в список «в работе» (``BLMOVE``) и удаляет его оттуда после доставки, а при старте
+все, что осталось «в работе» от упавшего процесса, возвращается в очередь (бот работает одним процессом).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger("datemate.match_events")
+
+
+@dataclass(frozen=True, slots=True)
+class MatchEvent:
+    """Пользователю ``recipient_id`` ответил взаимностью ``partner_id``"""
+
+    recipient_id: int
+    partner_id: int
+
+    def dumps(self) -> str:
+        # Порядок ключей фиксирован: по этой строке событие удаляется из списка «в работе»
+        return json.dumps(asdict(self), sort_keys=True)
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> MatchEvent:
+        return cls(**json.loads(raw))
+
+
+class MatchEventQueue:
+    def __init__(self, maxsize: int = 10_000):
+        self._queue: asyncio.Queue[MatchEvent] = asyncio.Queue(maxsize)
+
+    async def publish(self, event: MatchEvent) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Мэтч уже сохранен и виден в списке, теряется только уведомление
+            logger.warning("Match event queue is full, dropping %s", event)
+
+    async def get(self) -> MatchEvent:
+        return await self._queue.get()
+
+    async def ack(self, event: MatchEvent) -> None:
+        self._queue.task_done()
+
+    async def recover(self) -> int:
+        return 0
+
+    async def close(self) -> None:
+        if self._queue.qsize():
+            logger.warning("%d match notifications were not delivered", self._queue.qsize())
+
+
+class RedisMatchEventQueue(MatchEventQueue):
+    def __init__(self, redis: Redis, key: str = "datemate:match_events", poll_timeout: float = 5):
+        self.redis = redis
+        self.key = key
+        self.processing_key = f"{key}:processing"
+        self.poll_timeout = poll_timeout
+
+    async def publish(self, event: MatchEvent) -> None:
+        try:
+            await self.redis.rpush(self.key, event.dumps())
+        except Exception:
+            # Недоступный Redis не должен ронять свайп, который уже сохранил мэтч
+            logger.exception("Can't publish %s", event)
+
+    async def get(self) -> MatchEvent:
+        while True:
+            raw = await self.redis.blmove(self.key, self.processing_key, self.poll_timeout, "LEFT", "RIGHT")
+            if raw is not None:
+                return MatchEvent.loads(raw)
+
+    async def ack(self, event: MatchEvent) -> None:
+        await self.redis.lrem(self.processing_key, 1, event.dumps())
+
+    async def recover(self) -> int:
+        """Возвращает в очередь события, которые взял и не доставил прошлый процесс"""
+        recovered = 0
+        while await self.redis.lmove(self.processing_key, self.key, "RIGHT", "LEFT") is not None:
+            recovered += 1
+        if recovered:
+            logger.info("Recovered %d undelivered match events", recovered)
+        return recovered
+
+    async def close(self) -> None:
+        await self.redis.aclose()
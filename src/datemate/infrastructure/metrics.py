@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница бакета, в который попадает квантиль (для логов этого достаточно)"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class UpdateTimings:
+    """Время, потраченное одним апдейтом на БД, FSM-хранилище и Bot API"""
+
+    __slots__ = ("db", "fsm", "bot_api", "db_statements")
+
+    def __init__(self):
+        self.db = 0.0
+        self.fsm = 0.0
+        self.bot_api = 0.0
+        self.db_statements = 0
+
+
+current_update: ContextVar[UpdateTimings | None] = ContextVar("current_update", default=None)
+
+
+def track(portion: str, elapsed: float) -> None:
+    timings = current_update.get()
+    if timings is not None:
+        setattr(timings, portion, getattr(timings, portion) + elapsed)
+
+
+def detach_update() -> None:
+    """
+    Отвязывает текущую задачу от апдейта
+
+    Задача, созданная внутри апдейта, наследует ``current_update``. Без сброса ее Bot API и БД дописывались бы
+    в тайминги апдейта, о котором уже отчитались
+    """
+    current_update.set(None)
+
+
+class HandlerMetrics:
+    __slots__ = ("latency", "errors", "db", "fsm", "bot_api", "db_statements")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.db = 0.0
+        self.fsm = 0.0
+        self.bot_api = 0.0
+        self.db_statements = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.handlers: dict[tuple[str, str], HandlerMetrics] = {}
+        self.bot_api_methods: dict[str, Histogram] = {}
+        # Сторонние источники метрик, каждый отдает готовые строки в формате Prometheus
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        self.collectors.append(collector)
+
+    def observe_handler(
+        self,
+        router: str,
+        handler: str,
+        elapsed: float,
+        timings: UpdateTimings,
+        failed: bool = False,
+    ) -> None:
+        metrics = self.handlers.get((router, handler))
+        if metrics is None:
+            metrics = self.handlers[(router, handler)] = HandlerMetrics()
+
+        metrics.latency.observe(elapsed)
+        metrics.db += timings.db
+        metrics.fsm += timings.fsm
+        metrics.bot_api += timings.bot_api
+        metrics.db_statements += timings.db_statements
+        if failed:
+            metrics.errors += 1
+
+    def observe_bot_api(self, method: str, elapsed: float) -> None:
+        histogram = self.bot_api_methods.get(method)
+        if histogram is None:
+            histogram = self.bot_api_methods[method] = Histogram()
+        histogram.observe(elapsed)
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# TYPE datemate_handler_duration_seconds histogram",
+        ]
+        for (router, handler), metrics in sorted(self.handlers.items()):
+            labels = f'router="{router}",handler="{handler}"'
+            lines.extend(histogram_lines("datemate_handler_duration_seconds", labels, metrics.latency))
+
+        for name, attribute in (
+            ("datemate_handler_errors_total", "errors"),
+            ("datemate_handler_db_seconds_total", "db"),
+            ("datemate_handler_fsm_seconds_total", "fsm"),
+            ("datemate_handler_bot_api_seconds_total", "bot_api"),
+            ("datemate_handler_db_statements_total", "db_statements"),
+        ):
+            lines.append(f"# TYPE {name} counter")
+            for (router, handler), metrics in sorted(self.handlers.items()):
+                lines.append(f'{name}{{router="{router}",handler="{handler}"}} {getattr(metrics, attribute)}')
+
+        lines.append("# TYPE datemate_bot_api_duration_seconds histogram")
+        for method, histogram in sorted(self.bot_api_methods.items()):
+            lines.extend(histogram_lines("datemate_bot_api_duration_seconds", f'method="{method}"', histogram))
+
+        for collector in self.collectors:
+            lines.extend(collector())
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[str]:
+        lines = []
+        for (router, handler), metrics in sorted(self.handlers.items()):
+            count = metrics.latency.count
+            if not count:
+                continue
+            lines.append(
+                f"{router}.{handler}: count={count} errors={metrics.errors} "
+                f"avg={metrics.latency.total / count * 1000:.1f}ms p95<={metrics.latency.quantile(0.95) * 1000:.0f}ms "
+                f"db={metrics.db / count * 1000:.1f}ms/{metrics.db_statements / count:.1f}q fsm={metrics.fsm / count * 1000:.1f}ms "
+                f"bot_api={metrics.bot_api / count * 1000:.1f}ms"
+            )
+        return lines
+
+
+def histogram_lines(name: str, labels: str, histogram: Histogram) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+async def start_metrics_server(registry: MetricsRegistry, host: str, port: int) -> "web.AppRunner":
+    from aiohttp import web
+
+    async def metrics_view(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_view)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def log_metrics(registry: MetricsRegistry) -> None:
+    for line in registry.summary():
+        logging.info("metrics %s", line)
@@ -0,0 +1,112 @@
+"""
+Ранжирование кандидатов по совместимости
+
+Движок работает поверх ``UserIndex``: колонки корзины, где лежат подходящие анкеты, читаются как массивы NumPy без
+копирования, кандидаты отсекаются по диапазонам возраста с обеих сторон и оцениваются одним векторизованным проходом (совпадение факультета, близость возраста,
+популярность, давность активности). Кандидат выбирается случайно среди top-K с вероятностью, растущей со скором,
+чтобы показы не доставались только самым популярным анкетам.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import time
+from typing import Iterable
+
+import numpy as np
+
+from datemate.domain.entities import UserProfile
+from datemate.infrastructure.user_index import IndexBucket, UserIndex
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    faculty: float = 1.0
+    age: float = 1.0
+    popularity: float = 0.5
+    recency: float = 0.5
+    # Разница в возрасте, на которой вклад возраста падает в e раз
+    age_scale: float = 4.0
+    # Давность активности (в днях), на которой вклад свежести падает в e раз
+    recency_days: float = 14.0
+    top_k: int = 20
+    # Чем выше температура, тем равномернее выбор внутри top-K
+    temperature: float = 0.3
+
+
+class RankingEngine:
+    def __init__(self, index: UserIndex, weights: RankingWeights | None = None, seed: int | None = None):
+        self.index = index
+        self.weights = weights or RankingWeights()
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def ready(self) -> bool:
+        return self.index.loaded
+
+    def _score_bucket(
+        self, bucket: IndexBucket, user: UserProfile, excluded: np.ndarray, now: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        weights = self.weights
+        # Представления поверх array.array без копирования; живут только внутри синхронного вызова
+        ids = np.frombuffer(bucket.ids, dtype=np.int32)
+        ages = np.frombuffer(bucket.age, dtype=np.int16)
+        min_ages = np.frombuffer(bucket.min_age, dtype=np.uint8)
+        max_ages = np.frombuffer(bucket.max_age, dtype=np.uint8)
+
+        # Пользователь должен подходить под предпочтения кандидата, а кандидат — под его собственные
+        mask = (ids != user.id) & (min_ages <= user.age) & ((max_ages == 0) | (max_ages >= user.age))
+        if user.min_age is not None:
+            mask &= ages >= user.min_age
+        if user.max_age is not None:
+            mask &= ages <= user.max_age
+        if excluded.size:
+            mask &= ~np.isin(ids, excluded)
+        positions = np.flatnonzero(mask)
+
+        age_gap = np.abs(ages[positions].astype(np.float32) - user.age)
+        faculty = np.frombuffer(bucket.faculty, dtype=np.int16)[positions]
+        likes = np.frombuffer(bucket.likes, dtype=np.uint32)[positions].astype(np.float32)
+        last_active = np.frombuffer(bucket.last_active, dtype=np.uint32)[positions].astype(np.float64)
+
+        popularity = np.log1p(likes) / np.log1p(max(self.index.max_likes, 1))
+        idle_days = (now - last_active) / 86400
+        recency = np.where(last_active > 0, np.exp(-np.maximum(idle_days, 0) / weights.recency_days), 0.0)
+
+        scores = (
+            weights.faculty * (faculty == self.index.faculty_code(user.faculty_id))
+            + weights.age * np.exp(-age_gap / weights.age_scale)
+            + weights.popularity * popularity
+            + weights.recency * recency
+        )
+        return ids[positions].copy(), scores
+
+    def candidates(
+        self, user: UserProfile, exclude_ids: Iterable[int] = (), now: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Id всех подходящих кандидатов и их скоры"""
+        excluded = np.fromiter(exclude_ids, dtype=np.int32)
+        now = time() if now is None else now
+        scored = [self._score_bucket(bucket, user, excluded, now) for bucket in self.index.candidate_buckets(user)]
+        if not scored:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        if len(scored) == 1:
+            return scored[0]
+        return np.concatenate([ids for ids, _ in scored]), np.concatenate([scores for _, scores in scored])
+
+    def pick(self, user: UserProfile, exclude_ids: Iterable[int] = ()) -> int | None:
+        """Id выбранного кандидата или ``None``, если в индексе подходящих нет"""
+        ids, scores = self.candidates(user, exclude_ids)
+        if not ids.size:
+            return None
+
+        top_k = min(self.weights.top_k, ids.size)
+        if top_k < ids.size:
+            top = np.argpartition(scores, ids.size - top_k)[ids.size - top_k:]
+        else:
+            top = np.arange(ids.size)
+
+        top_scores = scores[top]
+        probabilities = np.exp((top_scores - top_scores.max()) / max(self.weights.temperature, 1e-6))
+        probabilities /= probabilities.sum()
+        return int(ids[self._rng.choice(top, p=probabilities)])
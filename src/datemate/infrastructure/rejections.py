@@ -0,0 +1,213 @@
+"""
+Сжатие старых отрицательных реакций в наборы отказов
+
+Каждый пропуск анкеты — строка в ``likes``, и почти все такие строки читаются только для исключения из поиска.
+Компактор переносит дизлайки старше ``compact_after`` в ``rejection_sets``: один blob на пользователя и период
+(по умолчанию 30 дней) вместо строки с двумя индексами на каждую реакцию. Blob — самый короткий из вариантов:
+отсортированный массив id по 4 байта, разности соседних id по 2 байта или битовая карта от минимального id.
+
+Поиск исключает и свежие строки ``likes``, и наборы отказов. С ``expiry`` наборы за периоды старше срока удаляются,
+и давно пропущенные анкеты снова попадают в выдачу.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Iterable, Iterator
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from datemate.infrastructure.db import LikeModel, RejectionSetModel
+
+logger = logging.getLogger("datemate.rejections")
+
+_ARRAY = b"A"
+_BITMAP = b"B"
+_DELTAS = b"D"
+# Номера установленных битов для каждого значения байта
+_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def _little_endian(ids: array) -> array:
+    # Blob переносится между машинами, порядок байт фиксирован
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+class RejectionSet:
+    """Отсортированное множество id анкет, которые пользователь отклонил"""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self.ids = array("I", sorted(set(ids)))
+
+    @classmethod
+    def from_blobs(cls, blobs: Iterable[bytes]) -> RejectionSet:
+        rejected = cls()
+        parts = [decode(blob) for blob in blobs]
+        if len(parts) == 1:
+            rejected.ids = parts[0]
+        elif parts:
+            rejected.ids = array("I", sorted(set().union(*parts)))
+        return rejected
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        position = bisect_left(self.ids, user_id)
+        return position < len(self.ids) and self.ids[position] == user_id
+
+    def to_blob(self) -> bytes:
+        return encode(self.ids)
+
+
+def encode(ids: Iterable[int]) -> bytes:
+    ids = sorted(set(ids))
+    if not ids:
+        return _ARRAY
+    base, span = ids[0], ids[-1] - ids[0] + 1
+    deltas = [following - previous for previous, following in zip(ids, ids[1:])]
+    sizes = {
+        _ARRAY: 4 * len(ids),
+        _BITMAP: 4 + (span + 7) // 8,
+        _DELTAS: 4 + 2 * len(deltas) if max(deltas, default=0) < 1 << 16 else None,
+    }
+    kind = min((size, kind) for kind, size in sizes.items() if size is not None)[1]
+
+    if kind == _BITMAP:
+        bitmap = bytearray((span + 7) // 8)
+        for user_id in ids:
+            offset = user_id - base
+            bitmap[offset >> 3] |= 1 << (offset & 7)
+        return _BITMAP + base.to_bytes(4, "little") + bytes(bitmap)
+    if kind == _DELTAS:
+        return _DELTAS + base.to_bytes(4, "little") + _little_endian(array("H", deltas)).tobytes()
+    return _ARRAY + _little_endian(array("I", ids)).tobytes()
+
+
+def decode(blob: bytes) -> array:
+    kind, payload = blob[:1], blob[1:]
+    ids = array("I")
+    if kind == _ARRAY:
+        ids.frombytes(payload)
+        return _little_endian(ids)
+
+    base = int.from_bytes(payload[:4], "little")
+    if kind == _DELTAS:
+        deltas = array("H")
+        deltas.frombytes(payload[4:])
+        ids.extend(accumulate(_little_endian(deltas), initial=base))
+        return ids
+
+    for index, byte in enumerate(payload[4:]):
+        if byte:
+            start = base + index * 8
+            ids.extend(start + bit for bit in _BITS[byte])
+    return ids
+
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite отдает время без зоны, в базе оно в UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class RejectionPolicy:
+    # Дизлайки младше этого остаются строками в likes
+    compact_after: timedelta = timedelta(days=7)
+    period: timedelta = timedelta(days=30)
+    # None — отказы не истекают
+    expiry: timedelta | None = None
+    # Сколько пользователей сжимается в одной транзакции
+    batch_size: int = 500
+
+    def period_of(self, moment: datetime) -> int:
+        return int(_utc(moment).timestamp() // self.period.total_seconds())
+
+    def oldest_period(self, now: datetime | None = None) -> int | None:
+        """Самый старый период, отказы за который еще действуют"""
+        if self.expiry is None:
+            return None
+        return self.period_of((now or datetime.now(timezone.utc)) - self.expiry)
+
+
+@dataclass
+class CompactionStats:
+    users: int = 0
+    rows: int = 0
+    sets_written: int = 0
+    sets_expired: int = 0
+
+
+async def compact_rejections(
+    session_factory: async_sessionmaker[AsyncSession], policy: RejectionPolicy, now: datetime | None = None
+) -> CompactionStats:
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - policy.compact_after
+    old_negative = (LikeModel.is_like.is_(False), LikeModel.created_at < cutoff)
+    stats = CompactionStats()
+    started = perf_counter()
+
+    async with session_factory() as session:
+        liker_stmt = select(LikeModel.liker_id).where(*old_negative).distinct().order_by(LikeModel.liker_id)
+        liker_ids = (await session.execute(liker_stmt)).scalars().all()
+
+    for start in range(0, len(liker_ids), policy.batch_size):
+        batch = liker_ids[start:start + policy.batch_size]
+        async with session_factory() as session, session.begin():
+            rows = await session.execute(
+                select(LikeModel.liker_id, LikeModel.target_id, LikeModel.created_at)
+                .where(LikeModel.liker_id.in_(batch), *old_negative)
+                # Строки не должны поменять реакцию между чтением и удалением
+                .with_for_update()
+            )
+            targets: dict[tuple[int, int], list[int]] = defaultdict(list)
+            for liker_id, target_id, created_at in rows:
+                targets[(liker_id, policy.period_of(created_at))].append(target_id)
+                stats.rows += 1
+
+            existing = {
+                (rejection.user_id, rejection.period): rejection
+                for rejection in (
+                    await session.execute(select(RejectionSetModel).where(RejectionSetModel.user_id.in_(batch)))
+                ).scalars()
+            }
+            for (liker_id, period), target_ids in targets.items():
+                rejection = existing.get((liker_id, period))
+                if rejection is None:
+                    rejection = RejectionSetModel(user_id=liker_id, period=period)
+                    session.add(rejection)
+                else:
+                    target_ids.extend(decode(rejection.targets))
+                merged = RejectionSet(target_ids)
+                rejection.targets = merged.to_blob()
+                rejection.size = len(merged)
+                stats.sets_written += 1
+
+            await session.execute(delete(LikeModel).where(LikeModel.liker_id.in_(batch), *old_negative))
+        stats.users += len(batch)
+
+    oldest = policy.oldest_period(now)
+    if oldest is not None:
+        async with session_factory() as session, session.begin():
+            result = await session.execute(delete(RejectionSetModel).where(RejectionSetModel.period < oldest))
+            stats.sets_expired = result.rowcount
+
+    logger.info("Rejection compaction: %s in %.1fs", stats, perf_counter() - started)
+    return stats
+
@@ -1,10 +1,260 @@
 from __future__ import annotations
 
-from sqlalchemy import func, or_, select
+import json
+import random
+from bisect import bisect_right
+from functools import cache, partial
+from typing import TYPE_CHECKING, Iterable
+
+from sqlalchemy import Integer, Row, bindparam, case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from datemate.infrastructure.db import FacultyModel, LikeModel, MatchModel, UserModel
+from datemate.domain.entities import Match, Reaction, UserProfile
+from datemate.infrastructure.db import (
+    FacultyModel,
+    LikeModel,
+    MatchModel,
+    RejectionSetModel,
+    SuggestionModel,
+    UserModel,
+)
+from datemate.infrastructure.db.replicas import pin_writer, read_bind
+from datemate.infrastructure.match_events import MatchEvent
+from datemate.infrastructure.rejections import RejectionSet
+
+if TYPE_CHECKING:
+    from datemate.infrastructure.liked_me import LikedMeSets
+    from datemate.infrastructure.match_events import MatchEventQueue
+    from datemate.infrastructure.ranking import RankingEngine
+    from datemate.infrastructure.rejections import RejectionPolicy
+    from datemate.infrastructure.suggestions import SuggestionPolicy
+    from datemate.infrastructure.user_index import UserIndex
+
+
+# Колонки анкеты в порядке полей UserProfile; photo_ids разбирается отдельно
+PROFILE_COLUMNS = (
+    UserModel.id,
+    UserModel.telegram_id,
+    UserModel.name,
+    UserModel.sex,
+    UserModel.search_sex,
+    UserModel.language,
+    UserModel.age,
+    UserModel.description,
+    UserModel.username,
+    UserModel.faculty_id,
+    FacultyModel.name.label("faculty_name"),
+    UserModel.photo_ids,
+    UserModel.min_age,
+    UserModel.max_age,
+)
+REACTION_COLUMNS = (LikeModel.id, LikeModel.liker_id, LikeModel.target_id, LikeModel.is_like, LikeModel.created_at)
+MATCH_COLUMNS = (MatchModel.id, MatchModel.user_left_id, MatchModel.user_right_id, MatchModel.created_at)
+
+
+def profile_select():
+    # Факультет подтягивается в той же строке, анкеты не попадают в identity map сессии
+    return select(*PROFILE_COLUMNS).join(FacultyModel, FacultyModel.id == UserModel.faculty_id, isouter=True)
+
+
+def _photos(photo_ids: str) -> tuple[str, ...]:
+    try:
+        return tuple(json.loads(photo_ids))
+    except json.JSONDecodeError:
+        return ()
+
+
+def to_profile(row: Row) -> UserProfile:
+    *fields, photo_ids, min_age, max_age = row
+    return UserProfile(*fields, photos=_photos(photo_ids), min_age=min_age, max_age=max_age)
+
+
+# Горячие запросы собираются один раз на процесс, а значения приходят связанными параметрами. Собранная конструкция
+# хранит свой ключ кэша, поэтому на вызов не тратится ни построение select(), ни обход дерева ради ключа, и SQL
+# сразу берется из кэша компиляции. Варианты запроса (например, без фильтра по полу) — разные записи @cache.
+
+# Границы возраста, если пользователь не задал диапазон: условие на возраст остается в запросе всегда
+AGE_BOUNDS = (0, 200)
+
+
+@cache
+def profile_by(column: str):
+    """Анкета по ``id`` или ``telegram_id``, значение — параметр ``key``"""
+    return profile_select().where(getattr(UserModel, column) == bindparam("key"))
+
+
+@cache
+def _rated_ids():
+    return select(LikeModel.target_id).where(LikeModel.liker_id == bindparam("user_id"))
+
+
+@cache
+def candidate_conditions(any_sex: bool) -> tuple:
+    """Условия на анкеты, которые можно показать пользователю; значения — ``MatchRepository.candidate_params``"""
+    conditions = (
+        UserModel.id != bindparam("user_id"),
+        ~UserModel.id.in_(_rated_ids()),
+        UserModel.id.not_in(bindparam("exclude_ids", expanding=True)),
+        UserModel.search_sex == bindparam("sex"),
+        # Возраст кандидата в диапазоне пользователя, и наоборот: пользователь подходит кандидату
+        or_(UserModel.min_age.is_(None), UserModel.min_age <= bindparam("age")),
+        or_(UserModel.max_age.is_(None), UserModel.max_age >= bindparam("age")),
+        UserModel.age >= bindparam("min_age"),
+        UserModel.age <= bindparam("max_age"),
+    )
+    if any_sex:
+        return conditions
+    return (*conditions, UserModel.sex == bindparam("search_sex"))
+
+
+def _prioritized(stmt, any_sex: bool, from_likers: bool):
+    # Кандидат уже лайкнул пользователя: по входящим лайкам или по id из LikedMeSets
+    if from_likers:
+        return stmt.where(UserModel.id.in_(bindparam("liker_ids", expanding=True)), *candidate_conditions(any_sex))
+    return stmt.join(LikeModel, LikeModel.liker_id == UserModel.id).where(
+        LikeModel.target_id == bindparam("user_id"), LikeModel.is_like.is_(True), *candidate_conditions(any_sex)
+    )
+
+
+def _suggested(stmt, any_sex: bool):
+    # Подсказки пакетного расчета по порядку; условия проверяются заново, ведь подсказки могли устареть
+    return (
+        stmt.join(SuggestionModel, SuggestionModel.candidate_id == UserModel.id)
+        .where(SuggestionModel.user_id == bindparam("user_id"), *candidate_conditions(any_sex))
+        .order_by(SuggestionModel.rank)
+    )
+
+
+@cache
+def _suggested_profiles(any_sex: bool):
+    return _suggested(profile_select(), any_sex).limit(bindparam("limit", type_=Integer))
+
+
+@cache
+def _likers():
+    return select(LikeModel.liker_id).where(LikeModel.target_id == bindparam("user_id"), LikeModel.is_like.is_(True))
+
+
+@cache
+def random_candidate_ids(any_sex: bool):
+    # Случайный id выбирается по ix_users_sex_search_sex_age без чтения таблицы
+    return (
+        select(UserModel.id)
+        .where(*candidate_conditions(any_sex))
+        .order_by(func.random())
+        .limit(bindparam("limit", type_=Integer))
+    )
+
+
+@cache
+def _next_eligible_id(any_sex: bool):
+    # Первый по id подходящий кандидат после after; skip_ids — ближайшее окно набора отказов
+    return (
+        select(UserModel.id)
+        .where(
+            *candidate_conditions(any_sex),
+            UserModel.id > bindparam("after"),
+            UserModel.id.not_in(bindparam("skip_ids", expanding=True)),
+        )
+        .order_by(UserModel.id)
+        .limit(1)
+    )
+
+
+@cache
+def _prioritized_profiles(any_sex: bool, from_likers: bool = False):
+    stmt = _prioritized(profile_select(), any_sex, from_likers)
+    return stmt.order_by(func.random()).limit(bindparam("limit", type_=Integer))
+
+
+@cache
+def _random_profile(any_sex: bool):
+    return profile_select().where(UserModel.id == random_candidate_ids(any_sex).scalar_subquery())
+
+
+@cache
+def _next_candidate(any_sex: bool, from_likers: bool = False, suggested: bool = False):
+    candidate_ids = [
+        _prioritized(select(UserModel.id), any_sex, from_likers).order_by(func.random()).limit(1).scalar_subquery()
+    ]
+    if suggested:
+        candidate_ids.append(_suggested(select(UserModel.id), any_sex).limit(1).scalar_subquery())
+    candidate_ids.append(random_candidate_ids(any_sex).scalar_subquery())
+    return profile_select().where(UserModel.id == func.coalesce(*candidate_ids))
+
+
+@cache
+def _rejection_blobs(expiring: bool):
+    stmt = select(RejectionSetModel.targets).where(RejectionSetModel.user_id == bindparam("user_id"))
+    if expiring:
+        stmt = stmt.where(RejectionSetModel.period >= bindparam("oldest"))
+    return stmt
+
+
+# Имена параметров реакции не совпадают с колонками: такие имена UPDATE/INSERT резервируют под SET и VALUES
+@cache
+def _reaction():
+    return select(*REACTION_COLUMNS).where(
+        LikeModel.liker_id == bindparam("liker"), LikeModel.target_id == bindparam("target")
+    )
+
+
+@cache
+def _update_reaction():
+    return (
+        update(LikeModel)
+        .where(LikeModel.liker_id == bindparam("liker"), LikeModel.target_id == bindparam("target"))
+        .values(is_like=bindparam("like"))
+        .returning(*REACTION_COLUMNS)
+        # Лайки не загружаются в сессию, синхронизировать нечего
+        .execution_options(synchronize_session=False)
+    )
+
+
+@cache
+def _insert_reaction():
+    return (
+        insert(LikeModel)
+        .values(liker_id=bindparam("liker"), target_id=bindparam("target"), is_like=bindparam("like"))
+        .returning(*REACTION_COLUMNS)
+    )
+
+
+@cache
+def _positive_reaction():
+    return select(LikeModel.id).where(
+        LikeModel.liker_id == bindparam("liker"),
+        LikeModel.target_id == bindparam("target"),
+        LikeModel.is_like.is_(True),
+    )
+
+
+def _user_matches():
+    user_id = bindparam("user_id")
+    return or_(MatchModel.user_left_id == user_id, MatchModel.user_right_id == user_id)
+
+
+@cache
+def _match_count():
+    return select(func.count()).select_from(MatchModel).where(_user_matches())
+
+
+@cache
+def _match_page():
+    other_id = case(
+        (MatchModel.user_left_id == bindparam("user_id"), MatchModel.user_right_id), else_=MatchModel.user_left_id
+    )
+    # Анкета второй стороны приходит в той же строке, что и мэтч
+    return (
+        profile_select()
+        .add_columns(*MATCH_COLUMNS)
+        .join(MatchModel, UserModel.id == other_id)
+        .where(_user_matches())
+        .order_by(MatchModel.created_at.desc())
+        .offset(bindparam("offset", type_=Integer))
+        .limit(bindparam("limit", type_=Integer))
+    )
 
 
 class FacultyRepository:
@@ -12,27 +262,31 @@ class FacultyRepository:
         self.session = session
 
     async def list_faculties(self) -> list[FacultyModel]:
-        result = await self.session.execute(select(FacultyModel))
+        result = await self.session.execute(select(FacultyModel), bind_arguments=read_bind(self.session))
         return list(result.scalars().all())
 
     async def get_by_id(self, faculty_id: str) -> FacultyModel | None:
-        result = await self.session.execute(select(FacultyModel).where(FacultyModel.id == faculty_id))
+        result = await self.session.execute(
+            select(FacultyModel).where(FacultyModel.id == faculty_id), bind_arguments=read_bind(self.session)
+        )
         return result.scalars().first()
 
 
 class UserRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, user_index: UserIndex | None = None):
         self.session = session
+        self.user_index = user_index if user_index is not None else session.info.get("user_index")
 
-    async def get_by_telegram_id(self, telegram_id: int) -> UserModel | None:
-        result = await self.session.execute(select(UserModel).where(UserModel.telegram_id == telegram_id))
-        return result.scalars().first()
+    async def get_by_telegram_id(self, telegram_id: int) -> UserProfile | None:
+        return await self._get_profile("telegram_id", telegram_id, ("telegram", telegram_id))
 
-    async def get_by_id(self, user_id: int) -> UserModel | None:
-        result = await self.session.execute(
-            select(UserModel).options(selectinload(UserModel.faculty)).where(UserModel.id == user_id)
-        )
-        return result.scalars().first()
+    async def get_by_id(self, user_id: int) -> UserProfile | None:
+        return await self._get_profile("id", user_id, ("user", user_id))
+
+    async def _get_profile(self, column: str, value: int, key: tuple) -> UserProfile | None:
+        bind = read_bind(self.session, key)
+        row = (await self.session.execute(profile_by(column), {"key": value}, bind_arguments=bind)).first()
+        return to_profile(row) if row is not None else None
 
     async def upsert_user(
         self,
@@ -46,173 +300,292 @@ class UserRepository:
         faculty_id: str,
         description: str,
         photo_ids: list[str],
-    ) -> UserModel:
-        user = await self.get_by_telegram_id(telegram_id)
-        if user is None:
-            user = UserModel(
-                telegram_id=telegram_id,
-                username=username,
-                name=name,
-                sex=sex,
-                search_sex=search_sex,
-                language=language,
-                age=age,
-                description=description,
-                faculty_id=faculty_id,
-                photo_ids="[]",
-            )
-            self.session.add(user)
-
-        user.name = name
-        user.sex = sex
-        user.search_sex = search_sex
-        user.language = language
-        user.age = age
-        user.description = description
-        user.faculty_id = faculty_id
-        user.username = username or user.username
-        user.photos = photo_ids
+        min_age: int | None = None,
+        max_age: int | None = None,
+    ) -> UserProfile:
+        values = dict(
+            name=name,
+            sex=sex,
+            search_sex=search_sex,
+            language=language,
+            age=age,
+            min_age=min_age,
+            max_age=max_age,
+            description=description,
+            faculty_id=faculty_id,
+            photo_ids=json.dumps(list(photo_ids)),
+        )
+        # Пустой username не затирает сохраненный
+        if username:
+            values["username"] = username
+
+        user_id = (
+            await self.session.execute(select(UserModel.id).where(UserModel.telegram_id == telegram_id))
+        ).scalar_one_or_none()
+        if user_id is None:
+            stmt = insert(UserModel).values(telegram_id=telegram_id, **values).returning(UserModel.id)
+            user_id = (await self.session.execute(stmt)).scalar_one()
+        else:
+            await self.session.execute(update(UserModel).where(UserModel.id == user_id).values(**values))
 
         await self.session.commit()
-        await self.session.refresh(user)
+        # Следующие чтения этого пользователя идут в основную базу, пока реплики не догонят
+        pin_writer(self.session, ("user", user_id), ("telegram", telegram_id))
+        user = await self.get_by_id(user_id)
+        if self.user_index is not None:
+            self.user_index.upsert(
+                user.id, user.sex, user.search_sex, user.age, user.faculty_id, user.min_age, user.max_age
+            )
         return user
 
 
 class MatchRepository:
-    def __init__(self, session: AsyncSession):
-        self.session = session
+    # Сколько случайных кандидатов выбирается за раз, когда часть из них может оказаться в наборе отказов
+    CANDIDATE_BATCH = 20
+    # Сколько id из набора отказов исключает в SQL один шаг обхода по id
+    REJECTION_WINDOW = 500
 
-    async def get_next_candidate(self, user: UserModel) -> UserModel | None:
-        rated_subquery = select(LikeModel.target_id).where(LikeModel.liker_id == user.id)
-
-        base_conditions = [
-            UserModel.id != user.id,
-            ~UserModel.id.in_(rated_subquery),
-            UserModel.search_sex == user.sex,
-        ]
-
-        if user.search_sex:
-            base_conditions.append(UserModel.sex == user.search_sex)
-
-        prioritized_stmt = (
-            select(UserModel)
-            .join(LikeModel, LikeModel.liker_id == UserModel.id)
-            .options(selectinload(UserModel.faculty))
-            .where(
-                LikeModel.target_id == user.id,
-                LikeModel.is_like.is_(True),
-                *base_conditions,
-            )
-            .order_by(func.random())
-            .limit(1)
+    def __init__(
+        self,
+        session: AsyncSession,
+        ranking: RankingEngine | None = None,
+        user_index: UserIndex | None = None,
+        rejections: RejectionPolicy | None = None,
+        match_events: MatchEventQueue | None = None,
+        liked_me: LikedMeSets | None = None,
+        suggestions: SuggestionPolicy | None = None,
+    ):
+        self.session = session
+        # Движок ранжирования, индекс, политики отказов и подсказок, очередь мэтчей и множества «кто меня лайкнул»
+        # общие на процесс и приходят через info фабрики сессий
+        self.ranking = ranking if ranking is not None else session.info.get("ranking")
+        self.user_index = user_index if user_index is not None else session.info.get("user_index")
+        self.rejections = rejections if rejections is not None else session.info.get("rejections")
+        self.match_events = match_events if match_events is not None else session.info.get("match_events")
+        self.liked_me = liked_me if liked_me is not None else session.info.get("liked_me")
+        self.suggestions = suggestions if suggestions is not None else session.info.get("suggestions")
+
+    async def rejected_ids(self, user_id: int) -> RejectionSet:
+        """Сжатые отказы пользователя, срок которых не истек"""
+        if self.rejections is None:
+            return RejectionSet()
+        oldest = self.rejections.oldest_period()
+        rows = await self.session.execute(
+            _rejection_blobs(oldest is not None),
+            {"user_id": user_id, "oldest": oldest},
+            bind_arguments=read_bind(self.session, ("user", user_id)),
         )
-
-        prioritized_candidate = (await self.session.execute(prioritized_stmt)).scalars().first()
-        if prioritized_candidate:
-            return prioritized_candidate
-
-        stmt = (
-            select(UserModel)
-            .options(selectinload(UserModel.faculty))
-            .where(*base_conditions)
-            .order_by(func.random())
-            .limit(1)
+        return RejectionSet.from_blobs(rows.scalars())
+
+    @staticmethod
+    def candidate_params(user: UserProfile, exclude_ids: Iterable[int] = (), limit: int = 1) -> dict:
+        """Значения параметров для запросов из ``candidate_conditions``"""
+        return {
+            "user_id": user.id,
+            "exclude_ids": list(exclude_ids),
+            "sex": user.sex,
+            "search_sex": user.search_sex,
+            "age": user.age,
+            "min_age": user.min_age if user.min_age is not None else AGE_BOUNDS[0],
+            "max_age": user.max_age if user.max_age is not None else AGE_BOUNDS[1],
+            "limit": limit,
+        }
+
+    async def _load_likers(self, user_id: int) -> list[int]:
+        # Множество пересобирается по основной базе: реплика может еще не знать о последних лайках
+        return (await self.session.execute(_likers(), {"user_id": user_id})).scalars().all()
+
+    async def liker_ids(self, user_id: int) -> set[int] | None:
+        """Кто лайкнул пользователя, по LikedMeSets; None — считать через SQL"""
+        if self.liked_me is None:
+            return None
+        return await self.liked_me.likers(user_id, partial(self._load_likers, user_id))
+
+    async def get_next_candidate(self, user: UserProfile, exclude_ids: Iterable[int] = ()) -> UserProfile | None:
+        exclude_ids = list(exclude_ids)
+        any_sex = not user.search_sex
+        # Старые дизлайки сжаты в наборы отказов и проверяются в Python после выборки из базы
+        rejected = await self.rejected_ids(user.id)
+        likers = await self.liker_ids(user.id)
+        from_likers = likers is not None
+        bind = read_bind(self.session, ("user", user.id))
+        ranked = self.ranking is not None and self.ranking.ready
+        suggested = self.suggestions is not None
+
+        params = self.candidate_params(user, exclude_ids, self.CANDIDATE_BATCH if rejected else 1)
+        if from_likers:
+            params["liker_ids"] = sorted(likers)
+
+        if not rejected and not ranked:
+            # Вся выборка — один запрос: сначала тот, кто уже лайкнул пользователя, затем подсказка, иначе случайная
+            # анкета
+            return await self._fetch_profile(_next_candidate(any_sex, from_likers, suggested), params, bind)
+
+        # Пустое множество из Redis означает, что приоритетных кандидатов нет и запрос не нужен
+        prioritized = (
+            await self.session.execute(_prioritized_profiles(any_sex, from_likers), params, bind_arguments=bind)
+            if likers is None or likers
+            else ()
         )
-
-        return (await self.session.execute(stmt)).scalars().first()
-
-    async def set_reaction(self, liker_id: int, target_id: int, is_like: bool) -> tuple[LikeModel, bool]:
-        existing = (
-            await self.session.execute(
-                select(LikeModel).where(
-                    LikeModel.liker_id == liker_id,
-                    LikeModel.target_id == target_id,
+        for row in prioritized:
+            if row.id not in rejected:
+                return to_profile(row)
+
+        if suggested:
+            for row in await self.session.execute(_suggested_profiles(any_sex), params, bind_arguments=bind):
+                if row.id not in rejected:
+                    return to_profile(row)
+
+        if ranked:
+            ranked_candidate = await self._get_ranked_candidate(user, [*exclude_ids, *rejected], bind)
+            if ranked_candidate:
+                return ranked_candidate
+
+        if not rejected:
+            # Целиком загружается только выбранная анкета
+            return await self._fetch_profile(_random_profile(any_sex), params, bind)
+
+        candidate_ids = (
+            await self.session.execute(random_candidate_ids(any_sex), params, bind_arguments=bind)
+        ).scalars().all()
+        candidate_id = next((candidate_id for candidate_id in candidate_ids if candidate_id not in rejected), None)
+        if candidate_id is None and len(candidate_ids) == self.CANDIDATE_BATCH:
+            # Почти весь пул уже отклонен: идем по id от случайной точки пула и по кругу
+            start = random.choice(candidate_ids)
+            candidate_id = await self._scan_candidate_id(any_sex, params, rejected, start, None, bind)
+            if candidate_id is None:
+                candidate_id = await self._scan_candidate_id(any_sex, params, rejected, 0, start, bind)
+        if candidate_id is None:
+            return None
+        return await self._load_candidate(candidate_id, bind)
+
+    async def _scan_candidate_id(
+        self, any_sex: bool, params: dict, rejected: RejectionSet, after: int, until: int | None, bind: dict | None
+    ) -> int | None:
+        """Первый подходящий id в (``after``, ``until``] не из набора отказов"""
+        # Каждый шаг — запрос с LIMIT 1, который пропускает до REJECTION_WINDOW отказов, поэтому шагов не больше
+        # len(rejected) / REJECTION_WINDOW + 1 независимо от размера пула
+        while True:
+            position = bisect_right(rejected.ids, after)
+            skip_ids = rejected.ids[position:position + self.REJECTION_WINDOW].tolist()
+            candidate_id = (
+                await self.session.execute(
+                    _next_eligible_id(any_sex), {**params, "after": after, "skip_ids": skip_ids}, bind_arguments=bind
                 )
-            )
-        ).scalars().first()
+            ).scalar()
+            if candidate_id is None or (until is not None and candidate_id > until):
+                return None
+            if candidate_id not in rejected:
+                return candidate_id
+            # Все подходящие id до candidate_id отклонены: следующее окно начинается после него
+            after = candidate_id
+
+    async def _fetch_profile(self, stmt, params: dict, bind: dict | None = None) -> UserProfile | None:
+        row = (await self.session.execute(stmt, params, bind_arguments=bind)).first()
+        return to_profile(row) if row is not None else None
+
+    async def _load_candidate(self, candidate_id: int, bind: dict | None = None) -> UserProfile | None:
+        return await self._fetch_profile(profile_by("id"), {"key": candidate_id}, bind)
+
+    @staticmethod
+    def _is_eligible(user: UserProfile, candidate: UserProfile) -> bool:
+        if candidate.search_sex != user.sex or (user.search_sex and candidate.sex != user.search_sex):
+            return False
+        return (
+            (user.min_age is None or candidate.age >= user.min_age)
+            and (user.max_age is None or candidate.age <= user.max_age)
+            and (candidate.min_age is None or user.age >= candidate.min_age)
+            and (candidate.max_age is None or user.age <= candidate.max_age)
+        )
 
-        if existing:
-            existing.is_like = is_like
-            like = existing
-        else:
-            like = LikeModel(liker_id=liker_id, target_id=target_id, is_like=is_like)
-            self.session.add(like)
+    async def _get_ranked_candidate(
+        self, user: UserProfile, exclude_ids: list[int], bind: dict | None = None
+    ) -> UserProfile | None:
+        # Оцененные читаются из базы только при первом поиске пользователя после загрузки индекса
+        rated_ids = self.user_index.rated(user.id) if self.user_index is not None else None
+        if rated_ids is None:
+            rated_ids = (
+                await self.session.execute(_rated_ids(), {"user_id": user.id}, bind_arguments=bind)
+            ).scalars().all()
+            if self.user_index is not None:
+                rated_ids = self.user_index.remember_rated(user.id, rated_ids)
+        candidate_id = self.ranking.pick(user, [*rated_ids, *exclude_ids])
+        if candidate_id is None:
+            return None
+
+        candidate = await self._load_candidate(candidate_id, bind)
+        # Индекс мог разойтись с базой: анкета удалена или поменяла пол/предпочтения
+        if candidate is None or not self._is_eligible(user, candidate):
+            return None
+        return candidate
+
+    async def set_reaction(self, liker_id: int, target_id: int, is_like: bool) -> tuple[Reaction, bool]:
+        params = {"liker": liker_id, "target": target_id, "like": is_like}
+        # Прежнее значение нужно индексу анкет, чтобы популярность менялась только при новой или измененной реакции.
+        # Новая реакция по-прежнему стоит два запроса, а повтор той же — один
+        row = (await self.session.execute(_reaction(), params)).first()
+        previous = None if row is None else row.is_like
+        if row is None:
+            row = (await self.session.execute(_insert_reaction(), params)).one()
+        elif previous != is_like:
+            row = (await self.session.execute(_update_reaction(), params)).one()
+        reaction = Reaction(*row)
 
         await self.session.commit()
-        await self.session.refresh(like)
+        pin_writer(self.session, ("user", liker_id))
+        if self.user_index is not None:
+            self.user_index.record_reaction(liker_id, target_id, is_like, previous)
+        if self.liked_me is not None:
+            await self.liked_me.record(liker_id, target_id, is_like)
 
         matched = False
         if is_like and await self._has_positive_reaction(target_id, liker_id):
             matched = await self._ensure_match(liker_id, target_id)
 
-        return like, matched
+        return reaction, matched
 
     async def _has_positive_reaction(self, liker_id: int, target_id: int) -> bool:
-        stmt = select(LikeModel).where(
-            LikeModel.liker_id == liker_id,
-            LikeModel.target_id == target_id,
-            LikeModel.is_like.is_(True),
-        )
-        return (await self.session.execute(stmt)).scalars().first() is not None
+        if self.liked_me is not None:
+            liked = await self.liked_me.liked(target_id, liker_id, partial(self._load_likers, target_id))
+            # Отказ окончательный. Совпадение редкое и проверяется по базе, чтобы устаревшее множество
+            # не создало лишний мэтч
+            if liked is False:
+                return False
+        params = {"liker": liker_id, "target": target_id}
+        return (await self.session.execute(_positive_reaction(), params)).first() is not None
 
     async def _ensure_match(self, user_a_id: int, user_b_id: int) -> bool:
         left_id, right_id = sorted((user_a_id, user_b_id))
-        stmt = select(MatchModel).where(
-            MatchModel.user_left_id == left_id,
-            MatchModel.user_right_id == right_id,
-        )
-        existing = (await self.session.execute(stmt)).scalars().first()
-        if existing:
+        # Вместо предварительного SELECT полагаемся на uq_matches_pair: так не гоняются одновременные взаимные лайки
+        try:
+            async with self.session.begin_nested():
+                self.session.add(MatchModel(user_left_id=left_id, user_right_id=right_id))
+        except IntegrityError:
             return False
-
-        match = MatchModel(user_left_id=left_id, user_right_id=right_id)
-        self.session.add(match)
         await self.session.commit()
+        # Мэтч должен сразу появиться в списке у обоих
+        pin_writer(self.session, ("user", user_a_id), ("user", user_b_id))
+        if self.match_events is not None:
+            # Тот, кто нажал лайк, узнает о мэтче сразу; второй стороне уведомление отправится в фоне
+            await self.match_events.publish(MatchEvent(recipient_id=user_b_id, partner_id=user_a_id))
         return True
 
     async def count_matches(self, user_id: int) -> int:
-        stmt = select(func.count()).select_from(MatchModel).where(
-            or_(MatchModel.user_left_id == user_id, MatchModel.user_right_id == user_id)
-        )
-        return (await self.session.execute(stmt)).scalar_one()
+        bind = read_bind(self.session, ("user", user_id))
+        return (await self.session.execute(_match_count(), {"user_id": user_id}, bind_arguments=bind)).scalar_one()
 
     async def list_matches(
         self, user_id: int, offset: int = 0, limit: int = 1
-    ) -> tuple[list[tuple[MatchModel, UserModel]], int]:
+    ) -> tuple[list[tuple[Match, UserProfile]], int]:
         total = await self.count_matches(user_id)
         if total == 0:
             return [], 0
 
-        stmt = (
-            select(MatchModel)
-            .where(or_(MatchModel.user_left_id == user_id, MatchModel.user_right_id == user_id))
-            .order_by(MatchModel.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-        )
-
-        matches = list((await self.session.execute(stmt)).scalars().all())
-        if not matches:
-            return [], total
-
-        other_user_ids = [
-            match.user_right_id if match.user_left_id == user_id else match.user_left_id
-            for match in matches
+        params = {"user_id": user_id, "offset": offset, "limit": limit}
+        bind = read_bind(self.session, ("user", user_id))
+        profile_width = len(PROFILE_COLUMNS)
+        pairs = [
+            (Match(*row[profile_width:]), to_profile(row[:profile_width]))
+            for row in await self.session.execute(_match_page(), params, bind_arguments=bind)
         ]
-
-        users = (
-            await self.session.execute(
-                select(UserModel)
-                .options(selectinload(UserModel.faculty))
-                .where(UserModel.id.in_(other_user_ids))
-            )
-        ).scalars().all()
-        users_map = {user.id: user for user in users}
-
-        pairs: list[tuple[MatchModel, UserModel]] = []
-        for match, other_id in zip(matches, other_user_ids):
-            other_user = users_map.get(other_id)
-            if other_user:
-                pairs.append((match, other_user))
-
         return pairs, total
@@ -0,0 +1,164 @@
+"""
+Планировщик фоновых задач процесса
+
+Периодическая и отложенная работа (перезагрузка индекса анкет, сжатие отказов, логи метрик) регистрируется здесь,
+а не запускает свой ``asyncio.create_task``. Все задачи делят общий лимит одновременных запусков, поэтому фон
+не отнимает у обработки апдейтов больше ``max_concurrency`` корутин. Интервал сдвигается на случайную долю
+``jitter``, чтобы задачи не просыпались одновременно. Если прошлый запуск задачи еще идет, очередной пропускается.
+При остановке новые запуски прекращаются, а начатые получают ``drain_timeout`` секунд на завершение.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import random
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from datemate.infrastructure.metrics import Histogram, detach_update, histogram_lines
+
+logger = logging.getLogger("datemate.scheduler")
+
+JobFunc = Callable[[], Awaitable[Any] | Any]
+
+
+class Job:
+    __slots__ = (
+        "name",
+        "func",
+        "interval",
+        "first_run",
+        "jitter",
+        "timeout",
+        "duration",
+        "runs",
+        "failures",
+        "skipped",
+        "_running",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        func: JobFunc,
+        interval: float | None,
+        first_run: float,
+        jitter: float,
+        timeout: float | None,
+    ):
+        self.name = name
+        self.func = func
+        # None — одноразовая задача
+        self.interval = interval
+        self.first_run = first_run
+        self.jitter = jitter
+        self.timeout = timeout
+        self.duration = Histogram((0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self._running: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._running is not None and not self._running.done()
+
+
+class Scheduler:
+    def __init__(self, max_concurrency: int = 2, drain_timeout: float = 10, rng: random.Random | None = None):
+        self.drain_timeout = drain_timeout
+        self.jobs: dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._rng = rng or random.Random()
+        self._timers: list[asyncio.Task] = []
+        self._started = False
+        self._closed = False
+
+    def every(
+        self,
+        name: str,
+        interval: float,
+        func: JobFunc,
+        first_run: float | None = None,
+        jitter: float = 0.1,
+        timeout: float | None = None,
+    ) -> Job:
+        """Запуск раз в ``interval`` секунд; первый — через ``first_run`` (по умолчанию через интервал)"""
+        return self._add(Job(name, func, interval, interval if first_run is None else first_run, jitter, timeout))
+
+    def once(self, name: str, func: JobFunc, delay: float = 0, timeout: float | None = None) -> Job:
+        return self._add(Job(name, func, None, delay, 0, timeout))
+
+    def _add(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} is already scheduled")
+        self.jobs[job.name] = job
+        if self._started:
+            self._timers.append(asyncio.create_task(self._timer(job)))
+        return job
+
+    def start(self) -> None:
+        self._started = True
+        self._timers = [asyncio.create_task(self._timer(job)) for job in self.jobs.values()]
+
+    def _jittered(self, delay: float, jitter: float) -> float:
+        return max(delay * (1 + self._rng.uniform(-jitter, jitter)), 0)
+
+    async def _timer(self, job: Job) -> None:
+        # once() можно вызвать из хендлера; запуски задачи создаются отсюда и наследуют уже чистый контекст
+        detach_update()
+        delay = job.first_run
+        while not self._closed:
+            await asyncio.sleep(self._jittered(delay, job.jitter))
+            if job.running:
+                job.skipped += 1
+                logger.warning("Job %s is still running, skipping this run", job.name)
+            else:
+                job._running = asyncio.create_task(self._execute(job))
+            if job.interval is None:
+                return
+            delay = job.interval
+
+    async def _execute(self, job: Job) -> None:
+        async with self._slots:
+            started = perf_counter()
+            try:
+                result = job.func()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, job.timeout)
+            except asyncio.TimeoutError:
+                job.failures += 1
+                logger.error("Job %s timed out after %.0fs", job.name, job.timeout)
+            except Exception:
+                job.failures += 1
+                logger.exception("Job %s failed", job.name)
+            finally:
+                job.runs += 1
+                job.duration.observe(perf_counter() - started)
+
+    async def close(self) -> None:
+        self._closed = True
+        for timer in self._timers:
+            timer.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+
+        running = [job._running for job in self.jobs.values() if job.running]
+        if not running:
+            return
+        _, pending = await asyncio.wait(running, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            logger.warning("Cancelled %d jobs that did not finish in %.0fs", len(pending), self.drain_timeout)
+
+    def prometheus_lines(self) -> list[str]:
+        lines = ["# TYPE datemate_job_duration_seconds histogram"]
+        for name, job in sorted(self.jobs.items()):
+            lines.extend(histogram_lines("datemate_job_duration_seconds", f'job="{name}"', job.duration))
+        for metric, attribute in (("datemate_job_failures_total", "failures"), ("datemate_job_skipped_total", "skipped")):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{job="{name}"}} {getattr(job, attribute)}' for name, job in sorted(self.jobs.items()))
+        return lines
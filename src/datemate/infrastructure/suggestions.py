@@ -0,0 +1,214 @@
+"""
+Пакетный расчет подсказок: top-N кандидатов для каждого активного пользователя
+
+Задача снимает компактный снимок анкет (те же колонки, что у ``UserIndex``) и раздает пользователей пачками
+в ``ProcessPoolExecutor``. Каждый процесс один раз получает снимок и оценивает кандидатов тем же
+``RankingEngine``, что и поиск, без случайного выбора: в ``suggestions`` пишутся лучшие ``top_n`` по скору.
+Уже оцененные анкеты (строки ``likes`` и наборы отказов) исключаются заранее. ``MatchRepository`` выдает
+подсказки сразу после тех, кто уже лайкнул пользователя, и повторно проверяет те же условия, что для остальных
+кандидатов. Поэтому устаревшая подсказка может только пропуститься.
+
+Расчет инкрементальный. Для каждого пользователя в ``suggestion_inputs`` хранится отпечаток его входных данных:
+пол, предпочтения, возраст, факультет и время последней реакции. Пересчитываются те, у кого отпечаток изменился,
+подсказки старше ``max_age`` (чтобы учесть новые анкеты) и новые пользователи. Не реагировавшие дольше
+``active_within`` пропускаются.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from time import perf_counter
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from datemate.infrastructure.db import LikeModel, RejectionSetModel, SuggestionInputsModel, SuggestionModel
+from datemate.infrastructure.ranking import RankingEngine, RankingWeights
+from datemate.infrastructure.rejections import decode
+from datemate.infrastructure.user_index import IndexRow, UserIndex, fetch_index_rows, unix_time
+
+logger = logging.getLogger("datemate.suggestions")
+
+
+@dataclass(frozen=True)
+class SuggestionPolicy:
+    top_n: int = 30
+    # Пользователей в одной пачке для процесса
+    chunk_size: int = 2000
+    # None — по числу ядер
+    workers: int | None = None
+    max_age: timedelta = timedelta(days=1)
+    active_within: timedelta = timedelta(days=30)
+    weights: RankingWeights = field(default_factory=RankingWeights)
+
+
+@dataclass
+class SuggestionStats:
+    users: int = 0
+    inactive: int = 0
+    unchanged: int = 0
+    computed: int = 0
+    rows: int = 0
+
+
+def fingerprint(row: IndexRow) -> int:
+    """Отпечаток того, от чего зависят подсказки пользователя, кроме пула кандидатов"""
+    inputs = (row.sex, row.search_sex, row.age, row.min_age, row.max_age, row.faculty_id, unix_time(row.last_active))
+    return int.from_bytes(blake2b(repr(inputs).encode(), digest_size=8).digest(), "big", signed=True)
+
+
+# Состояние процесса пула: движок поверх снимка, полученного при старте процесса
+_engine: RankingEngine | None = None
+
+
+def _init_worker(index: UserIndex, weights: RankingWeights) -> None:
+    global _engine
+    _engine = RankingEngine(index, weights)
+
+
+def _profile_key(row: IndexRow) -> tuple:
+    # Скоры кандидатов зависят только от этих полей зрителя, его id и оцененные анкеты отсекаются потом
+    return row.sex, row.search_sex or "", row.age, row.min_age or 0, row.max_age or 0, row.faculty_id or ""
+
+
+def _suggest(viewers: list[IndexRow], excluded: dict[int, list[int]], top_n: int, now: float) -> list[tuple]:
+    # Пул оценивается один раз на одинаковых зрителей, а не на каждого: таких групп в разы меньше, чем пользователей
+    ranked: dict[tuple, np.ndarray] = {}
+    results = []
+    for viewer in viewers:
+        key = _profile_key(viewer)
+        order = ranked.get(key)
+        if order is None:
+            # id 0 не встречается, поэтому в пул попадает и сам первый зритель группы — для остальных он кандидат
+            ids, scores = _engine.candidates(replace(viewer, id=0), (), now)
+            # Стабильная сортировка: при равном скоре порядок не зависит от запуска
+            order = ranked[key] = ids[np.argsort(-scores, kind="stable")]
+        skip = np.fromiter((viewer.id, *excluded.get(viewer.id, ())), dtype=np.int32)
+        head = order[:top_n + skip.size]
+        results.append((viewer.id, head[~np.isin(head, skip)][:top_n].tolist()))
+    return results
+
+
+async def _load_excluded(
+    session_factory: async_sessionmaker[AsyncSession], user_ids: list[int]
+) -> dict[int, list[int]]:
+    excluded: dict[int, list[int]] = defaultdict(list)
+    async with session_factory() as session:
+        rated = await session.execute(
+            select(LikeModel.liker_id, LikeModel.target_id).where(LikeModel.liker_id.in_(user_ids))
+        )
+        for liker_id, target_id in rated:
+            excluded[liker_id].append(target_id)
+        rejections = await session.execute(
+            select(RejectionSetModel.user_id, RejectionSetModel.targets).where(RejectionSetModel.user_id.in_(user_ids))
+        )
+        for user_id, blob in rejections:
+            excluded[user_id].extend(decode(blob))
+    return excluded
+
+
+async def _store(
+    session_factory: async_sessionmaker[AsyncSession],
+    results: list[tuple],
+    fingerprints: dict[int, int],
+    now: datetime,
+    stats: SuggestionStats,
+) -> None:
+    user_ids = [user_id for user_id, _ in results]
+    rows = [
+        {"user_id": user_id, "rank": rank, "candidate_id": candidate_id}
+        for user_id, candidate_ids in results
+        for rank, candidate_id in enumerate(candidate_ids)
+    ]
+    inputs = [{"user_id": user_id, "fingerprint": fingerprints[user_id], "computed_at": now} for user_id in user_ids]
+    # Подсказки пачки заменяются одной транзакцией: поиск видит либо старые, либо новые. Вставка через таблицы,
+    # а не модели: ORM-вставка пачки в разы медленнее и здесь ничего не дает
+    suggestions, suggestion_inputs = SuggestionModel.__table__, SuggestionInputsModel.__table__
+    async with session_factory() as session, session.begin():
+        conn = await session.connection()
+        await conn.execute(delete(suggestions).where(suggestions.c.user_id.in_(user_ids)))
+        await conn.execute(delete(suggestion_inputs).where(suggestion_inputs.c.user_id.in_(user_ids)))
+        if rows:
+            await conn.execute(insert(suggestions), rows)
+        await conn.execute(insert(suggestion_inputs), inputs)
+    stats.computed += len(user_ids)
+    stats.rows += len(rows)
+
+
+async def precompute_suggestions(
+    session_factory: async_sessionmaker[AsyncSession], policy: SuggestionPolicy, now: datetime | None = None
+) -> SuggestionStats:
+    now = now or datetime.now(timezone.utc)
+    stats = SuggestionStats()
+    started = perf_counter()
+
+    async with session_factory() as session:
+        rows = await fetch_index_rows(session)
+        inputs = select(
+            SuggestionInputsModel.user_id, SuggestionInputsModel.fingerprint, SuggestionInputsModel.computed_at
+        )
+        previous = {
+            user_id: (value, unix_time(computed_at)) for user_id, value, computed_at in await session.execute(inputs)
+        }
+
+    active_since = (now - policy.active_within).timestamp()
+    expired_before = (now - policy.max_age).timestamp()
+    fingerprints: dict[int, int] = {}
+    due: list[IndexRow] = []
+    for row in rows:
+        stats.users += 1
+        if row.last_active is not None and unix_time(row.last_active) < active_since:
+            stats.inactive += 1
+            continue
+        fingerprints[row.id] = fingerprint(row)
+        value, computed_at = previous.get(row.id, (None, 0))
+        if value == fingerprints[row.id] and computed_at >= expired_before:
+            stats.unchanged += 1
+            continue
+        due.append(row)
+
+    if due:
+        index = UserIndex()
+        index.load(rows)
+        # Одинаковые зрители оказываются в одной пачке и оцениваются вместе
+        due.sort(key=_profile_key)
+        workers = policy.workers or os.cpu_count() or 1
+        # spawn, а не fork: в родителе работают потоки драйвера базы и цикл событий
+        executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(index, policy.weights),
+        )
+        loop = asyncio.get_running_loop()
+        # Пока процессы считают, следующая пачка читается из базы, а готовая пишется; в работе не больше двух пачек
+        # на процесс, чтобы память не росла с размером базы
+        in_flight_limit = 2 * workers
+        pending: set[asyncio.Future] = set()
+        try:
+            for start in range(0, len(due), policy.chunk_size):
+                chunk = due[start:start + policy.chunk_size]
+                excluded = await _load_excluded(session_factory, [row.id for row in chunk])
+                pending.add(
+                    loop.run_in_executor(executor, _suggest, chunk, excluded, policy.top_n, now.timestamp())
+                )
+                if len(pending) >= in_flight_limit:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        await _store(session_factory, future.result(), fingerprints, now, stats)
+            for future in asyncio.as_completed(pending):
+                await _store(session_factory, await future, fingerprints, now, stats)
+        finally:
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+    logger.info("Suggestions: %s in %.1fs", stats, perf_counter() - started)
+    return stats
@@ -0,0 +1,303 @@
+"""
+Компактный индекс анкет в памяти процесса
+
+Пользователи разложены по корзинам ``(sex, search_sex)``: кандидаты для пользователя лежат целиком в одной корзине
+(или в двух, если ``search_sex`` пуст). В корзине — колонки ``array.array``, отсортированные по id: id, возраст,
+код факультета, число входящих лайков, время последней активности и интересующий возраст, 18 байт на пользователя.
+Пол и кого ищет задаются самой корзиной.
+
+Индекс загружается одним запросом в фоне после старта (пока он не готов, поиск идет через SQL) и обновляется
+точечно из ``UserRepository.upsert_user`` и ``MatchRepository.set_reaction``; полная перезагрузка в фоне только
+выравнивает расхождения. Точечные обновления, пришедшие во время загрузки, повторяются на новом индексе.
+
+Рядом лежат id анкет, которые уже оценили недавно искавшие пользователи: ранжирование исключает их, не читая
+``likes`` на каждый свайп. Кэш ограничен общим числом id и вытесняет давно не искавших; перезагрузка его сбрасывает.
+"""
+
+from __future__ import annotations
+
+import logging
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from time import perf_counter, time
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from datemate.domain.entities import UserProfile
+from datemate.infrastructure.db import LikeModel, UserModel
+
+
+@dataclass(frozen=True)
+class IndexRow:
+    id: int
+    age: int
+    faculty_id: str
+    sex: str
+    search_sex: str
+    likes: int = 0
+    last_active: datetime | None = None
+    min_age: int | None = None
+    max_age: int | None = None
+
+
+class IndexBucket:
+    __slots__ = ("ids", "age", "faculty", "likes", "last_active", "min_age", "max_age")
+
+    def __init__(self):
+        self.ids = array("i")
+        self.age = array("h")
+        self.faculty = array("h")
+        self.likes = array("I")
+        # Unix-время последней реакции пользователя, 0 — еще не свайпал
+        self.last_active = array("I")
+        # Интересующий возраст, 0 — без ограничения
+        self.min_age = array("B")
+        self.max_age = array("B")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def columns(self) -> tuple[array, ...]:
+        return self.ids, self.age, self.faculty, self.likes, self.last_active, self.min_age, self.max_age
+
+    def position(self, user_id: int) -> int | None:
+        position = bisect_left(self.ids, user_id)
+        if position < len(self.ids) and self.ids[position] == user_id:
+            return position
+        return None
+
+    def insert(
+        self,
+        user_id: int,
+        age: int,
+        faculty: int,
+        likes: int = 0,
+        last_active: int = 0,
+        min_age: int = 0,
+        max_age: int = 0,
+    ) -> None:
+        position = bisect_left(self.ids, user_id)
+        for column, value in zip(self.columns(), (user_id, age, faculty, likes, last_active, min_age, max_age)):
+            column.insert(position, value)
+
+    def pop(self, position: int) -> tuple[int, ...]:
+        return tuple(column.pop(position) for column in self.columns())
+
+
+def unix_time(value: datetime | None) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class UserIndex:
+    def __init__(self, rated_capacity: int = 2_000_000):
+        self.buckets: dict[tuple[str, str], IndexBucket] = {}
+        self._faculty_codes: dict[str, int] = {}
+        self.max_likes = 0
+        self.loaded = False
+        # Обновления, пришедшие во время refresh; None — загрузка не идет
+        self._pending: list[Callable[[], None]] | None = None
+        # Оцененные анкеты по пользователю в порядке последнего поиска, не больше rated_capacity id на все записи
+        self.rated_capacity = rated_capacity
+        self._rated: OrderedDict[int, array] = OrderedDict()
+        self._rated_size = 0
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(
+            column.itemsize * len(column) for bucket in self.buckets.values() for column in bucket.columns()
+        )
+
+    def faculty_code(self, faculty_id: str | None) -> int:
+        if faculty_id is None:
+            return -1
+        return self._faculty_codes.setdefault(faculty_id, len(self._faculty_codes))
+
+    def bucket(self, sex: str, search_sex: str) -> IndexBucket:
+        bucket = self.buckets.get((sex, search_sex))
+        if bucket is None:
+            bucket = self.buckets[(sex, search_sex)] = IndexBucket()
+        return bucket
+
+    def candidate_buckets(self, user: UserProfile) -> Iterator[IndexBucket]:
+        """Корзины, где лежат подходящие пользователю анкеты: ищут его пол и подходят под его предпочтения"""
+        for (sex, search_sex), bucket in self.buckets.items():
+            if search_sex == user.sex and (not user.search_sex or sex == user.search_sex):
+                yield bucket
+
+    def load(self, rows: Iterable[IndexRow]) -> None:
+        buckets: dict[tuple[str, str], IndexBucket] = {}
+        faculty_codes: dict[str, int] = {}
+        max_likes = 0
+        for row in sorted(rows, key=lambda row: row.id):
+            bucket = buckets.get((row.sex, row.search_sex))
+            if bucket is None:
+                bucket = buckets[(row.sex, row.search_sex)] = IndexBucket()
+            bucket.ids.append(row.id)
+            bucket.age.append(row.age)
+            bucket.faculty.append(faculty_codes.setdefault(row.faculty_id, len(faculty_codes)))
+            bucket.likes.append(row.likes)
+            bucket.last_active.append(unix_time(row.last_active))
+            bucket.min_age.append(row.min_age or 0)
+            bucket.max_age.append(row.max_age or 0)
+            max_likes = max(max_likes, row.likes)
+
+        # Подменяем целиком, чтобы выбор кандидата не увидел наполовину собранный индекс
+        self.buckets, self._faculty_codes, self.max_likes = buckets, faculty_codes, max_likes
+        # Отказы могли истечь или сжаться: оцененные перечитаются из базы при следующем поиске
+        self._rated.clear()
+        self._rated_size = 0
+        self.loaded = True
+
+    def rated(self, user_id: int) -> array | None:
+        """Id анкет, которые пользователь уже оценил; None — в кэше нет, нужно прочитать из базы"""
+        rated = self._rated.get(user_id)
+        if rated is not None:
+            self._rated.move_to_end(user_id)
+        return rated
+
+    def remember_rated(self, user_id: int, target_ids: Iterable[int]) -> array:
+        rated = array("i", target_ids)
+        previous = self._rated.pop(user_id, None)
+        if previous is not None:
+            # Реакция, записанная пока шло чтение, не теряется; повторы исключению не мешают
+            self._rated_size -= len(previous)
+            rated.extend(previous)
+        self._rated[user_id] = rated
+        self._rated_size += len(rated)
+        while self._rated_size > self.rated_capacity and len(self._rated) > 1:
+            _, evicted = self._rated.popitem(last=False)
+            self._rated_size -= len(evicted)
+        return rated
+
+    def _locate(self, user_id: int) -> tuple[IndexBucket, int] | None:
+        for bucket in self.buckets.values():
+            position = bucket.position(user_id)
+            if position is not None:
+                return bucket, position
+        return None
+
+    def upsert(
+        self,
+        user_id: int,
+        sex: str,
+        search_sex: str,
+        age: int,
+        faculty_id: str,
+        min_age: int | None = None,
+        max_age: int | None = None,
+    ) -> None:
+        if self._pending is not None:
+            self._pending.append(partial(self._upsert, user_id, sex, search_sex, age, faculty_id, min_age, max_age))
+        self._upsert(user_id, sex, search_sex, age, faculty_id, min_age, max_age)
+
+    def _upsert(
+        self,
+        user_id: int,
+        sex: str,
+        search_sex: str,
+        age: int,
+        faculty_id: str,
+        min_age: int | None,
+        max_age: int | None,
+    ) -> None:
+        likes = last_active = 0
+        located = self._locate(user_id)
+        if located is not None:
+            bucket, position = located
+            _, _, _, likes, last_active, _, _ = bucket.pop(position)
+        self.bucket(sex, search_sex).insert(
+            user_id, age, self.faculty_code(faculty_id), likes, last_active, min_age or 0, max_age or 0
+        )
+
+    def record_reaction(
+        self, liker_id: int, target_id: int, is_like: bool, previous: bool | None = None, at: float | None = None
+    ) -> None:
+        """``previous`` — прежняя реакция на ту же анкету (None — ее не было): повтор лайка не считается дважды"""
+        at = at if at is not None else time()
+        if self._pending is not None:
+            self._pending.append(partial(self._record_reaction, liker_id, target_id, is_like, previous, at))
+        self._record_reaction(liker_id, target_id, is_like, previous, at)
+
+    def _record_reaction(self, liker_id: int, target_id: int, is_like: bool, previous: bool | None, at: float) -> None:
+        rated = self._rated.get(liker_id)
+        if rated is not None and previous is None:
+            rated.append(target_id)
+            self._rated_size += 1
+
+        located = self._locate(liker_id)
+        if located is not None:
+            bucket, position = located
+            bucket.last_active[position] = int(at)
+
+        delta = int(is_like) - int(bool(previous))
+        if delta:
+            located = self._locate(target_id)
+            if located is not None:
+                bucket, position = located
+                bucket.likes[position] = max(bucket.likes[position] + delta, 0)
+                self.max_likes = max(self.max_likes, bucket.likes[position])
+
+    async def refresh(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        started = perf_counter()
+        self._pending = []
+        try:
+            async with session_factory() as session:
+                rows = await fetch_index_rows(session)
+            self.load(rows)
+            # Реакция, закоммиченная перед чтением, может учесться дважды; следующая перезагрузка это выровняет
+            for update in self._pending:
+                update()
+        finally:
+            self._pending = None
+        logging.info(
+            "User index: %d users, %d KiB in %.0fms",
+            len(rows),
+            self.memory_bytes // 1024,
+            (perf_counter() - started) * 1000,
+        )
+
+
+async def fetch_index_rows(session: AsyncSession) -> list[IndexRow]:
+    """Все анкеты с числом входящих лайков и временем последней реакции"""
+    # Группировки по likes соединяются с users, а не считаются коррелированным подзапросом на каждую анкету
+    incoming = (
+        select(LikeModel.target_id.label("user_id"), func.count().label("likes"))
+        .where(LikeModel.is_like.is_(True))
+        .group_by(LikeModel.target_id)
+        .subquery()
+    )
+    activity = (
+        select(LikeModel.liker_id.label("user_id"), func.max(LikeModel.created_at).label("last_active"))
+        .group_by(LikeModel.liker_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            UserModel.id,
+            UserModel.age,
+            UserModel.faculty_id,
+            UserModel.sex,
+            UserModel.search_sex,
+            func.coalesce(incoming.c.likes, 0),
+            activity.c.last_active,
+            UserModel.min_age,
+            UserModel.max_age,
+        )
+        .outerjoin(incoming, incoming.c.user_id == UserModel.id)
+        .outerjoin(activity, activity.c.user_id == UserModel.id)
+        .order_by(UserModel.id)
+    )
+    return [IndexRow(*row) for row in (await session.execute(stmt)).all()]
@@ -1,52 +1,94 @@
+"""
+Точка входа бота
+
+Сам модуль импортирует только стандартную библиотеку: aiogram, SQLAlchemy и хендлеры подгружаются в ``main`` уже
+под замером, а с ``--profile-startup`` еще и с разбивкой по модулям. В этом режиме бот не запускает polling,
+а печатает время импортов и фаз инициализации и завершается::
+
+    PYTHONPATH=src python -m datemate.main --profile-startup
+
+Подкоманды ``export`` и ``import`` потоково выгружают и загружают пользователей, реакции и мэтчи
+(см. ``datemate.infrastructure.db.transfer``)::
+
+    PYTHONPATH=src python -m datemate.main export dump/ --format ndjson
+    PYTHONPATH=src python -m datemate.main import dump/
+"""
+
+from __future__ import annotations
+
+import argparse
 import asyncio
 import logging
+from pathlib import Path
 
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import RedisStorage
-from redis.asyncio import Redis
+from datemate.startup import ImportProfiler, StartupTimer
 
-from datemate.config import load_settings
-from datemate.infrastructure.db.session import create_engine, init_db
-from datemate.tgbot.functional import Phrases
-from datemate.tgbot.handlers.matchmaking import router as matchmaking_router
-from datemate.tgbot.handlers.registration import router as registration_router
-from datemate.tgbot.middlewares.db import DbSessionMiddleware
-from datemate.tgbot.middlewares.interface import InterfaceMiddleware
 
-
-async def main() -> None:
+async def main(profile_startup: bool = False) -> None:
     logging.basicConfig(level=logging.INFO)
+    timer = StartupTimer()
+    profiler = ImportProfiler().install() if profile_startup else None
 
-    settings = load_settings()
-    phrases = Phrases()
+    try:
+        with timer.phase("imports"):
+            from datemate.app import run
+            from datemate.config import load_settings
 
-    engine = create_engine(settings.database_url)
-    session_factory = await init_db(engine)
+        with timer.phase("settings"):
+            settings = load_settings()
+    finally:
+        if profiler:
+            profiler.uninstall()
 
-    redis = Redis.from_url(settings.redis_url)
-    # storage = RedisStorage(redis=redis)
-    storage = MemoryStorage()
+    if profiler:
+        profiler.log()
+    await run(settings, timer, profile_only=profile_startup)
 
-    bot = Bot(settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=storage)
-    dp.include_router(registration_router)
-    dp.include_router(matchmaking_router)
 
-    dp.message.middleware(DbSessionMiddleware(session_factory))
-    dp.callback_query.middleware(DbSessionMiddleware(session_factory))
-    dp.message.middleware(InterfaceMiddleware(phrases))
-    dp.callback_query.middleware(InterfaceMiddleware(phrases))
+async def transfer(args: argparse.Namespace) -> None:
+    logging.basicConfig(level=logging.INFO)
+    from datemate.config import load_settings
+    from datemate.infrastructure.db.migrations import migrate
+    from datemate.infrastructure.db.session import create_engine
+    from datemate.infrastructure.db.transfer import TABLES, export_tables, import_tables
 
-    await bot.delete_webhook(drop_pending_updates=True)
+    engine = create_engine(args.database_url or load_settings().database_url)
     try:
-        await dp.start_polling(bot, phrases=phrases)
+        if args.command == "export":
+            counts = await export_tables(engine, args.directory, args.tables or TABLES, args.format, args.chunk_size)
+        else:
+            await migrate(engine)
+            counts = await import_tables(engine, args.directory, args.tables, args.chunk_size)
     finally:
-        # await redis.close()
-        await bot.session.close()
+        await engine.dispose()
+    print(", ".join(f"{table}: {rows}" for table, rows in counts.items()))
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DateMate Telegram bot")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="report import and init phase timings, then exit without polling",
+    )
+    commands = parser.add_subparsers(dest="command")
+    for command, help_text in (
+        ("export", "stream users, likes, matches and rejection sets to CSV/NDJSON files"),
+        ("import", "load an export into empty tables"),
+    ):
+        subparser = commands.add_parser(command, help=help_text)
+        subparser.add_argument("directory", type=Path)
+        subparser.add_argument("--tables", nargs="+", help="defaults to all exported tables")
+        subparser.add_argument("--chunk-size", type=int, default=5_000)
+        subparser.add_argument("--database-url", help="defaults to DATABASE_URL from the settings")
+        if command == "export":
+            subparser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    return parser
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = _parser().parse_args()
+    if args.command:
+        asyncio.run(transfer(args))
+    else:
+        asyncio.run(main(profile_startup=args.profile_startup))
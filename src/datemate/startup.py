@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import logging
+import sys
+from contextlib import contextmanager
+from importlib.abc import Loader, MetaPathFinder
+from time import perf_counter
+from typing import Any, Iterator
+
+
+class StartupTimer:
+    """Длительность фаз запуска бота, чтобы видеть, на что уходит время до начала polling"""
+
+    def __init__(self, started: float | None = None):
+        self.started = perf_counter() if started is None else started
+        self.phases: dict[str, float] = {}
+
+    def record(self, name: str, elapsed: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, perf_counter() - started)
+
+    def summary(self) -> str:
+        parts = [f"{name}={elapsed * 1000:.1f}ms" for name, elapsed in self.phases.items()]
+        parts.append(f"total={(perf_counter() - self.started) * 1000:.1f}ms")
+        return " ".join(parts)
+
+    def log(self) -> None:
+        logging.info("startup %s", self.summary())
+
+
+class _TimedLoader(Loader):
+    def __init__(self, loader: Loader, name: str, profiler: ImportProfiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._loader, item)
+
+    def create_module(self, spec):
+        with self._profiler.measure(self._name):
+            return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        with self._profiler.measure(self._name):
+            self._loader.exec_module(module)
+
+
+class ImportProfiler(MetaPathFinder):
+    """Собственное и суммарное (с вложенными импортами) время импорта модулей, как ``python -X importtime``"""
+
+    def __init__(self):
+        self.timings: dict[str, list[float]] = {}
+        self._children: list[float] = []
+
+    def install(self) -> ImportProfiler:
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        self._children.append(0.0)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            own, cumulative = self.timings.setdefault(name, [0.0, 0.0])
+            self.timings[name] = [own + elapsed - children, cumulative + elapsed]
+
+    def top(self, limit: int = 25) -> list[str]:
+        rows = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [f"{cumulative * 1000:9.1f}ms {own * 1000:8.1f}ms  {name}" for name, (own, cumulative) in rows]
+
+    def log(self, limit: int = 25) -> None:
+        logging.info("slowest imports (cumulative, self):\n%s", "\n".join(self.top(limit)))
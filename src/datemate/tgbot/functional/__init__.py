@@ -1,9 +1,14 @@
 from .core_context import CoreContext, CoreMessage
+from .deletion import MessageDeletionQueue
 from .phrases import LanguagePhrases, Phrases
+from .prefetch import CandidatePrefetcher, PrefetchedCandidate
 
 __all__ = [
+    "CandidatePrefetcher",
     "CoreContext",
     "CoreMessage",
     "LanguagePhrases",
+    "MessageDeletionQueue",
     "Phrases",
+    "PrefetchedCandidate",
 ]
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from typing import Any, Dict
 
@@ -15,6 +16,7 @@ class CoreContext:
     CORE_MESSAGE_KEY: str = "core_message"
     LANGUAGE_KEY: str = "language"
     DEFAULT_FALLBACK_TEXT: str = "🔙 Нажми /start, чтобы вернуться в меню"
+    NOT_MODIFIED_ERROR: str = "message is not modified"
 
     __create_key = object()
 
@@ -25,6 +27,8 @@ class CoreContext:
         self.bot: Bot | None = None
         self.state: FSMContext | None = None
         self.data: Dict[str, Any] | None = None
+        # В FSM лежит словарь CoreMessage.to_dict(), здесь — объект, восстановленный из него за этот апдейт
+        self._message: CoreMessage | None = None
         self.fallback_text: str = self.DEFAULT_FALLBACK_TEXT
 
     @classmethod
@@ -40,15 +44,38 @@ class CoreContext:
     def _event_message(self, event: Message | CallbackQuery) -> Message:
         return event.message if isinstance(event, CallbackQuery) else event
 
+    @staticmethod
+    def _fingerprint(kind: str, body: str | None, media: str | None, reply_markup, *options) -> str:
+        dump_markup = getattr(reply_markup, "model_dump_json", None)
+        markup = dump_markup(exclude_none=True) if dump_markup else repr(reply_markup)
+
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (kind, body or "", media or "", markup, *map(str, options)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _is_not_modified(self, error: TelegramBadRequest) -> bool:
+        return self.NOT_MODIFIED_ERROR in error.message
+
+    async def _remember_render(self, core_message: CoreMessage, fingerprint: str | None, media: str | None):
+        core_message.fingerprint = fingerprint
+        core_message.media = media
+        await self.update_message(core_message)
+
     def message_exists(self) -> bool:
         return self.CORE_MESSAGE_KEY in self.data
 
     def get_message(self) -> CoreMessage:
-        return self.data[self.CORE_MESSAGE_KEY]
+        if self._message is None:
+            self._message = CoreMessage.from_dict(self.data[self.CORE_MESSAGE_KEY])
+        return self._message
 
     async def update_message(self, message: CoreMessage):
-        await self.state.update_data({self.CORE_MESSAGE_KEY: message})
-        self.data[self.CORE_MESSAGE_KEY] = message
+        stored = message.to_dict()
+        await self.state.update_data({self.CORE_MESSAGE_KEY: stored})
+        self.data[self.CORE_MESSAGE_KEY] = stored
+        self._message = message
 
     async def delete_core_message(self) -> None:
         if not self.message_exists():
@@ -64,6 +91,7 @@ class CoreContext:
         updated_data.pop(self.CORE_MESSAGE_KEY, None)
         await self.state.set_data(updated_data)
         self.data = updated_data
+        self._message = None
 
     async def respond_text(
         self,
@@ -77,9 +105,13 @@ class CoreContext:
         message = self._event_message(event)
         target_text = text
         fallback = fallback_text if fallback_text is not None else text
+        fingerprint = self._fingerprint("text", text, None, reply_markup, parse_mode, disable_web_page_preview)
 
         if self.message_exists():
             core_message = self.get_message()
+            if core_message.fingerprint == fingerprint:
+                return core_message
+
             try:
                 await self.bot.edit_message_text(
                     chat_id=core_message.chat_id,
@@ -89,10 +121,12 @@ class CoreContext:
                     parse_mode=parse_mode,
                     disable_web_page_preview=disable_web_page_preview,
                 )
+                await self._remember_render(core_message, fingerprint, None)
                 return core_message
             except TelegramBadRequest as text_error:
                 logging.error(text_error.message)
-                if text_error.message == "Bad Request: message is not modified":
+                if self._is_not_modified(text_error):
+                    await self._remember_render(core_message, fingerprint, None)
                     return core_message
 
                 target_text = fallback
@@ -106,7 +140,16 @@ class CoreContext:
             parse_mode=parse_mode,
             disable_web_page_preview=disable_web_page_preview,
         )
-        core_message = CoreMessage(new_message.chat.id, new_message.message_id, message.from_user.id, new_message.date)
+        if target_text != text:
+            fingerprint = self._fingerprint("text", target_text, None, reply_markup, parse_mode, disable_web_page_preview)
+
+        core_message = CoreMessage(
+            new_message.chat.id,
+            new_message.message_id,
+            message.from_user.id,
+            new_message.date,
+            fingerprint=fingerprint,
+        )
         await self.update_message(core_message)
         return core_message
 
@@ -122,18 +165,38 @@ class CoreContext:
         message = self._event_message(event)
         fallback = fallback_text or self.fallback_text
         caption_to_send = caption
+        # Загружаемый файл (InputFile) нельзя сравнить с уже отправленным, поэтому его всегда отправляем заново
+        media = photo if isinstance(photo, str) else None
+        fingerprint = self._fingerprint("photo", caption, media, reply_markup, parse_mode) if media else None
 
         if self.message_exists():
             core_message = self.get_message()
+            if fingerprint is not None and core_message.fingerprint == fingerprint:
+                return core_message
+
             try:
-                await self.bot.edit_message_media(
-                    chat_id=core_message.chat_id,
-                    message_id=core_message.message_id,
-                    media=InputMediaPhoto(media=photo, caption=caption, parse_mode=parse_mode),
-                    reply_markup=reply_markup,
-                )
+                if media is not None and core_message.media == media:
+                    await self.bot.edit_message_caption(
+                        chat_id=core_message.chat_id,
+                        message_id=core_message.message_id,
+                        caption=caption,
+                        parse_mode=parse_mode,
+                        reply_markup=reply_markup,
+                    )
+                else:
+                    await self.bot.edit_message_media(
+                        chat_id=core_message.chat_id,
+                        message_id=core_message.message_id,
+                        media=InputMediaPhoto(media=photo, caption=caption, parse_mode=parse_mode),
+                        reply_markup=reply_markup,
+                    )
+                await self._remember_render(core_message, fingerprint, media)
                 return core_message
-            except TelegramBadRequest:
+            except TelegramBadRequest as media_error:
+                if self._is_not_modified(media_error):
+                    await self._remember_render(core_message, fingerprint, media)
+                    return core_message
+
                 caption_to_send = fallback
                 await self.delete_core_message()
 
@@ -144,7 +207,17 @@ class CoreContext:
             reply_markup=reply_markup,
             parse_mode=parse_mode,
         )
-        core_message = CoreMessage(new_message.chat.id, new_message.message_id, message.from_user.id, new_message.date)
+        if media is not None and caption_to_send != caption:
+            fingerprint = self._fingerprint("photo", caption_to_send, media, reply_markup, parse_mode)
+
+        core_message = CoreMessage(
+            new_message.chat.id,
+            new_message.message_id,
+            message.from_user.id,
+            new_message.date,
+            fingerprint=fingerprint,
+            media=media,
+        )
         await self.update_message(core_message)
         return core_message
 
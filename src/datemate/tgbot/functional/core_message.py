@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Any, Dict
 
 
 class CoreMessage:
@@ -8,8 +9,41 @@ class CoreMessage:
     Используется принцип Single-Message-Dialog
     """
 
-    def __init__(self, chat_id: int, message_id: int, telegram_id: int, date: datetime):
+    def __init__(
+        self,
+        chat_id: int,
+        message_id: int,
+        telegram_id: int,
+        date: datetime,
+        fingerprint: str | None = None,
+        media: str | None = None,
+    ):
         self.chat_id = chat_id
         self.message_id = message_id
         self.telegram_id = telegram_id
         self.date = date
+        # Отпечаток последнего отрисованного содержимого и file_id фото, если сообщение с фото
+        self.fingerprint = fingerprint
+        self.media = media
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Представление для FSM-хранилища: RedisStorage сериализует данные в JSON"""
+        return {
+            "chat_id": self.chat_id,
+            "message_id": self.message_id,
+            "telegram_id": self.telegram_id,
+            "date": self.date.isoformat(),
+            "fingerprint": self.fingerprint,
+            "media": self.media,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CoreMessage":
+        return cls(
+            data["chat_id"],
+            data["message_id"],
+            data["telegram_id"],
+            datetime.fromisoformat(data["date"]),
+            fingerprint=data.get("fingerprint"),
+            media=data.get("media"),
+        )
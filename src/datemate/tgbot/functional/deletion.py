@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+
+from datemate.infrastructure.metrics import detach_update
+
+
+class MessageDeletionQueue:
+    """
+    Фоновое удаление пользовательских сообщений пачками через deleteMessages
+
+    Хендлер не ждет удаления: id сообщений копятся по чатам и отправляются одним запросом на чат
+    """
+
+    BATCH_LIMIT: int = 100  # deleteMessages принимает не больше 100 id за раз
+
+    def __init__(
+        self,
+        flush_delay: float = 0.2,
+        min_interval: float = 1 / 30,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self.flush_delay = flush_delay
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._pending: dict[int, tuple[Bot, list[int]]] = {}
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._closed = False
+        self._last_call = 0.0
+
+    def enqueue(self, bot: Bot, chat_id: int, message_id: int) -> None:
+        _, message_ids = self._pending.setdefault(chat_id, (bot, []))
+        message_ids.append(message_id)
+        self._wakeup.set()
+
+        if not self._closed and (self._worker is None or self._worker.done()):
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # Воркер создается из хендлера первого enqueue
+        detach_update()
+        while not self._closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Даем накопиться сообщениям, пришедшим почти одновременно
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            for chat_id, (bot, message_ids) in pending.items():
+                for start in range(0, len(message_ids), self.BATCH_LIMIT):
+                    await self._delete(bot, chat_id, message_ids[start:start + self.BATCH_LIMIT])
+
+    async def _delete(self, bot: Bot, chat_id: int, message_ids: list[int]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            await self._throttle()
+            try:
+                await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+                return
+            except TelegramRetryAfter as error:
+                await asyncio.sleep(error.retry_after)
+            except TelegramNetworkError:
+                await asyncio.sleep(self.retry_backoff * attempt)
+            except (TelegramBadRequest, TelegramForbiddenError) as error:
+                logging.warning("Can't delete messages %s in chat %s: %s", message_ids, chat_id, error.message)
+                return
+
+        logging.error("Gave up deleting messages %s in chat %s", message_ids, chat_id)
+
+    async def _throttle(self) -> None:
+        loop = asyncio.get_running_loop()
+        delay = self._last_call + self.min_interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_call = loop.time()
+
+    async def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        if self._worker is not None:
+            await self._worker
+        await self.flush()
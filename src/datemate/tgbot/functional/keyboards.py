@@ -35,6 +35,12 @@ def search_sex_keyboard(phrases: LanguagePhrases) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def age_range_keyboard(phrases: LanguagePhrases) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text=phrases["keyboards"]["age_range"]["any"], callback_data="age_range:any")
+    return builder.as_markup()
+
+
 def faculty_keyboard(faculties: list[Faculty]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for faculty in faculties:
@@ -120,3 +126,9 @@ def language_keyboard(phrases: LanguagePhrases) -> InlineKeyboardMarkup:
         InlineKeyboardButton(text=language_buttons["fr"], callback_data="language:fr"),
     )
     return builder.as_markup()
+
+
+def match_notification(phrases: LanguagePhrases) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text=phrases["keyboards"]["menu"]["matches"], callback_data="action:matches")
+    return builder.as_markup()
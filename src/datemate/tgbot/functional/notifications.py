@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import html
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from datemate.infrastructure.match_events import MatchEvent, MatchEventQueue
+from datemate.infrastructure.metrics import detach_update
+from datemate.infrastructure.repositories import UserRepository
+
+from . import keyboards
+from .phrases import Phrases
+
+logger = logging.getLogger("datemate.notifications")
+
+
+class MatchNotifier:
+    """
+    Пул воркеров, которые сообщают второй стороне о взаимном лайке
+
+    Воркеры разбирают ``MatchEventQueue`` и делят общий лимит отправки. Ошибки сети и 429 повторяются,
+    заблокировавший бота пользователь пропускается. Если недоступна сама очередь (Redis), воркер ждет с растущей
+    до ``max_queue_backoff`` секунд паузой и пробует снова
+    """
+
+    def __init__(
+        self,
+        queue: MatchEventQueue,
+        session_factory: async_sessionmaker[AsyncSession],
+        phrases: Phrases,
+        workers: int = 4,
+        min_interval: float = 1 / 25,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        max_queue_backoff: float = 30,
+    ) -> None:
+        self.queue = queue
+        self.session_factory = session_factory
+        self.phrases = phrases
+        self.workers = workers
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_queue_backoff = max_queue_backoff
+
+        self._tasks: list[asyncio.Task] = []
+        self._next_slot = 0.0
+
+    async def start(self, bot: Bot) -> None:
+        await self.queue.recover()
+        self._tasks = [asyncio.create_task(self._run(bot)) for _ in range(self.workers)]
+
+    async def _run(self, bot: Bot) -> None:
+        detach_update()
+        failures = 0
+        while True:
+            try:
+                event = await self.queue.get()
+                # При остановке посреди доставки событие не подтверждается и в Redis вернется в очередь при старте
+                try:
+                    await self.deliver(bot, event)
+                except Exception:
+                    logger.exception("Can't deliver %s", event)
+                await self.queue.ack(event)
+                failures = 0
+            except Exception:
+                # Ошибка очереди не должна останавливать воркер: иначе уведомления молча прекратятся до перезапуска
+                failures += 1
+                delay = min(self.retry_backoff * 2 ** min(failures - 1, 16), self.max_queue_backoff)
+                logger.exception("Match event queue failed, retrying in %.1fs", delay)
+                await asyncio.sleep(delay)
+
+    async def deliver(self, bot: Bot, event: MatchEvent) -> bool:
+        async with self.session_factory() as session:
+            user_repo = UserRepository(session)
+            recipient = await user_repo.get_by_id(event.recipient_id)
+            partner = await user_repo.get_by_id(event.partner_id)
+        if recipient is None or partner is None:
+            return False
+
+        phrases = self.phrases.for_language(recipient.language)
+        text = phrases["search"]["match_received"].format(name=html.escape(partner.name))
+        for attempt in range(1, self.max_retries + 1):
+            await self._throttle()
+            try:
+                await bot.send_message(recipient.telegram_id, text, reply_markup=keyboards.match_notification(phrases))
+                return True
+            except TelegramRetryAfter as error:
+                await asyncio.sleep(error.retry_after)
+            except TelegramNetworkError:
+                await asyncio.sleep(self.retry_backoff * attempt)
+            except TelegramForbiddenError:
+                logger.info("User %s blocked the bot, match notification skipped", recipient.id)
+                return False
+            except TelegramBadRequest as error:
+                logger.warning("Can't notify user %s about a match: %s", recipient.id, error.message)
+                return False
+
+        logger.error("Gave up notifying user %s about a match", recipient.id)
+        return False
+
+    async def _throttle(self) -> None:
+        # Воркеры занимают слоты по очереди, так что общий темп не превышает 1 / min_interval
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.queue.close()
@@ -21,7 +21,11 @@ class Phrases:
         self.base_path = Path(phrases_dir) if phrases_dir else Path(__file__).resolve().parent.parent / "phrases"
         self.default_language = default_language
         self._cache: dict[str, dict[str, Any]] = {}
-        self._default_phrases = self._load_language(default_language)
+
+    @property
+    def _default_phrases(self) -> dict[str, Any]:
+        # JSON читается при первом обращении, а не при создании объекта на старте
+        return self._load_language(self.default_language)
 
     def _load_language(self, language: str | None) -> dict[str, Any]:
         language_code = (language or self.default_language).lower()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from aiogram.types import InlineKeyboardMarkup
+from cachetools import TTLCache
+
+
+class PrefetchedCandidate:
+    """
+    Заранее подобранный и отрендеренный следующий кандидат
+
+    Валиден только как ответ на оценку анкеты ``after_id``, которая сейчас показана пользователю
+    """
+
+    __slots__ = ("after_id", "candidate_id", "photo", "caption", "reply_markup")
+
+    def __init__(
+        self,
+        after_id: int,
+        candidate_id: int,
+        photo: str | None,
+        caption: str,
+        reply_markup: InlineKeyboardMarkup | None,
+    ):
+        self.after_id = after_id
+        self.candidate_id = candidate_id
+        self.photo = photo
+        self.caption = caption
+        self.reply_markup = reply_markup
+
+
+class CandidatePrefetcher:
+    def __init__(self, maxsize: int = 10_000, ttl: int | float = 10 * 60) -> None:
+        self._slots: TTLCache[int, PrefetchedCandidate] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def store(self, telegram_id: int, prefetched: PrefetchedCandidate) -> None:
+        self._slots[telegram_id] = prefetched
+
+    def take(self, telegram_id: int, rated_id: int | None) -> PrefetchedCandidate | None:
+        prefetched = self._slots.pop(telegram_id, None)
+        if prefetched is None or rated_id is None or prefetched.after_id != rated_id:
+            return None
+        return prefetched
+
+    def discard(self, telegram_id: int) -> None:
+        self._slots.pop(telegram_id, None)
+
+    def discard_candidate(self, candidate_id: int) -> None:
+        for telegram_id, prefetched in list(self._slots.items()):
+            if prefetched.candidate_id == candidate_id:
+                self._slots.pop(telegram_id, None)
@@ -40,7 +40,7 @@ def format_profile_caption(
     username: str | None = None,
 ) -> str:
     phrases = phrases or Phrases()
-    faculty_name = user.faculty.name if getattr(user, "faculty", None) else "—"
+    faculty_name = user.faculty_name or "—"
 
     caption_lines = [f"{user.name}, {user.age}"]
 
@@ -77,10 +77,25 @@ async def show_profile(
     username: str | None = None,
 ):
     caption = format_profile_caption(user, match_time=match_time, phrases=phrases, username=username)
-    if user.photos:
+    await show_rendered_profile(event, context, profile_photo(user), caption, reply_markup=reply_markup)
+
+
+def profile_photo(user) -> str | None:
+    photos = user.photos
+    return photos[0] if photos else None
+
+
+async def show_rendered_profile(
+    event: Message | CallbackQuery,
+    context: CoreContext,
+    photo: str | None,
+    caption: str,
+    reply_markup=None,
+):
+    if photo:
         await context.respond_photo(
             event,
-            user.photos[0],
+            photo,
             caption=caption,
             reply_markup=reply_markup,
             fallback_text=caption,
@@ -8,15 +8,18 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
 
 from datemate.infrastructure.repositories import MatchRepository, UserRepository
-from datemate.tgbot.functional import CoreContext, Phrases, keyboards
+from datemate.tgbot.functional import CandidatePrefetcher, CoreContext, Phrases, PrefetchedCandidate, keyboards
 from datemate.tgbot.handlers.common import (
     ensure_registered_user,
+    format_profile_caption,
+    profile_photo,
     show_main_menu,
     show_profile,
+    show_rendered_profile,
     update_dialog_message,
 )
 
-router = Router()
+router = Router(name="matchmaking")
 
 
 class OnboardingState(StatesGroup):
@@ -29,7 +32,18 @@ async def _show_next_candidate(
     phrases: Phrases,
     match_repo: MatchRepository,
     current_user,
-):
+    prefetched: PrefetchedCandidate | None = None,
+) -> int | None:
+    if prefetched is not None:
+        await show_rendered_profile(
+            event,
+            context,
+            prefetched.photo,
+            prefetched.caption,
+            reply_markup=prefetched.reply_markup,
+        )
+        return prefetched.candidate_id
+
     candidate = await match_repo.get_next_candidate(current_user)
     if candidate is None:
         await update_dialog_message(
@@ -47,7 +61,34 @@ async def _show_next_candidate(
         phrases,
         reply_markup=keyboards.candidate_actions(phrases, str(candidate.id)),
     )
-    return candidate
+    return candidate.id
+
+
+async def _prefetch_next_candidate(
+    telegram_id: int,
+    phrases: Phrases,
+    match_repo: MatchRepository,
+    current_user,
+    prefetcher: CandidatePrefetcher | None,
+    shown_id: int | None,
+) -> None:
+    if prefetcher is None or shown_id is None:
+        return
+
+    candidate = await match_repo.get_next_candidate(current_user, exclude_ids=[shown_id])
+    if candidate is None:
+        return
+
+    prefetcher.store(
+        telegram_id,
+        PrefetchedCandidate(
+            after_id=shown_id,
+            candidate_id=candidate.id,
+            photo=profile_photo(candidate),
+            caption=format_profile_caption(candidate, phrases=phrases),
+            reply_markup=keyboards.candidate_actions(phrases, str(candidate.id)),
+        ),
+    )
 
 
 async def _show_match_by_index(
@@ -192,8 +233,17 @@ async def set_initial_language(
 
 
 @router.callback_query(F.data == "action:search")
-async def search_profiles(callback: CallbackQuery, context: CoreContext, phrases: Phrases, session) -> None:
+async def search_profiles(
+    callback: CallbackQuery,
+    context: CoreContext,
+    phrases: Phrases,
+    session,
+    prefetcher: CandidatePrefetcher | None = None,
+) -> None:
     await callback.answer()
+    if prefetcher is not None:
+        prefetcher.discard(callback.from_user.id)
+
     user_repo = UserRepository(session)
     user = await ensure_registered_user(callback, context, phrases, user_repo, callback.from_user.id)
     if user is None:
@@ -201,11 +251,18 @@ async def search_profiles(callback: CallbackQuery, context: CoreContext, phrases
 
     match_repo = MatchRepository(session)
     await update_dialog_message(callback, context, phrases["search"]["loading"], reply_markup=keyboards.back_to_menu(phrases))
-    await _show_next_candidate(callback, context, phrases, match_repo, user)
+    shown_id = await _show_next_candidate(callback, context, phrases, match_repo, user)
+    await _prefetch_next_candidate(callback.from_user.id, phrases, match_repo, user, prefetcher, shown_id)
 
 
 @router.callback_query(F.data.startswith("rate:"))
-async def rate_candidate(callback: CallbackQuery, context: CoreContext, phrases: Phrases, session) -> None:
+async def rate_candidate(
+    callback: CallbackQuery,
+    context: CoreContext,
+    phrases: Phrases,
+    session,
+    prefetcher: CandidatePrefetcher | None = None,
+) -> None:
     parts = callback.data.split(":")
     if len(parts) != 3:
         await update_dialog_message(
@@ -233,8 +290,9 @@ async def rate_candidate(callback: CallbackQuery, context: CoreContext, phrases:
     if user is None:
         return
 
-    candidate = await user_repo.get_by_id(candidate_id)
-    if candidate is None:
+    # Слот подготовлен под показанную анкету, значит она существует и повторно ее проверять не нужно
+    prefetched = prefetcher.take(callback.from_user.id, candidate_id) if prefetcher is not None else None
+    if prefetched is None and await user_repo.get_by_id(candidate_id) is None:
         await update_dialog_message(
             callback,
             context,
@@ -244,7 +302,7 @@ async def rate_candidate(callback: CallbackQuery, context: CoreContext, phrases:
         return
 
     match_repo = MatchRepository(session)
-    _, matched = await match_repo.set_reaction(user.id, candidate.id, is_like=action == "like")
+    _, matched = await match_repo.set_reaction(user.id, candidate_id, is_like=action == "like")
 
     response_text = None
     if matched:
@@ -254,13 +312,21 @@ async def rate_candidate(callback: CallbackQuery, context: CoreContext, phrases:
     else:
         response_text = phrases["search"]["skip_saved"]
 
-    await _show_next_candidate(callback, context, phrases, match_repo, user)
+    shown_id = await _show_next_candidate(callback, context, phrases, match_repo, user, prefetched=prefetched)
     if response_text:
         await callback.answer(response_text)
 
+    await _prefetch_next_candidate(callback.from_user.id, phrases, match_repo, user, prefetcher, shown_id)
+
 
 @router.callback_query(F.data.startswith("search:next"))
-async def skip_candidate(callback: CallbackQuery, context: CoreContext, phrases: Phrases, session) -> None:
+async def skip_candidate(
+    callback: CallbackQuery,
+    context: CoreContext,
+    phrases: Phrases,
+    session,
+    prefetcher: CandidatePrefetcher | None = None,
+) -> None:
     await callback.answer()
     parts = callback.data.split(":")
     candidate_id_raw = parts[2] if len(parts) >= 3 else None
@@ -272,14 +338,17 @@ async def skip_candidate(callback: CallbackQuery, context: CoreContext, phrases:
 
     match_repo = MatchRepository(session)
 
+    candidate_id = None
     if candidate_id_raw:
         try:
             candidate_id = int(candidate_id_raw)
             await match_repo.set_reaction(user.id, candidate_id, is_like=False)
         except ValueError:
-            pass
+            candidate_id = None
 
-    await _show_next_candidate(callback, context, phrases, match_repo, user)
+    prefetched = prefetcher.take(callback.from_user.id, candidate_id) if prefetcher is not None else None
+    shown_id = await _show_next_candidate(callback, context, phrases, match_repo, user, prefetched=prefetched)
+    await _prefetch_next_candidate(callback.from_user.id, phrases, match_repo, user, prefetcher, shown_id)
 
 
 @router.callback_query(F.data == "action:matches")
@@ -9,10 +9,10 @@ from aiogram.types import CallbackQuery, Message
 
 from datemate.domain.entities import Faculty
 from datemate.infrastructure.repositories import FacultyRepository, UserRepository
-from datemate.tgbot.functional import CoreContext, Phrases, keyboards
+from datemate.tgbot.functional import CandidatePrefetcher, CoreContext, Phrases, keyboards
 from datemate.tgbot.handlers.common import update_dialog_message
 
-router = Router()
+router = Router(name="registration")
 
 
 class RegistrationState(StatesGroup):
@@ -21,14 +21,25 @@ class RegistrationState(StatesGroup):
     sex = State()
     search_sex = State()
     age = State()
+    age_range = State()
     faculty = State()
     description = State()
     photos = State()
 
 
 @router.callback_query(F.data == "action:register")
-async def start_registration(callback: CallbackQuery, state: FSMContext, context: CoreContext, phrases: Phrases, session) -> None:
+async def start_registration(
+    callback: CallbackQuery,
+    state: FSMContext,
+    context: CoreContext,
+    phrases: Phrases,
+    session,
+    prefetcher: CandidatePrefetcher | None = None,
+) -> None:
     await callback.answer()
+    if prefetcher is not None:
+        prefetcher.discard(callback.from_user.id)
+
     user_repo = UserRepository(session)
     user = await user_repo.get_by_telegram_id(callback.from_user.id)
     data = await state.get_data()
@@ -155,9 +166,49 @@ async def set_age(message: Message, state: FSMContext, context: CoreContext, phr
         return
 
     await state.update_data(age=age_value)
+    await state.set_state(RegistrationState.age_range)
+    await update_dialog_message(
+        message, context, phrases["registration"]["age_range"], reply_markup=keyboards.age_range_keyboard(phrases)
+    )
+
+
+def parse_age_range(text: str | None) -> tuple[int, int] | None:
+    match = re.fullmatch(r"\s*(\d{1,3})\s*[-–—]\s*(\d{1,3})\s*", text or "")
+    if not match:
+        return None
+    min_age, max_age = int(match.group(1)), int(match.group(2))
+    if not 16 <= min_age <= max_age <= 100:
+        return None
+    return min_age, max_age
+
+
+async def _ask_faculty(event: Message | CallbackQuery, state: FSMContext, context: CoreContext, phrases: Phrases, session) -> None:
     await state.set_state(RegistrationState.faculty)
     faculties = [Faculty.from_model(f) for f in await FacultyRepository(session).list_faculties()]
-    await update_dialog_message(message, context, phrases["registration"]["faculty"], reply_markup=keyboards.faculty_keyboard(faculties))
+    await update_dialog_message(event, context, phrases["registration"]["faculty"], reply_markup=keyboards.faculty_keyboard(faculties))
+
+
+@router.message(RegistrationState.age_range)
+async def set_age_range(message: Message, state: FSMContext, context: CoreContext, phrases: Phrases, session) -> None:
+    age_range = parse_age_range(message.text)
+    if age_range is None:
+        await update_dialog_message(
+            message,
+            context,
+            phrases["registration"]["age_range_invalid"],
+            reply_markup=keyboards.age_range_keyboard(phrases),
+        )
+        return
+
+    await state.update_data(min_age=age_range[0], max_age=age_range[1])
+    await _ask_faculty(message, state, context, phrases, session)
+
+
+@router.callback_query(RegistrationState.age_range, F.data == "age_range:any")
+async def skip_age_range(callback: CallbackQuery, state: FSMContext, context: CoreContext, phrases: Phrases, session) -> None:
+    await callback.answer()
+    await state.update_data(min_age=None, max_age=None)
+    await _ask_faculty(callback, state, context, phrases, session)
 
 
 @router.callback_query(RegistrationState.faculty, F.data.startswith("faculty:"))
@@ -223,7 +274,14 @@ async def set_photos(message: Message, state: FSMContext, context: CoreContext,
 
 
 @router.callback_query(RegistrationState.photos, F.data == "photos:done")
-async def finish_photos(callback: CallbackQuery, state: FSMContext, context: CoreContext, phrases: Phrases, session) -> None:
+async def finish_photos(
+    callback: CallbackQuery,
+    state: FSMContext,
+    context: CoreContext,
+    phrases: Phrases,
+    session,
+    prefetcher: CandidatePrefetcher | None = None,
+) -> None:
     await callback.answer()
     data = await state.get_data()
     photo_ids: list[str] = list(data.get("photo_ids", []))
@@ -238,7 +296,7 @@ async def finish_photos(callback: CallbackQuery, state: FSMContext, context: Cor
         return
 
     user_repo = UserRepository(session)
-    await user_repo.upsert_user(
+    user = await user_repo.upsert_user(
         telegram_id=callback.from_user.id,
         username=callback.from_user.username,
         name=data["name"],
@@ -249,8 +307,15 @@ async def finish_photos(callback: CallbackQuery, state: FSMContext, context: Cor
         faculty_id=data["faculty_id"],
         description=data["description"],
         photo_ids=photo_ids,
+        min_age=data.get("min_age"),
+        max_age=data.get("max_age"),
     )
 
+    # Анкета изменилась: заранее отрендеренные показы ее другим пользователям устарели
+    if prefetcher is not None:
+        prefetcher.discard(callback.from_user.id)
+        prefetcher.discard_candidate(user.id)
+
     await update_dialog_message(
         callback,
         context,
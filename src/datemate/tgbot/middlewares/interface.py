@@ -6,13 +6,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from datemate.infrastructure.repositories import UserRepository
-from datemate.tgbot.functional import CoreContext, CoreMessage, Phrases
+from datemate.tgbot.functional import CoreContext, CoreMessage, MessageDeletionQueue, Phrases
 
 
 class InterfaceMiddleware(BaseMiddleware):
-    def __init__(self, phrases: Phrases):
+    def __init__(self, phrases: Phrases, deletion_queue: MessageDeletionQueue | None = None):
         super().__init__()
         self.phrases = phrases
+        self.deletion_queue = deletion_queue
 
     async def __call__(
         self,
@@ -59,7 +60,10 @@ class InterfaceMiddleware(BaseMiddleware):
                 await self.send_revert_state_message(state, bot, event_instance, context, phrases, user_id)
 
         if not event_is_callback:
-            await bot.delete_message(chat_id=event_instance.chat.id, message_id=event_instance.message_id)
+            if self.deletion_queue is not None:
+                self.deletion_queue.enqueue(bot, event_instance.chat.id, event_instance.message_id)
+            else:
+                await bot.delete_message(chat_id=event_instance.chat.id, message_id=event_instance.message_id)
 
         return await handler(event, data)
 
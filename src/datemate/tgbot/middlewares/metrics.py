@@ -0,0 +1,124 @@
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.metrics import MetricsRegistry, UpdateTimings, current_update, track
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    handler_object = data.get("handler")
+    return handler_object.callback.__name__ if handler_object is not None else "unknown"
+
+
+def _router_name(data: Dict[str, Any]) -> str:
+    router = data.get("event_router")
+    return router.name if router is not None else "unknown"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Латентность, количество и ошибки по хендлерам; регистрируется первой из inner-middleware"""
+
+    def __init__(self, registry: MetricsRegistry):
+        super().__init__()
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        timings = UpdateTimings()
+        token = current_update.set(timings)
+        started = perf_counter()
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = perf_counter() - started
+            current_update.reset(token)
+
+            self.registry.observe_handler(_router_name(data), _handler_name(data), elapsed, timings, failed=failed)
+
+
+class QueryStatsMiddleware(BaseMiddleware):
+    """Привязывает SQL-запросы апдейта к хендлеру: счетчики, медленные запросы и повторяющиеся формы (N+1)"""
+
+    def __init__(self, instrumentation: QueryInstrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: Dict[str, Any],
+    ) -> Any:
+        with self.instrumentation.scope(f"{_router_name(data)}.{_handler_name(data)}"):
+            return await handler(event, data)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            elapsed = perf_counter() - started
+            track("bot_api", elapsed)
+            self.registry.observe_bot_api(method.__api_method__, elapsed)
+
+
+class TimedStorage(BaseStorage):
+    """Обертка над FSM-хранилищем, которая засчитывает время обращений в текущий апдейт"""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        started = perf_counter()
+        try:
+            await self.storage.set_state(key, state)
+        finally:
+            track("fsm", perf_counter() - started)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        started = perf_counter()
+        try:
+            return await self.storage.get_state(key)
+        finally:
+            track("fsm", perf_counter() - started)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        started = perf_counter()
+        try:
+            await self.storage.set_data(key, data)
+        finally:
+            track("fsm", perf_counter() - started)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        started = perf_counter()
+        try:
+            return await self.storage.get_data(key)
+        finally:
+            track("fsm", perf_counter() - started)
+
+    async def close(self) -> None:
+        await self.storage.close()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from time import perf_counter
+from typing import Any, Callable, cast
+
+from aiogram import Bot, __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientError, ClientSession, ClientTimeout, TraceConfig
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from datemate.config import Settings
+from datemate.infrastructure.metrics import Histogram
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+class BotSessionStats:
+    """Счетчики соединений и латентность HTTP-запросов к Bot API"""
+
+    def __init__(self):
+        self.requests = 0
+        self.request_errors = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.pool_waits = 0
+        self.pool_wait_seconds = 0.0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.latency = Histogram()
+
+    def trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+
+        async def on_request_start(session, context, params):
+            context.started = perf_counter()
+
+        async def on_request_end(session, context, params):
+            self.requests += 1
+            self.latency.observe(perf_counter() - context.started)
+
+        async def on_request_exception(session, context, params):
+            self.requests += 1
+            self.request_errors += 1
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued = perf_counter()
+
+        async def on_connection_queued_end(session, context, params):
+            self.pool_waits += 1
+            self.pool_wait_seconds += perf_counter() - context.queued
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def prometheus_lines(self) -> list[str]:
+        lines = []
+        for name, value in (
+            ("datemate_bot_http_requests_total", self.requests),
+            ("datemate_bot_http_request_errors_total", self.request_errors),
+            ("datemate_bot_http_connections_created_total", self.connections_created),
+            ("datemate_bot_http_connections_reused_total", self.connections_reused),
+            ("datemate_bot_http_pool_waits_total", self.pool_waits),
+            ("datemate_bot_http_pool_wait_seconds_total", self.pool_wait_seconds),
+            ("datemate_bot_http_dns_cache_hits_total", self.dns_cache_hits),
+            ("datemate_bot_http_dns_cache_misses_total", self.dns_cache_misses),
+        ):
+            lines.extend([f"# TYPE {name} counter", f"{name} {value}"])
+
+        lines.append("# TYPE datemate_bot_http_request_duration_seconds histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(self.latency.buckets, self.latency.counts):
+            cumulative += bucket_count
+            lines.append(f'datemate_bot_http_request_duration_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'datemate_bot_http_request_duration_seconds_bucket{{le="+Inf"}} {self.latency.count}')
+        lines.append(f"datemate_bot_http_request_duration_seconds_sum {self.latency.total}")
+        lines.append(f"datemate_bot_http_request_duration_seconds_count {self.latency.count}")
+        return lines
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    Сессия Bot API с настраиваемым пулом соединений, keep-alive, DNS-кэшем и таймаутами
+
+    Стандартная ``AiohttpSession`` передает в aiohttp таймаут числом, и отдельный таймаут на установку
+    соединения задать нельзя, поэтому запрос собирается здесь с ``ClientTimeout``.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 60,
+        dns_cache_ttl: int = 3600,
+        connect_timeout: float | None = 10,
+        stats: BotSessionStats | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+            use_dns_cache=dns_cache_ttl > 0,
+        )
+        self.connect_timeout = connect_timeout
+        self.stats = stats
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[self.stats.trace_config()] if self.stats is not None else None,
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        session = await self.create_session()
+
+        url = self.api.api_url(token=bot.token, method=method.__api_method__)
+        form = self.build_form_data(bot=bot, method=method)
+        client_timeout = ClientTimeout(
+            total=self.timeout if timeout is None else timeout,
+            sock_connect=self.connect_timeout,
+        )
+
+        try:
+            async with session.post(url, data=form, timeout=client_timeout) as resp:
+                raw_result = await resp.text()
+        except asyncio.TimeoutError as e:
+            raise TelegramNetworkError(method=method, message="Request timeout error") from e
+        except ClientError as e:
+            raise TelegramNetworkError(method=method, message=f"{type(e).__name__}: {e}") from e
+
+        response = self.check_response(bot=bot, method=method, status_code=resp.status, content=raw_result)
+        return cast(TelegramType, response.result)
+
+
+def _json_codec(fast_json: bool) -> tuple[Callable[..., Any], Callable[..., str]]:
+    if fast_json and orjson is not None:
+        return orjson.loads, lambda value: orjson.dumps(value).decode()
+    return json.loads, json.dumps
+
+
+def create_bot_session(settings: Settings, stats: BotSessionStats | None = None) -> TunedAiohttpSession:
+    json_loads, json_dumps = _json_codec(settings.bot_fast_json)
+    session_kwargs: dict[str, Any] = {}
+    if settings.telegram_api_url:
+        session_kwargs["api"] = TelegramAPIServer.from_base(settings.telegram_api_url)
+
+    return TunedAiohttpSession(
+        limit=settings.bot_connection_limit,
+        limit_per_host=settings.bot_connection_limit_per_host,
+        keepalive_timeout=settings.bot_keepalive_timeout,
+        dns_cache_ttl=settings.bot_dns_cache_ttl,
+        connect_timeout=settings.bot_connect_timeout,
+        timeout=settings.bot_request_timeout,
+        json_loads=json_loads,
+        json_dumps=json_dumps,
+        stats=stats,
+        **session_kwargs,
+    )
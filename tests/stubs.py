@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from types import SimpleNamespace
 
 from aiogram.exceptions import TelegramBadRequest
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 
 class DummyFSM:
@@ -52,8 +53,10 @@ class DummyBot:
     def __init__(self):
         self.sent_messages = []
         self.edited_messages = []
+        self.edited_captions = []
         self.sent_photos = []
         self.deleted_messages = []
+        self.deleted_batches = []
         self.get_chat_calls = []
         self.edit_error: Exception | None = None
         self.edit_media_error: Exception | None = None
@@ -77,11 +80,130 @@ class DummyBot:
             raise self.edit_media_error
         self.edited_messages.append((chat_id, message_id, media))
 
+    async def edit_message_caption(self, chat_id, message_id, caption=None, **kwargs):
+        if self.edit_media_error:
+            raise self.edit_media_error
+        self.edited_captions.append((chat_id, message_id, caption))
+
     async def delete_message(self, chat_id, message_id):
         self.deleted_messages.append((chat_id, message_id))
 
+    async def delete_messages(self, chat_id, message_ids):
+        self.deleted_batches.append((chat_id, list(message_ids)))
+
     async def get_chat(self, telegram_id: int):
         self.get_chat_calls.append(telegram_id)
         if telegram_id in self.chat_usernames:
             return SimpleNamespace(username=self.chat_usernames[telegram_id])
         raise TelegramBadRequest(message="not found", method="get_chat")
+
+
+class MemoryRedis:
+    """Redis в памяти: только команды, которые используют LikedMeSets и RedisStorage"""
+
+    def __init__(self):
+        self.sets: dict[str, set[bytes]] = {}
+        self.values: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+        self.down = False
+        self.commands = 0
+
+    def _call(self):
+        if self.down:
+            raise RedisConnectionError("Redis is down")
+        self.commands += 1
+
+    async def get(self, key):
+        self._call()
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._call()
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def sadd(self, key, *members):
+        self._call()
+        self.sets.setdefault(key, set()).update(str(member).encode() for member in members)
+
+    async def srem(self, key, *members):
+        self._call()
+        self.sets.get(key, set()).difference_update(str(member).encode() for member in members)
+
+    async def smismember(self, key, members):
+        self._call()
+        return [int(str(member).encode() in self.sets.get(key, ())) for member in members]
+
+    async def srandmember(self, key, count):
+        self._call()
+        return list(self.sets.get(key, ()))[:count]
+
+    async def expire(self, key, seconds, nx=False):
+        self._call()
+        if not (nx and key in self.ttls):
+            self.ttls[key] = seconds
+
+    async def delete(self, *keys):
+        self._call()
+        for key in keys:
+            self.sets.pop(key, None)
+            self.values.pop(key, None)
+            self.ttls.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+async def register_user(
+    user_repo,
+    telegram_id: int,
+    sex: str,
+    search_sex: str,
+    *,
+    name: str | None = None,
+    age: int = 20,
+    faculty_id: str = "fkn",
+    language: str = "ru",
+    username: str | None = None,
+    description: str = "",
+    photo_ids=(),
+    min_age: int | None = None,
+    max_age: int | None = None,
+):
+    return await user_repo.upsert_user(
+        telegram_id=telegram_id,
+        username=username,
+        name=name or f"User {telegram_id}",
+        sex=sex,
+        search_sex=search_sex,
+        language=language,
+        age=age,
+        faculty_id=faculty_id,
+        description=description,
+        photo_ids=list(photo_ids),
+        min_age=min_age,
+        max_age=max_age,
+    )
@@ -0,0 +1,175 @@
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InputMediaPhoto
+
+from benchmarks.candidate_plan import run as run_candidate_plan
+from benchmarks.compaction import run as run_compaction
+from benchmarks.dispatcher import run_harness
+from benchmarks.entities import run as run_entities
+from benchmarks.fake_bot import FAKE_TOKEN, create_fake_bot
+from benchmarks.fake_telegram import FakeTelegramServer, FaultConfig, start_fake_server
+from benchmarks.population import PopulationSpec, generate_likes, generate_users, load_population
+from benchmarks.repositories import run_benchmarks
+from benchmarks.statements import run as run_statements
+from benchmarks.suggestions import run as run_suggestions
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.rejections import RejectionPolicy
+from datemate.infrastructure.suggestions import SuggestionPolicy
+from datemate.tgbot.functional import Phrases, keyboards
+
+
+def test_population_is_deterministic():
+    spec = PopulationSpec(users=200, likes=2_000, seed=7)
+
+    users = generate_users(spec)
+    likes = list(generate_likes(spec, users))
+
+    assert users == generate_users(spec)
+    assert likes == list(generate_likes(spec, users))
+    assert len({(like["liker_id"], like["target_id"]) for like in likes}) == len(likes)
+    assert all(like["liker_id"] != like["target_id"] for like in likes)
+
+
+@pytest.mark.asyncio
+async def test_repository_benchmarks_report_percentiles(tmp_path):
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"))
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/bench.db", instrumentation=instrumentation)
+    try:
+        counts = await load_population(engine, PopulationSpec(users=100, likes=1_000))
+        session_factory = await init_db(engine)
+        results = await run_benchmarks(session_factory, instrumentation, iterations=3, seed=1)
+    finally:
+        await engine.dispose()
+
+    assert counts["users"] == 100
+    assert results["UserRepository.get_by_telegram_id"]["statements_per_call"] == 1
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= results["MatchRepository.list_matches"].keys()
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_harness_runs_all_flows(tmp_path):
+    report = await run_harness(
+        f"sqlite+aiosqlite:///{tmp_path}/dispatcher.db",
+        users=6,
+        concurrency=3,
+        swipes=2,
+        pages=2,
+        bot_latency=0,
+        seed=1,
+    )
+
+    assert report["registration"]["updates"] == 6 * 12
+    assert report["swipe"]["updates"] >= 6
+    assert report["matches"]["updates"] == 6 * 2
+    assert report["registration"]["db_statements_per_update"] > 0
+    assert report["bot_api_calls"]["answerCallbackQuery"] > 0
+
+
+@pytest.mark.asyncio
+async def test_fake_telegram_server_serves_bot_api():
+    server = FakeTelegramServer(FaultConfig(seed=1))
+    runner = await start_fake_server(server, port=0)
+    host, port = runner.addresses[0][:2]
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://{host}:{port}"))
+    bot = Bot(FAKE_TOKEN, session=session)
+    try:
+        sent = await bot.send_message(1, "hello", reply_markup=keyboards.back_to_menu(Phrases()))
+        edited = await bot.edit_message_media(
+            chat_id=1, message_id=sent.message_id, media=InputMediaPhoto(media="photo_1", caption="caption")
+        )
+        assert await bot.delete_messages(chat_id=1, message_ids=[sent.message_id])
+        assert edited.caption == "caption"
+
+        server.faults.rate_limit_rate = 1
+        with pytest.raises(TelegramRetryAfter):
+            await bot.send_message(1, "throttled")
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+    assert server.calls["sendmessage"] == 2
+    assert server.injected["429"] == 1
+
+
+@pytest.mark.asyncio
+async def test_candidate_query_stays_index_only(tmp_path):
+    results = await run_candidate_plan(
+        f"sqlite+aiosqlite:///{tmp_path}/plan.db", sizes=[200], likes_per_user=5, viewers=5, seed=1
+    )
+
+    assert results[0]["index_only_share"] == 1
+    assert results[0]["range_seek_share"] == 1
+
+
+@pytest.mark.asyncio
+async def test_compaction_benchmark_shrinks_reaction_storage(tmp_path):
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"))
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/compaction.db", instrumentation=instrumentation)
+    try:
+        report = await run_compaction(
+            engine, instrumentation, PopulationSpec(users=200, likes=5_000, like_ratio=0.1), RejectionPolicy(), 3
+        )
+    finally:
+        await engine.dispose()
+
+    assert report["after"]["likes"]["rows"] < report["before"]["likes"]["rows"]
+    assert report["after"]["rejection_sets"]["rows"] > 0
+    assert report["shrink_factor"] > 1
+
+
+@pytest.mark.asyncio
+async def test_profiles_take_less_memory_than_orm_instances(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/entities.db")
+    try:
+        report = await run_entities(engine, PopulationSpec(users=500, likes=0))
+    finally:
+        await engine.dispose()
+
+    assert report["orm"]["objects"] == report["profile"]["objects"] == 500
+    assert report["memory_ratio"] > 1
+
+
+@pytest.mark.asyncio
+async def test_prebuilt_statements_save_cpu_per_call(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/statements.db")
+    try:
+        report = await run_statements(engine, PopulationSpec(users=200, likes=2_000), iterations=20, seed=1)
+    finally:
+        await engine.dispose()
+
+    assert set(report["calls"]) == {
+        "MatchRepository.get_next_candidate",
+        "MatchRepository.set_reaction",
+        "MatchRepository.list_matches",
+    }
+    # Сравнивается только подготовка запроса: время вызова целиком на маленькой базе слишком шумное
+    assert all(timings["prebuilt_us"] < timings["rebuilt_us"] for timings in report["preparation"].values())
+
+
+@pytest.mark.asyncio
+async def test_suggestion_precompute_recomputes_only_changed_users(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/suggestions.db")
+    try:
+        report = await run_suggestions(
+            engine, PopulationSpec(users=300, likes=3_000), SuggestionPolicy(top_n=5, chunk_size=100, workers=1), 0.1
+        )
+    finally:
+        await engine.dispose()
+
+    assert report["full"]["computed"] == 300
+    assert report["incremental"]["computed"] == report["changed"] == 30
+
+
+@pytest.mark.asyncio
+async def test_fake_bot_session_streams_file_content():
+    bot, session = create_fake_bot()
+    session.file_content = b"photo" * 20_000
+
+    downloaded = await bot.download_file("photos/file_1.jpg", chunk_size=65536)
+
+    assert downloaded.getvalue() == session.file_content
+    assert session.calls["file"] == 1
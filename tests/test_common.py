@@ -1,5 +1,4 @@
 from datetime import datetime
-from types import SimpleNamespace
 
 from datemate.tgbot.handlers.common import format_profile_caption
 from datemate.tgbot.functional import Phrases
@@ -11,7 +10,7 @@ class DummyUser:
         self.age = age
         self.sex = sex
         self.search_sex = search_sex
-        self.faculty = SimpleNamespace(name=faculty_name)
+        self.faculty_name = faculty_name
         self.description = description
         self.photos = photos or []
         self.username = username
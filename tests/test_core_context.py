@@ -1,8 +1,11 @@
 import pytest
 from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
 
 from datemate.tgbot.functional import CoreContext
-from tests.stubs import DummyBot, DummyFSM, FakeMessage
+from tests.stubs import DummyBot, DummyFSM, FakeMessage, MemoryRedis
 
 
 @pytest.mark.asyncio
@@ -53,3 +56,55 @@ async def test_core_context_photo_fallback_on_media_error():
 
     assert bot.deleted_messages
     assert bot.sent_photos[-1][2] == "fallback"
+
+
+@pytest.mark.asyncio
+async def test_core_context_skips_identical_render():
+    bot = DummyBot()
+    state = DummyFSM()
+    context = await CoreContext.create(bot, state)
+    event = FakeMessage(chat_id=13, message_id=80)
+
+    await context.respond_text(event, "menu")
+    await context.respond_text(event, "other")
+    await context.respond_text(event, "other")
+
+    assert len(bot.sent_messages) == 1
+    assert [edit[2] for edit in bot.edited_messages] == ["other"]
+
+
+@pytest.mark.asyncio
+async def test_core_context_edits_only_caption_for_same_photo():
+    bot = DummyBot()
+    state = DummyFSM()
+    context = await CoreContext.create(bot, state)
+    event = FakeMessage(chat_id=14, message_id=90)
+
+    await context.respond_photo(event, "photo1", caption="first")
+    await context.respond_photo(event, "photo1", caption="second")
+    await context.respond_photo(event, "photo1", caption="second")
+    await context.respond_photo(event, "photo2", caption="second")
+
+    assert len(bot.sent_photos) == 1
+    assert [edit[2] for edit in bot.edited_captions] == ["second"]
+    assert bot.edited_messages[-1][2].media == "photo2"
+
+
+@pytest.mark.asyncio
+async def test_core_message_survives_redis_storage():
+    storage = RedisStorage(MemoryRedis())
+    key = StorageKey(bot_id=1, chat_id=13, user_id=14)
+    bot = DummyBot()
+    event = FakeMessage(chat_id=13, message_id=80)
+
+    context = await CoreContext.create(bot, FSMContext(storage, key))
+    first = await context.respond_text(event, "hello")
+
+    # Следующий апдейт читает главное сообщение из JSON и редактирует его, а не шлет новое
+    context = await CoreContext.create(bot, FSMContext(storage, key))
+    second = await context.respond_text(event, "updated")
+
+    assert second.message_id == first.message_id
+    assert second.date == first.date
+    assert len(bot.sent_messages) == 1
+    assert bot.edited_messages[-1][2] == "updated"
@@ -0,0 +1,124 @@
+import pytest
+
+from datemate.infrastructure.db import LikeModel
+from datemate.infrastructure.liked_me import LikedMeSets
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from tests.stubs import MemoryRedis, register_user
+
+
+async def _claimed(redis: MemoryRedis, **options) -> LikedMeSets:
+    liked_me = LikedMeSets(redis, **options)
+    assert await liked_me.claim()
+    return liked_me
+
+
+@pytest.mark.asyncio
+async def test_liked_me_sets_prioritize_and_detect_matches(session):
+    user_repo = UserRepository(session)
+    alice = await register_user(user_repo, 1, "F", "M")
+    bob = await register_user(user_repo, 2, "M", "F")
+    carl = await register_user(user_repo, 3, "M", "F")
+    # Лайк до появления множеств: множество Алисы соберется из базы при первом чтении
+    session.add(LikeModel(liker_id=carl.id, target_id=alice.id, is_like=True))
+    await session.commit()
+
+    redis = MemoryRedis()
+    match_repo = MatchRepository(session, liked_me=await _claimed(redis, ttl=60))
+
+    assert (await match_repo.get_next_candidate(alice)).id == carl.id
+    assert await match_repo.liker_ids(alice.id) == {carl.id}
+
+    await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+    assert await match_repo.liker_ids(alice.id) == {bob.id, carl.id}
+    assert redis.ttls["datemate:liked_me:1"] == 60
+
+    _, matched = await match_repo.set_reaction(alice.id, bob.id, is_like=True)
+    assert matched
+    _, matched = await match_repo.set_reaction(alice.id, carl.id, is_like=False)
+    assert not matched
+    # Все, кто лайкнул Алису, уже оценены: приоритетных кандидатов нет
+    assert await match_repo.get_next_candidate(alice) is None
+
+    await match_repo.set_reaction(carl.id, alice.id, is_like=False)
+    assert await match_repo.liker_ids(alice.id) == {bob.id}
+
+
+@pytest.mark.asyncio
+async def test_liked_me_falls_back_to_sql_while_redis_is_down(session):
+    user_repo = UserRepository(session)
+    alice = await register_user(user_repo, 1, "F", "M")
+    bob = await register_user(user_repo, 2, "M", "F")
+    await register_user(user_repo, 3, "M", "F")
+
+    redis = MemoryRedis()
+    liked_me = await _claimed(redis, retry_after=0)
+    match_repo = MatchRepository(session, liked_me=liked_me)
+    assert await match_repo.liker_ids(alice.id) == set()
+
+    redis.down = True
+    await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+    assert await match_repo.liker_ids(alice.id) is None
+    assert (await match_repo.get_next_candidate(alice)).id == bob.id
+    _, matched = await match_repo.set_reaction(alice.id, bob.id, is_like=True)
+    assert matched
+
+    # Множество Алисы пропустило лайк Боба, поэтому после восстановления оно пересобирается из базы
+    redis.down = False
+    assert await match_repo.liker_ids(alice.id) == {bob.id}
+
+
+@pytest.mark.asyncio
+async def test_like_lost_before_redis_write_still_matches_after_restart(session):
+    user_repo = UserRepository(session)
+    alice = await register_user(user_repo, 1, "F", "M")
+    bob = await register_user(user_repo, 2, "M", "F")
+
+    redis = MemoryRedis()
+    match_repo = MatchRepository(session, liked_me=await _claimed(redis, ttl=60))
+    assert await match_repo.liker_ids(bob.id) == set()
+    # Процесс упал между коммитом лайка и SADD: в базе лайк есть, в собранном множестве Боба — нет
+    session.add(LikeModel(liker_id=alice.id, target_id=bob.id, is_like=True))
+    await session.commit()
+    # Аренда упавшего процесса истекла
+    await redis.delete("datemate:liked_me:owner")
+
+    match_repo = MatchRepository(session, liked_me=await _claimed(redis, ttl=60))
+    _, matched = await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+    assert matched
+    assert await match_repo.liker_ids(bob.id) == {alice.id}
+
+
+@pytest.mark.asyncio
+async def test_writes_do_not_extend_built_set_lifetime(session):
+    user_repo = UserRepository(session)
+    alice = await register_user(user_repo, 1, "F", "M")
+    bob = await register_user(user_repo, 2, "M", "F")
+
+    redis = MemoryRedis()
+    match_repo = MatchRepository(session, liked_me=await _claimed(redis, ttl=60))
+    await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+    assert redis.ttls["datemate:liked_me:1"] == 60
+
+    redis.ttls["datemate:liked_me:1"] = 5
+    await match_repo.set_reaction(bob.id, alice.id, is_like=False)
+    assert redis.ttls["datemate:liked_me:1"] == 5
+
+
+@pytest.mark.asyncio
+async def test_only_one_process_uses_the_sets():
+    redis = MemoryRedis()
+    first = await _claimed(redis)
+    second = LikedMeSets(redis, lease=0)
+
+    assert await second.claim() is False
+    assert not second.available
+    with pytest.raises(RuntimeError, match="another bot process"):
+        await second.acquire()
+
+    # Остановленный процесс отпускает аренду, и следующий запускается без ожидания
+    await first.close()
+    await second.acquire()
+    assert second.available
+    redis.down = True
+    assert await second.claim() is None
+    assert second.owned
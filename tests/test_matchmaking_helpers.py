@@ -1,9 +1,15 @@
 import pytest
 
-from datemate.domain.repositories import MatchRepository, UserRepository
-from datemate.tgbot.functional import CoreContext, Phrases
-from datemate.tgbot.handlers.matchmaking import _resolve_username, _show_match_by_index
-from tests.stubs import DummyBot, DummyFSM, FakeMessage
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from datemate.tgbot.functional import CandidatePrefetcher, CoreContext, Phrases, PrefetchedCandidate
+from datemate.tgbot.handlers import matchmaking
+from datemate.tgbot.handlers.matchmaking import (
+    _resolve_username,
+    _show_match_by_index,
+    rate_candidate,
+    search_profiles,
+)
+from tests.stubs import DummyBot, DummyFSM, FakeCallback, FakeMessage, register_user
 
 
 @pytest.mark.asyncio
@@ -63,3 +69,49 @@ async def test_show_match_by_index_renders_match(session):
     await _show_match_by_index(event, context, phrases, match_repo, viewer, 0)
 
     assert bot.sent_photos or bot.sent_messages
+
+
+@pytest.mark.asyncio
+async def test_rate_candidate_uses_prefetched_candidate(session, monkeypatch):
+    user_repo = UserRepository(session)
+    phrases = Phrases()
+    bot = DummyBot()
+    context = await CoreContext.create(bot, DummyFSM())
+    prefetcher = CandidatePrefetcher()
+
+    viewer = await register_user(user_repo, 1, "M", "F", name="Viewer", username="viewer", photo_ids=["photo_1"])
+    first = await register_user(user_repo, 2, "F", "M", name="First", username="first", photo_ids=["photo_2"])
+    second = await register_user(user_repo, 3, "F", "M", name="Second", username="second", photo_ids=["photo_3"])
+
+    message = FakeMessage(chat_id=5, message_id=1, from_user_id=viewer.telegram_id)
+    await search_profiles(FakeCallback("action:search", message), context, phrases, session, prefetcher)
+
+    photo_owners = {first.photos[0]: first.id, second.photos[0]: second.id}
+    shown_id = photo_owners[bot.edited_messages[-1][2].media]
+    prefetched_id = prefetcher._slots[viewer.telegram_id].candidate_id
+    assert prefetched_id != shown_id
+
+    lookups = []
+
+    class RecordingMatchRepository(MatchRepository):
+        async def get_next_candidate(self, user, exclude_ids=()):
+            lookups.append(list(exclude_ids))
+            return await super().get_next_candidate(user, exclude_ids)
+
+    monkeypatch.setattr(matchmaking, "MatchRepository", RecordingMatchRepository)
+    await rate_candidate(FakeCallback(f"rate:like:{shown_id}", message), context, phrases, session, prefetcher)
+
+    assert photo_owners[bot.edited_messages[-1][2].media] == prefetched_id
+    assert lookups == [[prefetched_id]]
+
+
+def test_prefetcher_drops_stale_slots():
+    prefetcher = CandidatePrefetcher()
+    prefetcher.store(1, PrefetchedCandidate(after_id=10, candidate_id=20, photo=None, caption="", reply_markup=None))
+    prefetcher.store(2, PrefetchedCandidate(after_id=11, candidate_id=21, photo=None, caption="", reply_markup=None))
+
+    assert prefetcher.take(1, rated_id=20) is None
+    assert prefetcher.take(1, rated_id=10) is None
+
+    prefetcher.discard_candidate(21)
+    assert prefetcher.take(2, rated_id=11) is None
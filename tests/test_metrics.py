@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from aiogram import Bot
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import text
+
+from benchmarks.fake_bot import FAKE_TOKEN
+from benchmarks.fake_telegram import FakeTelegramServer, start_fake_server
+from datemate.config import Settings
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation, instrument_engine, statement_shape
+from datemate.infrastructure.metrics import MetricsRegistry, UpdateTimings, current_update
+from datemate.infrastructure.repositories import UserRepository
+from datemate.tgbot.functional.deletion import MessageDeletionQueue
+from datemate.tgbot.middlewares.metrics import MetricsMiddleware, TimedStorage
+from datemate.tgbot.session import BotSessionStats, create_bot_session
+from tests.stubs import DummyBot, FakeMessage
+
+
+@pytest.mark.asyncio
+async def test_metrics_middleware_splits_handler_time(session_factory):
+    registry = MetricsRegistry()
+    instrument_engine(session_factory.kw["bind"])
+    storage = TimedStorage(MemoryStorage())
+    key = StorageKey(bot_id=1, chat_id=1, user_id=1)
+
+    async def rate_candidate(evt, data_dict):
+        async with session_factory() as session:
+            await session.execute(text("SELECT 1"))
+        await storage.update_data(key, {"seen": True})
+        return "ok"
+
+    middleware = MetricsMiddleware(registry)
+    data = {
+        "handler": SimpleNamespace(callback=rate_candidate),
+        "event_router": SimpleNamespace(name="matchmaking"),
+    }
+    result = await middleware(rate_candidate, FakeMessage(chat_id=1), data)
+
+    async def failing(evt, data_dict):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await middleware(failing, FakeMessage(chat_id=1), data)
+
+    metrics = registry.handlers[("matchmaking", "rate_candidate")]
+    assert result == "ok"
+    assert metrics.latency.count == 2
+    assert metrics.errors == 1
+    assert metrics.db > 0
+    assert metrics.fsm > 0
+    assert await storage.get_data(key) == {"seen": True}
+
+    exposition = registry.render_prometheus()
+    assert 'datemate_handler_duration_seconds_count{router="matchmaking",handler="rate_candidate"} 2' in exposition
+    assert 'datemate_handler_errors_total{router="matchmaking",handler="rate_candidate"} 1' in exposition
+
+
+@pytest.mark.asyncio
+async def test_background_worker_started_in_update_is_not_timed_by_it():
+    bot = DummyBot()
+    seen = []
+
+    async def delete_messages(chat_id, message_ids):
+        seen.append(current_update.get())
+
+    bot.delete_messages = delete_messages
+    queue = MessageDeletionQueue(flush_delay=0)
+    token = current_update.set(UpdateTimings())
+    try:
+        queue.enqueue(bot, chat_id=1, message_id=10)
+    finally:
+        current_update.reset(token)
+    await asyncio.sleep(0.05)
+    await queue.close()
+
+    assert seen == [None]
+
+
+@pytest.mark.asyncio
+async def test_query_instrumentation_flags_repeated_statements(session_factory, caplog):
+    instrumentation = QueryInstrumentation(slow_query_ms=0, n_plus_one_threshold=3)
+    instrument_engine(session_factory.kw["bind"], instrumentation)
+
+    timings = UpdateTimings()
+    token = current_update.set(timings)
+    with caplog.at_level(logging.WARNING, logger="datemate.sql"):
+        async with session_factory() as session:
+            with instrumentation.scope("matchmaking.rate_candidate") as stats:
+                user_repo = UserRepository(session)
+                for telegram_id in (1, 2, 3):
+                    await user_repo.get_by_telegram_id(telegram_id)
+    current_update.reset(token)
+
+    # Одни и те же хуки кормят и метрики апдейта, и статистику запросов
+    assert timings.db_statements == stats.statements == 3
+    assert len(stats.shapes) == 1
+    assert any("Slow query" in record.message and "(1,)" in record.message for record in caplog.records)
+    assert any("Possible N+1 in matchmaking.rate_candidate: 3 x" in record.message for record in caplog.records)
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT * FROM users WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT * FROM users\n WHERE id IN (?)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_bot_session_reuses_connections():
+    server = FakeTelegramServer()
+    runner = await start_fake_server(server, port=0)
+    host, port = runner.addresses[0][:2]
+    settings = Settings(
+        bot_token=FAKE_TOKEN,
+        redis_url="redis://localhost",
+        database_url="sqlite+aiosqlite://",
+        telegram_api_url=f"http://{host}:{port}",
+        bot_connection_limit=2,
+        bot_connect_timeout=1,
+    )
+    stats = BotSessionStats()
+    session = create_bot_session(settings, stats)
+    bot = Bot(FAKE_TOKEN, session=session)
+    try:
+        for _ in range(5):
+            await bot.send_message(1, "hello")
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+    assert session.connect_timeout == 1
+    assert stats.requests == 5
+    assert stats.connections_created == 1
+    assert stats.connections_reused == 4
+    assert "datemate_bot_http_connections_reused_total 4" in stats.prometheus_lines()
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from datemate.infrastructure.db import Base
+from datemate.infrastructure.db.migrations import MIGRATIONS, current_version, migrate, missing_indexes
+from datemate.infrastructure.db.session import create_engine
+
+
+@pytest.mark.asyncio
+async def test_migrate_upgrades_database_created_without_indexes(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("DROP INDEX ix_likes_target_is_like_liker"))
+            await conn.execute(text("DROP INDEX ix_matches_right_created"))
+
+        assert set(await missing_indexes(engine)) == {"ix_likes_target_is_like_liker", "ix_matches_right_created"}
+
+        applied = await migrate(engine)
+
+        assert [migration.version for migration in applied] == [migration.version for migration in MIGRATIONS]
+        assert await current_version(engine) == MIGRATIONS[-1].version
+        assert await missing_indexes(engine) == []
+        assert await migrate(engine) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_age_range_revision_adds_columns_and_replaces_index(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("DROP INDEX ix_users_sex_search_sex_age"))
+            await conn.execute(text("ALTER TABLE users DROP COLUMN min_age"))
+            await conn.execute(text("ALTER TABLE users DROP COLUMN max_age"))
+            await conn.execute(text("CREATE INDEX ix_users_sex_search_sex ON users (sex, search_sex)"))
+
+        await migrate(engine)
+
+        async with engine.connect() as conn:
+            columns = {row[1] for row in await conn.execute(text("PRAGMA table_info(users)"))}
+            indexes = {row[1] for row in await conn.execute(text("PRAGMA index_list(users)"))}
+        assert {"min_age", "max_age"} <= columns
+        assert "ix_users_sex_search_sex_age" in indexes
+        assert "ix_users_sex_search_sex" not in indexes
+        assert await missing_indexes(engine) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_revisions_build_the_schema_declared_by_the_models(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/fresh.db")
+    try:
+        await migrate(engine)
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(
+                lambda sync_conn: {
+                    table: {column["name"] for column in inspect(sync_conn).get_columns(table)}
+                    for table in Base.metadata.tables
+                }
+            )
+    finally:
+        await engine.dispose()
+
+    # Ревизии описывают таблицы сами, поэтому расхождение с моделями ловится только здесь
+    assert schema == {name: set(table.c.keys()) for name, table in Base.metadata.tables.items()}
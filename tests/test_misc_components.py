@@ -3,9 +3,10 @@ import os
 
 import pytest
 from aiogram.types import InlineKeyboardMarkup
+from pydantic import ValidationError
 
 from datemate.config import load_settings
-from datemate.tgbot.functional import Phrases, keyboards
+from datemate.tgbot.functional import MessageDeletionQueue, Phrases, keyboards
 from datemate.tgbot.middlewares.db import DbSessionMiddleware
 from datemate.tgbot.middlewares.interface import InterfaceMiddleware
 from datemate.tgbot.middlewares.throttling import ThrottlingMiddleware
@@ -24,6 +25,18 @@ def test_load_settings(monkeypatch):
     assert settings.database_url.startswith("sqlite")
 
 
+def test_settings_require_redis_url_for_redis_features(monkeypatch):
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite:///test.db")
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    assert load_settings().redis_url is None
+
+    monkeypatch.setenv("FSM_STORAGE", "redis")
+    monkeypatch.setenv("LIKED_ME_ENABLED", "true")
+    with pytest.raises(ValidationError, match="REDIS_URL is required for FSM_STORAGE=redis, LIKED_ME_ENABLED=true"):
+        load_settings()
+
+
 def test_keyboards_build_inline_markup():
     phrases = Phrases()
     faculties = [type("Faculty", (), {"id": "f1", "name": "F1"})(), type("Faculty", (), {"id": "f2", "name": "F2"})()]
@@ -89,3 +102,26 @@ async def test_interface_middleware_injects_context(session_factory):
 
     assert result == "ok"
     assert bot.deleted_messages == [(event.chat.id, event.message_id)]
+
+
+@pytest.mark.asyncio
+async def test_interface_middleware_defers_deletion_to_queue(session_factory):
+    deletion_queue = MessageDeletionQueue(flush_delay=0, min_interval=0)
+    bot = DummyBot()
+    state = DummyFSM()
+
+    async def handler(evt, data_dict):
+        return "ok"
+
+    async with session_factory() as session:
+        middleware = InterfaceMiddleware(Phrases(), deletion_queue)
+        for message_id in (1, 2, 3):
+            event = FakeMessage(chat_id=4, message_id=message_id)
+            await middleware(handler, event, {"bot": bot, "state": state, "session": session})
+
+    assert bot.deleted_messages == []
+
+    await deletion_queue.close()
+
+    assert [message_id for _, batch in bot.deleted_batches for message_id in batch] == [1, 2, 3]
+    assert all(chat_id == 4 for chat_id, _ in bot.deleted_batches)
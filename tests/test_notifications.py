@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from datemate.infrastructure.match_events import MatchEvent, MatchEventQueue
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from datemate.tgbot.functional import Phrases
+from datemate.tgbot.functional.notifications import MatchNotifier
+from tests.stubs import DummyBot, register_user
+
+
+class FlakyBot(DummyBot):
+    def __init__(self, errors):
+        super().__init__()
+        # Ошибки по чатам, отдаются по одной на вызов
+        self.errors = errors
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors.get(chat_id):
+            raise self.errors[chat_id].pop(0)
+        return await super().send_message(chat_id, text, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_match_is_published_for_the_other_side(session):
+    user_repo = UserRepository(session)
+    alice = await register_user(user_repo, 1, "F", "M", name="Alice")
+    bob = await register_user(user_repo, 2, "M", "F", name="Bob")
+    queue = MatchEventQueue()
+    match_repo = MatchRepository(session, match_events=queue)
+
+    await match_repo.set_reaction(alice.id, bob.id, is_like=True)
+    _, matched = await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+    await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+
+    assert matched
+    assert await asyncio.wait_for(queue.get(), 1) == MatchEvent(recipient_id=alice.id, partner_id=bob.id)
+    assert queue._queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_notifier_delivers_in_recipient_language(session_factory):
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        alice = await register_user(user_repo, 1, "F", "M", name="Alice", language="en")
+        bob = await register_user(user_repo, 2, "M", "F", name="<Bob>")
+        carol = await register_user(user_repo, 3, "F", "M", name="Carol")
+
+    queue = MatchEventQueue()
+    blocked = TelegramForbiddenError(SendMessage(chat_id=3, text=""), "bot was blocked by the user")
+    bot = FlakyBot({1: [TelegramRetryAfter(SendMessage(chat_id=1, text=""), "Too many requests", 0)], 3: [blocked]})
+    notifier = MatchNotifier(queue, session_factory, Phrases(), workers=1, min_interval=0)
+
+    await queue.publish(MatchEvent(recipient_id=alice.id, partner_id=bob.id))
+    await queue.publish(MatchEvent(recipient_id=carol.id, partner_id=bob.id))
+    await notifier.start(bot)
+    await asyncio.wait_for(queue._queue.join(), 1)
+    await notifier.close()
+
+    assert bot.sent_messages == [(1, "💌 &lt;Bob&gt; liked you back! Take a look at your matches.")]
+
+
+class FlakyQueue(MatchEventQueue):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def get(self) -> MatchEvent:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Connection reset by peer")
+        return await super().get()
+
+
+@pytest.mark.asyncio
+async def test_notifier_survives_queue_errors(session_factory):
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        alice = await register_user(user_repo, 1, "F", "M", name="Alice", language="en")
+        bob = await register_user(user_repo, 2, "M", "F", name="Bob")
+
+    queue = FlakyQueue(failures=1)
+    bot = DummyBot()
+    notifier = MatchNotifier(queue, session_factory, Phrases(), workers=1, min_interval=0, retry_backoff=0)
+
+    await notifier.start(bot)
+    await queue.publish(MatchEvent(recipient_id=alice.id, partner_id=bob.id))
+    await asyncio.wait_for(queue._queue.join(), 1)
+    await queue.publish(MatchEvent(recipient_id=alice.id, partner_id=bob.id))
+    await asyncio.wait_for(queue._queue.join(), 1)
+    await notifier.close()
+
+    assert queue.failures == 0
+    assert len(bot.sent_messages) == 2
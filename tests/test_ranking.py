@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from datemate.infrastructure.ranking import RankingEngine, RankingWeights
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from datemate.infrastructure.user_index import IndexRow, UserIndex
+from tests.stubs import register_user
+
+NOW = datetime.now(timezone.utc)
+
+
+def _viewer(**overrides):
+    return SimpleNamespace(**{"id": 1, "sex": "M", "search_sex": "F", "age": 20, "faculty_id": "fkn", "min_age": None, "max_age": None, **overrides})
+
+
+def _engine(rows, **weights) -> RankingEngine:
+    index = UserIndex()
+    index.load(rows)
+    return RankingEngine(index, RankingWeights(**weights), seed=1)
+
+
+def test_pick_respects_eligibility_and_prefers_compatible_candidates():
+    engine = _engine(
+        [
+            IndexRow(1, 20, "fkn", "M", "F"),
+            IndexRow(2, 20, "fkn", "M", "M", 50, NOW),
+            IndexRow(3, 20, "fkn", "F", "F", 50, NOW),
+            IndexRow(4, 30, "fen", "F", "M", 0, NOW - timedelta(days=60)),
+            IndexRow(5, 21, "fkn", "F", "M", 3, NOW),
+            IndexRow(6, 20, "fkn", "F", "M", 5, NOW - timedelta(days=1)),
+        ],
+        top_k=1,
+    )
+
+    ids, _ = engine.candidates(_viewer())
+    assert set(ids) == {4, 5, 6}
+    assert engine.pick(_viewer()) in {5, 6}
+    assert engine.pick(_viewer(), exclude_ids=[5, 6]) == 4
+    assert engine.pick(_viewer(), exclude_ids=[4, 5, 6]) is None
+
+
+def test_candidates_respect_age_ranges_of_both_sides():
+    engine = _engine(
+        [
+            IndexRow(2, 19, "fkn", "F", "M"),
+            IndexRow(3, 23, "fkn", "F", "M", min_age=23, max_age=30),
+            IndexRow(4, 21, "fkn", "F", "M", min_age=18, max_age=22),
+            IndexRow(5, 25, "fkn", "F", "M"),
+        ]
+    )
+
+    ids, _ = engine.candidates(_viewer(age=22, min_age=20, max_age=24))
+
+    assert ids.tolist() == [4]
+
+
+def test_pick_samples_within_top_k():
+    engine = _engine(
+        [IndexRow(index, 18 + index, "fkn", "F", "M", index, NOW) for index in range(2, 40)],
+        top_k=3,
+        temperature=10,
+    )
+
+    picks = {engine.pick(_viewer(age=18)) for _ in range(200)}
+
+    assert picks == {2, 3, 4}
+
+
+@pytest.mark.asyncio
+async def test_get_next_candidate_uses_ranking(session_factory):
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        viewer = await register_user(user_repo, 1, "M", "F", name="Viewer", photo_ids=["p1"])
+        for telegram_id, age, faculty_id in ((2, 35, "fen"), (3, 20, "fkn"), (4, 34, "vsb")):
+            await register_user(
+                user_repo, telegram_id, "F", "M", age=age, faculty_id=faculty_id, photo_ids=[f"p{telegram_id}"]
+            )
+
+    user_index = UserIndex()
+    await user_index.refresh(session_factory)
+    ranking = RankingEngine(user_index, RankingWeights(top_k=1), seed=1)
+    session_factory.configure(info={"user_index": user_index, "ranking": ranking})
+
+    async with session_factory() as session:
+        candidate = await MatchRepository(session).get_next_candidate(viewer)
+        assert candidate.telegram_id == 3
+        assert candidate.faculty_id == "fkn"
+
+        await MatchRepository(session).set_reaction(viewer.id, candidate.id, is_like=False)
+        assert (await MatchRepository(session).get_next_candidate(viewer)).telegram_id in {2, 4}
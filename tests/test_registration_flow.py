@@ -6,6 +6,7 @@ from datemate.tgbot.handlers.registration import (
     RegistrationState,
     finish_photos,
     set_age,
+    set_age_range,
     set_description,
     set_faculty,
     set_language,
@@ -51,6 +52,14 @@ async def test_registration_full_happy_path(session):
 
     age_message = FakeMessage(chat_id=1, message_id=12, text="25", from_user_id=user_id)
     await set_age(age_message, state, context, phrases.for_language("en"), session)
+    assert state.state == RegistrationState.age_range
+
+    bad_range_message = FakeMessage(chat_id=1, message_id=12, text="30-20", from_user_id=user_id)
+    await set_age_range(bad_range_message, state, context, phrases.for_language("en"), session)
+    assert state.state == RegistrationState.age_range
+
+    range_message = FakeMessage(chat_id=1, message_id=12, text="21 - 28", from_user_id=user_id)
+    await set_age_range(range_message, state, context, phrases.for_language("en"), session)
     assert state.state == RegistrationState.faculty
 
     faculty_callback = FakeCallback("faculty:fkn", message=initial_message, from_user_id=user_id)
@@ -76,4 +85,5 @@ async def test_registration_full_happy_path(session):
     saved_user = await user_repo.get_by_telegram_id(user_id)
     assert saved_user is not None
     assert saved_user.name == "John Doe"
-    assert saved_user.photos == ["file_1"]
+    assert saved_user.photos == ("file_1",)
+    assert (saved_user.min_age, saved_user.max_age) == (21, 28)
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from datemate.infrastructure.db import LikeModel, RejectionSetModel
+from datemate.infrastructure.rejections import RejectionPolicy, RejectionSet, compact_rejections, decode, encode
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from tests.stubs import register_user
+
+
+def test_encoding_picks_the_shorter_layout():
+    sparse = [5, 70_000, 1_000_000]
+    spread = list(range(10_000, 90_000, 900))
+    dense = list(range(100, 1_100, 2))
+
+    assert encode(sparse)[:1] == b"A"
+    assert encode(spread)[:1] == b"D"
+    assert encode(dense)[:1] == b"B"
+    assert len(encode(dense)) < 2 * len(dense)
+    for ids in (sparse, spread, dense):
+        assert decode(encode(ids)).tolist() == ids
+
+    merged = RejectionSet.from_blobs([encode(sparse), encode(spread), encode(dense)])
+    assert 70_000 in merged and 102 in merged and 103 not in merged
+    assert len(merged) == len(sparse) + len(spread) + len(dense)
+
+
+@pytest.mark.asyncio
+async def test_compacted_rejections_are_excluded_until_expiry(session_factory):
+    policy = RejectionPolicy(compact_after=timedelta(days=7), expiry=timedelta(days=180))
+    session_factory.configure(info={"rejections": policy})
+
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        viewer = await register_user(user_repo, 1, "M", "F")
+        skipped = [await register_user(user_repo, telegram_id, "F", "M") for telegram_id in (2, 3)]
+        liked = await register_user(user_repo, 4, "F", "M")
+        match_repo = MatchRepository(session)
+        for profile in skipped:
+            await match_repo.set_reaction(viewer.id, profile.id, is_like=False)
+        await match_repo.set_reaction(viewer.id, liked.id, is_like=True)
+
+    stats = await compact_rejections(session_factory, policy, now=datetime.now(timezone.utc) + timedelta(days=8))
+
+    async with session_factory() as session:
+        assert stats.rows == 2
+        assert (await session.execute(select(func.count()).select_from(LikeModel))).scalar_one() == 1
+        assert (await session.execute(select(RejectionSetModel.size))).scalar_one() == 2
+        assert await MatchRepository(session).get_next_candidate(viewer) is None
+
+    stats = await compact_rejections(session_factory, policy, now=datetime.now(timezone.utc) + timedelta(days=400))
+
+    async with session_factory() as session:
+        assert stats.sets_expired == 1
+        candidate = await MatchRepository(session).get_next_candidate(viewer)
+        assert candidate.id in {profile.id for profile in skipped}
+
+
+@pytest.mark.asyncio
+async def test_mostly_rejected_pool_is_walked_in_bounded_steps(session_factory, monkeypatch):
+    policy = RejectionPolicy(compact_after=timedelta(days=7))
+    session_factory.configure(info={"rejections": policy})
+
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        viewer = await register_user(user_repo, 1, "M", "F")
+        pool = [await register_user(user_repo, telegram_id, "F", "M") for telegram_id in range(2, 32)]
+        match_repo = MatchRepository(session)
+        left = pool[len(pool) // 2]
+        for profile in pool:
+            if profile.id != left.id:
+                await match_repo.set_reaction(viewer.id, profile.id, is_like=False)
+
+    await compact_rejections(session_factory, policy, now=datetime.now(timezone.utc) + timedelta(days=8))
+    monkeypatch.setattr(MatchRepository, "REJECTION_WINDOW", 4)
+    statements = []
+
+    async with session_factory() as session:
+        match_repo = MatchRepository(session)
+        for _ in range(3):
+            assert (await match_repo.get_next_candidate(viewer)).id == left.id
+        await match_repo.set_reaction(viewer.id, left.id, is_like=False)
+
+        original_execute = session.execute
+
+        async def record_execute(statement, *args, **kwargs):
+            statements.append(statement)
+            return await original_execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(session, "execute", record_execute)
+        assert await match_repo.get_next_candidate(viewer) is None
+    # Кроме чтения набора отказов, каждый запрос ограничен LIMIT: пул целиком в Python не загружается.
+    # Выборка 20 id, затем два прохода по кругу окнами по 4 отказа (29 отказов в пуле)
+    assert all(statement._limit_clause is not None for statement in statements[1:])
+    assert len(statements) <= 2 + 2 * (29 // 4 + 1)
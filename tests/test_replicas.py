@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.repositories import FacultyRepository, MatchRepository, UserRepository
+from tests.stubs import register_user
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_except_right_after_writes(tmp_path):
+    primary = create_engine(f"sqlite+aiosqlite:///{tmp_path}/primary.db")
+    replica = create_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    try:
+        # Реплика без репликации: видно, из какой базы пришел ответ
+        await init_db(replica)
+        session_factory = await init_db(primary, replicas=[replica], read_your_writes=0.2)
+
+        async with session_factory() as session:
+            user_repo = UserRepository(session)
+            alice = await register_user(user_repo, 1, "F", "M")
+            bob = await register_user(user_repo, 2, "M", "F")
+            match_repo = MatchRepository(session)
+            await match_repo.set_reaction(alice.id, bob.id, is_like=True)
+            _, matched = await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+
+            # Только что писали: читаем свои изменения из основной базы
+            assert matched
+            assert (await user_repo.get_by_telegram_id(1)).id == alice.id
+            assert await match_repo.count_matches(alice.id) == 1
+            assert await FacultyRepository(session).list_faculties()
+
+        await asyncio.sleep(0.3)
+        async with session_factory() as session:
+            assert await UserRepository(session).get_by_telegram_id(1) is None
+            assert await MatchRepository(session).count_matches(alice.id) == 0
+    finally:
+        await primary.dispose()
+        await replica.dispose()
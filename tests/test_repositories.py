@@ -2,6 +2,9 @@ import pytest
 
 from datemate.domain.repositories import FacultyRepository, MatchRepository, UserRepository
 from datemate.infrastructure.db import LikeModel
+from datemate.infrastructure.db.instrumentation import QueryInstrumentation
+from datemate.infrastructure.db.session import create_engine, init_db
+from tests.stubs import register_user
 
 
 @pytest.mark.asyncio
@@ -30,7 +33,7 @@ async def test_user_upsert_creates_and_updates(session):
     )
 
     assert created.id is not None
-    assert created.photos == ["p1"]
+    assert created.photos == ("p1",)
 
     updated = await repo.upsert_user(
         telegram_id=1,
@@ -48,7 +51,7 @@ async def test_user_upsert_creates_and_updates(session):
     assert updated.id == created.id
     assert updated.name == "Alice Updated"
     assert updated.language == "en"
-    assert updated.photos == ["p2", "p3"]
+    assert updated.photos == ("p2", "p3")
 
 
 @pytest.mark.asyncio
@@ -102,6 +105,22 @@ async def test_prioritized_candidate_is_returned_first(session):
     assert candidate.id == prioritized.id
 
 
+@pytest.mark.asyncio
+async def test_candidates_are_filtered_by_age_range_both_ways(session):
+    user_repo = UserRepository(session)
+    viewer = await register_user(user_repo, 500, "M", "F", name="Viewer", age=22, min_age=20, max_age=24)
+    profiles = {}
+    for telegram_id, age, min_age, max_age in ((501, 19, None, None), (502, 23, 23, 30), (503, 21, None, None)):
+        profiles[telegram_id] = await register_user(
+            user_repo, telegram_id, "F", "M", age=age, min_age=min_age, max_age=max_age
+        )
+
+    match_repo = MatchRepository(session)
+    # 501 младше диапазона зрителя, а 502 ищет не младше 23
+    assert (await match_repo.get_next_candidate(viewer)).id == profiles[503].id
+    assert await match_repo.get_next_candidate(viewer, exclude_ids=[profiles[503].id]) is None
+
+
 @pytest.mark.asyncio
 async def test_set_reaction_creates_match_once(session):
     user_repo = UserRepository(session)
@@ -145,3 +164,56 @@ async def test_set_reaction_creates_match_once(session):
     pairs, total = await match_repo.list_matches(alice.id, offset=0, limit=10)
     assert total == 1
     assert pairs[0][1].id == bob.id
+
+
+@pytest.mark.asyncio
+async def test_repositories_return_detached_entities(session_factory):
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        alice = await register_user(user_repo, 1, "F", "M", name="Alice", username="alice", age=21, photo_ids=["a1"])
+        bob = await register_user(
+            user_repo, 2, "M", "F", name="Bob", username="bob", age=22, faculty_id="fen", photo_ids=["b1"]
+        )
+        match_repo = MatchRepository(session)
+        reaction, _ = await match_repo.set_reaction(alice.id, bob.id, is_like=True)
+        await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+        candidate = await user_repo.get_by_id(bob.id)
+        (match, partner), = (await match_repo.list_matches(alice.id))[0]
+        assert not session.identity_map
+
+    # Сессия закрыта, поля читаются без обращения к базе
+    assert candidate == bob
+    assert candidate.faculty_name is not None and candidate.photos == ("b1",)
+    assert (reaction.liker_id, reaction.target_id, reaction.is_like) == (alice.id, bob.id, True)
+    assert match.other_id(alice.id) == partner.id == bob.id
+    with pytest.raises(AttributeError):
+        candidate.age = 30
+
+
+@pytest.mark.asyncio
+async def test_profile_fetches_are_single_statements(tmp_path):
+    instrumentation = QueryInstrumentation(slow_query_ms=float("inf"))
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/statements.db", instrumentation=instrumentation)
+    try:
+        session_factory = await init_db(engine)
+        async with session_factory() as session:
+            user_repo = UserRepository(session)
+            match_repo = MatchRepository(session)
+            viewer = await register_user(user_repo, 1, "M", "F", name="Viewer")
+            for telegram_id in (2, 3):
+                profile = await register_user(user_repo, telegram_id, "F", "M", name="Profile", faculty_id="fen")
+            await match_repo.set_reaction(viewer.id, profile.id, is_like=True)
+            await match_repo.set_reaction(profile.id, viewer.id, is_like=True)
+
+            with instrumentation.scope("get_by_id") as by_id:
+                await user_repo.get_by_id(profile.id)
+            with instrumentation.scope("get_next_candidate") as next_candidate:
+                candidate = await match_repo.get_next_candidate(viewer)
+            with instrumentation.scope("list_matches") as matches:
+                pairs, _ = await match_repo.list_matches(viewer.id)
+    finally:
+        await engine.dispose()
+
+    assert candidate.faculty_name is not None
+    assert pairs[0][1].faculty_name is not None
+    assert (by_id.statements, next_candidate.statements, matches.statements) == (1, 1, 2)
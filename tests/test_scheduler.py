@@ -0,0 +1,71 @@
+import asyncio
+import random
+
+import pytest
+
+from datemate.infrastructure.scheduler import Scheduler
+
+
+@pytest.mark.asyncio
+async def test_interval_and_one_shot_jobs_run():
+    scheduler = Scheduler(rng=random.Random(1))
+    calls = []
+
+    async def tick():
+        calls.append("tick")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler.every("tick", 0.01, tick, first_run=0)
+    scheduler.once("fail", fail)
+    scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.close()
+
+    assert len(calls) >= 3
+    assert scheduler.jobs["fail"].runs == scheduler.jobs["fail"].failures == 1
+    assert scheduler.jobs["tick"].duration.count == scheduler.jobs["tick"].runs
+    assert 'datemate_job_failures_total{job="fail"} 1' in scheduler.prometheus_lines()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_and_overlap_skipping():
+    scheduler = Scheduler(max_concurrency=1)
+    active = []
+    peak = 0
+
+    async def slow():
+        nonlocal peak
+        active.append(1)
+        peak = max(peak, len(active))
+        await asyncio.sleep(0.05)
+        active.pop()
+
+    scheduler.every("first", 0.01, slow, first_run=0, jitter=0)
+    scheduler.every("second", 0.01, slow, first_run=0, jitter=0)
+    scheduler.start()
+    await asyncio.sleep(0.12)
+    await scheduler.close()
+
+    assert peak == 1
+    assert scheduler.jobs["first"].skipped > 0
+
+
+@pytest.mark.asyncio
+async def test_close_drains_running_jobs_and_cancels_late_ones():
+    scheduler = Scheduler(max_concurrency=2, drain_timeout=0.05)
+    finished = []
+
+    async def job(name, duration):
+        await asyncio.sleep(duration)
+        finished.append(name)
+
+    scheduler.once("short", lambda: job("short", 0.01))
+    scheduler.once("long", lambda: job("long", 10))
+    scheduler.start()
+    await asyncio.sleep(0.005)
+    await scheduler.close()
+
+    assert finished == ["short"]
+    assert not scheduler.jobs["long"].running
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+
+from datemate.infrastructure.db import SuggestionModel
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from datemate.infrastructure.suggestions import SuggestionPolicy, precompute_suggestions
+from tests.stubs import register_user
+
+
+async def _suggestions(session, user_id):
+    stmt = select(SuggestionModel.candidate_id).where(SuggestionModel.user_id == user_id).order_by(SuggestionModel.rank)
+    return (await session.execute(stmt)).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_suggestions_are_precomputed_incrementally_and_served_first(session_factory):
+    policy = SuggestionPolicy(top_n=3, workers=1)
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        alice = await register_user(user_repo, 1, "F", "M", age=22, faculty_id="fkn")
+        bob = await register_user(user_repo, 2, "M", "F", age=22, faculty_id="fkn")
+        carl = await register_user(user_repo, 3, "M", "F", age=23, faculty_id="fen")
+        dan = await register_user(user_repo, 4, "M", "F", age=22, faculty_id="vsb")
+        emil = await register_user(user_repo, 5, "M", "F", age=40, faculty_id="fgn")
+        await MatchRepository(session).set_reaction(alice.id, dan.id, is_like=False)
+
+    stats = await precompute_suggestions(session_factory, policy)
+    assert (stats.users, stats.computed) == (5, 5)
+    async with session_factory() as session:
+        # Тот же факультет и возраст выше всего, уже оцененный dan исключен
+        assert await _suggestions(session, alice.id) == [bob.id, carl.id, emil.id]
+
+        match_repo = MatchRepository(session, suggestions=policy)
+        assert (await match_repo.get_next_candidate(alice)).id == bob.id
+        assert (await match_repo.get_next_candidate(alice, exclude_ids=[bob.id])).id == carl.id
+
+    stats = await precompute_suggestions(session_factory, policy)
+    assert (stats.computed, stats.unchanged) == (0, 5)
+
+    async with session_factory() as session:
+        await MatchRepository(session).set_reaction(alice.id, bob.id, is_like=False)
+    # Пересчитывается только Алиса: у нее появилась реакция
+    stats = await precompute_suggestions(session_factory, policy)
+    assert (stats.computed, stats.unchanged) == (1, 4)
+    async with session_factory() as session:
+        assert await _suggestions(session, alice.id) == [carl.id, emil.id]
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import select
+
+from benchmarks.population import PopulationSpec, load_population
+from datemate.infrastructure.db import LikeModel, MatchModel, UserModel
+from datemate.infrastructure.db.session import create_engine, init_db
+from datemate.infrastructure.db.transfer import TABLES, export_tables, import_tables, read_rows
+from datemate.infrastructure.repositories import UserRepository
+from tests.stubs import register_user
+
+
+async def _dump(engine) -> dict[str, list[tuple]]:
+    async with engine.connect() as conn:
+        return {
+            model.__tablename__: [tuple(row) for row in await conn.execute(select(model).order_by(model.id))]
+            for model in (UserModel, LikeModel, MatchModel)
+        }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+async def test_export_then_import_restores_tables(tmp_path, fmt):
+    source = create_engine(f"sqlite+aiosqlite:///{tmp_path}/source.db")
+    target = create_engine(f"sqlite+aiosqlite:///{tmp_path}/target.db")
+    try:
+        await load_population(source, PopulationSpec(users=120, likes=1_500))
+        exported = await export_tables(source, tmp_path / "dump", fmt=fmt, chunk_size=50)
+
+        await init_db(target)
+        imported = await import_tables(target, tmp_path / "dump", chunk_size=50)
+
+        assert exported == imported
+        assert list(imported) == list(TABLES)
+        assert await _dump(source) == await _dump(target)
+    finally:
+        await source.dispose()
+        await target.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+async def test_round_trip_keeps_empty_strings_apart_from_null(tmp_path, fmt):
+    source = create_engine(f"sqlite+aiosqlite:///{tmp_path}/source.db")
+    target = create_engine(f"sqlite+aiosqlite:///{tmp_path}/target.db")
+    try:
+        async with (await init_db(source))() as session:
+            # Регистрация разрешает пустое описание, а username у пользователя без ника — NULL
+            await register_user(UserRepository(session), 1, "F", "M", description="")
+        await export_tables(source, tmp_path / "dump", tables=["users"], fmt=fmt)
+
+        await init_db(target)
+        await import_tables(target, tmp_path / "dump")
+
+        async with target.connect() as conn:
+            description, username = (await conn.execute(select(UserModel.description, UserModel.username))).one()
+        assert (description, username) == ("", None)
+    finally:
+        await source.dispose()
+        await target.dispose()
+
+
+def test_read_rows_converts_csv_values(tmp_path):
+    path = tmp_path / "likes.csv"
+    path.write_text("id,liker_id,target_id,is_like,created_at\n1,2,3,t,2024-05-01 10:00:00+00\n", encoding="utf-8")
+
+    [row] = read_rows(path, LikeModel.__table__)
+
+    assert row["is_like"] is True
+    assert row["liker_id"] == 2
+    assert row["created_at"].utcoffset().total_seconds() == 0
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from datemate.infrastructure import user_index as user_index_module
+from datemate.infrastructure.repositories import MatchRepository, UserRepository
+from datemate.infrastructure.user_index import IndexRow, UserIndex
+from tests.stubs import register_user
+
+
+def _bucket_ids(index: UserIndex, sex: str, search_sex: str) -> list[int]:
+    return list(index.bucket(sex, search_sex).ids)
+
+
+def test_index_partitions_users_and_moves_them_between_buckets():
+    index = UserIndex()
+    index.load(
+        [
+            IndexRow(3, 20, "fkn", "F", "M"),
+            IndexRow(1, 21, "fen", "M", "F"),
+            IndexRow(2, 22, "fkn", "F", "M", likes=4),
+            IndexRow(4, 23, "vsb", "F", "F"),
+        ]
+    )
+
+    assert _bucket_ids(index, "F", "M") == [2, 3]
+    assert [list(bucket.ids) for bucket in index.candidate_buckets(SimpleNamespace(sex="M", search_sex="F"))] == [[2, 3]]
+    assert index.memory_bytes == 18 * len(index)
+
+    index.upsert(2, "F", "F", 23, "fgn")
+    index.upsert(5, "F", "M", 19, "fkn")
+    index.record_reaction(5, 1, is_like=True, at=1_700_000_000)
+
+    assert _bucket_ids(index, "F", "M") == [3, 5]
+    assert _bucket_ids(index, "F", "F") == [2, 4]
+    bucket = index.bucket("F", "F")
+    assert bucket.likes[bucket.position(2)] == 4
+    assert index.bucket("F", "M").last_active[1] == 1_700_000_000
+    assert index.bucket("M", "F").likes[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_repositories_update_index_incrementally(session_factory):
+    user_index = UserIndex()
+    await user_index.refresh(session_factory)
+    session_factory.configure(info={"user_index": user_index})
+
+    async with session_factory() as session:
+        user_repo = UserRepository(session)
+        alice = await register_user(user_repo, 1, "F", "M", name="Alice")
+        bob = await register_user(user_repo, 2, "M", "F", name="Bob", age=21, faculty_id="fen")
+        match_repo = MatchRepository(session)
+        await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+        await match_repo.set_reaction(bob.id, alice.id, is_like=True)
+
+        bucket = user_index.bucket("F", "M")
+        assert list(bucket.ids) == [alice.id]
+        assert bucket.likes[0] == 1
+
+        await match_repo.set_reaction(bob.id, alice.id, is_like=False)
+        assert bucket.likes[0] == 0
+    assert user_index.bucket("M", "F").last_active[0] > 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_replays_updates_made_while_loading(session_factory, monkeypatch):
+    user_index = UserIndex()
+
+    async def fetch_while_users_register(session):
+        # Пока идет чтение, регистрируется новая анкета и приходит лайк
+        user_index.upsert(2, "M", "F", 21, "fen")
+        user_index.record_reaction(2, 1, is_like=True, at=1_700_000_000)
+        return [IndexRow(id=1, age=20, faculty_id="fkn", sex="F", search_sex="M")]
+
+    monkeypatch.setattr(user_index_module, "fetch_index_rows", fetch_while_users_register)
+    await user_index.refresh(session_factory)
+
+    assert user_index.loaded
+    assert _bucket_ids(user_index, "F", "M") == [1]
+    assert _bucket_ids(user_index, "M", "F") == [2]
+    assert user_index.bucket("F", "M").likes[0] == 1
+    assert user_index.bucket("M", "F").last_active[0] == 1_700_000_000
+
+
+def test_rated_cache_tracks_reactions_and_evicts_least_recent_searchers():
+    index = UserIndex(rated_capacity=4)
+    index.load([])
+    assert index.rated(1) is None
+
+    index.remember_rated(1, [10, 11])
+    index.record_reaction(1, 12, is_like=False)
+    index.record_reaction(1, 12, is_like=True, previous=False)
+    assert list(index.rated(1)) == [10, 11, 12]
+
+    # Пользователь 1 искал последним, поэтому вытесняется 2
+    index.remember_rated(2, [20])
+    index.rated(1)
+    index.remember_rated(3, [30])
+    assert index.rated(2) is None
+    assert list(index.rated(3)) == [30]
+
+    index.load([])
+    assert index.rated(1) is None